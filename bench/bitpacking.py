@@ -0,0 +1,48 @@
+"""
+Compares the string based bit handling used up to now with the NumPy bit engine in src.bitutils.
+
+Usage: python -m bench.bitpacking [payload size in bytes]
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+from src.bitutils import bytes2symbols, symbols2bytes
+
+
+def legacy_pack(msg, nr_bits):
+    msg = ''.join(format(byte, '08b') for byte in msg)
+    return [int(msg[i:i+nr_bits], 2) for i in range(0, len(msg), nr_bits)]
+
+
+def legacy_unpack(symbols, nr_bits, length):
+    binary_string = ''.join([bin(x)[2:].zfill(nr_bits) for x in symbols])[:length]
+    return bytes([int(binary_string[i:i+8], 2) for i in range(0, len(binary_string), 8)])
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1 << 20
+    payload = os.urandom(size)
+    print("payload: {} bytes".format(size))
+    print("{:>4} {:>12} {:>12} {:>12} {:>12} {:>9}".format("bits", "legacy pack", "numpy pack", "legacy unp.", "numpy unp.", "speedup"))
+    for bits in range(1, 5):
+        _, legacy_pack_time = timed(legacy_pack, payload, bits)
+        symbols, pack_time = timed(bytes2symbols, payload, bits)
+        _, legacy_unpack_time = timed(legacy_unpack, np.asarray(symbols), bits, size * 8)
+        result, unpack_time = timed(symbols2bytes, symbols, bits, size * 8)
+        assert result == payload
+        speedup = (legacy_pack_time + legacy_unpack_time) / (pack_time + unpack_time)
+        print("{:>4} {:>11.3f}s {:>11.3f}s {:>11.3f}s {:>11.3f}s {:>8.0f}x".format(
+            bits, legacy_pack_time, pack_time, legacy_unpack_time, unpack_time, speedup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Measures the startup cost of CLI invocations with python -X importtime.
+
+For every command it reports the wall-clock time, the time spent importing and the most expensive top-level imports,
+and checks that the command does not load modules it should not need (e.g. cv2 for capacity). With --check the
+script fails if such a module is loaded or the import time exceeds --max-ms, so it can guard against regressions.
+
+Usage: python -m bench.import_time [-r REPEAT] [--check] [--max-ms MS]
+"""
+import argparse
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+HEAVY_MODULES = ("cv2", "numpy", "cryptography")
+
+
+def commands(directory):
+    medium = os.path.join("test", "files", "medium.png")
+    message = os.path.join("test", "files", "test.txt")
+    hidden = os.path.join(directory, "hidden")
+    # (name, arguments, modules that must not be imported)
+    return [
+        ("help", ["--help"], HEAVY_MODULES),
+        ("capacity", ["capacity", medium, message, "-k", "0" * 32], HEAVY_MODULES),
+        ("inspect", ["inspect", medium, "-w", "1"], HEAVY_MODULES),
+        ("hide", ["hide", medium, message, "-o", hidden], ("cryptography",)),
+        ("reveal", ["reveal", hidden + ".png", "-o", os.path.join(directory, "revealed")], ("cryptography",)),
+        ("reveal encrypted", ["reveal", hidden + "_encrypted.png", "-k", "0" * 32, "-o", os.path.join(directory, "revealed")], ()),
+    ]
+
+
+def measure(arguments):
+    """
+    Run main.py once with -X importtime.
+
+    :return: A tuple (wall-clock seconds, import seconds, {top-level module: cumulative seconds}).
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-X", "importtime", "main.py"] + arguments,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError("main.py {} failed:\n{}".format(" ".join(arguments), result.stderr[-2000:]))
+    modules = {}
+    for match in map(IMPORT_LINE.match, result.stderr.splitlines()):
+        if match and not match.group(3):
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    return wall, sum(modules.values()), modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of CLI invocations")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Runs per command, the median is reported")
+    parser.add_argument("--check", action="store_true", help="Fail on forbidden imports or when --max-ms is exceeded")
+    parser.add_argument("--max-ms", type=float, help="Largest acceptable import time of help, capacity and inspect in ms")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    failures = []
+    try:
+        hidden = os.path.join(directory, "hidden")
+        subprocess.run([sys.executable, "main.py", "hide", "test/files/medium.png", "test/files/test.txt", "-o", hidden + "_encrypted",
+                        "-k", "0" * 32], stdout=subprocess.DEVNULL, check=True)
+        for name, arguments, forbidden in commands(directory):
+            runs = [measure(arguments) for _ in range(args.repeat)]
+            wall = statistics.median(run[0] for run in runs)
+            imports = statistics.median(run[1] for run in runs)
+            modules = runs[-1][2]
+            top = sorted(modules.items(), key=lambda item: -item[1])[:4]
+            print("{:<17} wall {:>6.0f}ms  imports {:>6.0f}ms  top: {}".format(
+                name, wall * 1000, imports * 1000, ", ".join("{} {:.0f}ms".format(module, seconds * 1000) for module, seconds in top)))
+            loaded = [module for module in forbidden if module in modules]
+            if loaded:
+                failures.append("{} imports {}".format(name, ", ".join(loaded)))
+            if args.max_ms is not None and forbidden == HEAVY_MODULES and imports * 1000 > args.max_ms:
+                failures.append("{} spends {:.0f}ms importing, more than {:.0f}ms".format(name, imports * 1000, args.max_ms))
+    finally:
+        shutil.rmtree(directory)
+    for failure in failures:
+        print("FAIL  " + failure)
+    if args.check and failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
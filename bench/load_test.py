@@ -0,0 +1,124 @@
+"""
+Load test of the HTTP service (python main.py serve) on localhost.
+
+Sends requests over a number of concurrent keep-alive connections and reports the latency percentiles and the
+throughput. With --start a server is started for the duration of the test.
+
+Usage: python -m bench.load_test [-a ADDRESS] [-e hide|reveal|capacity] [-c CONCURRENCY] [-n REQUESTS]
+                                 [--megapixels MP] [--payload BYTES] [--start [-w WORKERS]]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bench.output_formats import synthetic_image
+from bench.suite import image_dimensions
+from src import steg
+from src.server import parse_address
+
+KEY = "0" * 32
+
+
+async def connect(address):
+    host, port, unix_path = parse_address(address)
+    if unix_path is not None:
+        return await asyncio.open_unix_connection(unix_path)
+    return await asyncio.open_connection(host, port)
+
+
+async def request(reader, writer, target, body, headers=None):
+    head = ["POST {} HTTP/1.1".format(target), "Host: localhost", "Content-Length: {}".format(len(body))]
+    head += ["{}: {}".format(name, value) for name, value in (headers or {}).items()]
+    writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    status_line, *header_lines = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+    length = next(int(line.split(":", 1)[1]) for line in header_lines if line.lower().startswith("content-length:"))
+    await reader.readexactly(length)
+    return int(status_line.split(" ")[1])
+
+
+async def wait_until_ready(address, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            reader, writer = await connect(address)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run(args, target, body, headers):
+    latencies, statuses = [], {}
+    remaining = [args.requests]
+
+    async def client():
+        reader, writer = await connect(args.address)
+        try:
+            while remaining[0] > 0:
+                remaining[0] -= 1
+                start = time.perf_counter()
+                status = await request(reader, writer, target, body, headers)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.concurrency)))
+    return np.array(latencies), statuses, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test of the HTTP service")
+    parser.add_argument("-a", "--address", default="127.0.0.1:8080", help="HOST:PORT or unix:PATH of the server")
+    parser.add_argument("-e", "--endpoint", choices=["hide", "reveal", "capacity"], default="hide")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="Number of concurrent connections")
+    parser.add_argument("-n", "--requests", type=int, default=500, help="Total number of requests")
+    parser.add_argument("--megapixels", type=float, default=0.3, help="Size of the carrier")
+    parser.add_argument("--payload", type=int, default=4096, help="Size of the payload in bytes")
+    parser.add_argument("--start", action="store_true", help="Start a server for the test")
+    parser.add_argument("-w", "--workers", type=int, help="Number of worker processes of the started server")
+    args = parser.parse_args()
+
+    medium = steg.encode_image(synthetic_image(*image_dimensions(args.megapixels)))
+    payload = os.urandom(args.payload)
+    headers = {"X-Key": KEY}
+    if args.endpoint == "hide":
+        target, body = "/hide?filetype=bin&medium_length={}".format(len(medium)), medium + payload
+    elif args.endpoint == "reveal":
+        target, body = "/reveal", steg.encode_bytes(medium, payload, "bin", KEY.encode())
+    else:
+        target, body = "/capacity?payload_size={}".format(args.payload), medium
+
+    server = None
+    if args.start:
+        command = [sys.executable, "main.py", "serve", args.address, "--queue-size", str(args.requests)]
+        if args.workers:
+            command += ["-w", str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_until_ready(args.address))
+        latencies, statuses, elapsed = asyncio.run(run(args, target, body, headers))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print("{} {} requests, {} connections, {:.1f} MP carrier, {} byte payload".format(
+        len(latencies), args.endpoint, args.concurrency, args.megapixels, args.payload))
+    print("status codes: {}".format(", ".join("{}: {}".format(status, count) for status, count in sorted(statuses.items()))))
+    print("p50 {:.1f}ms  p99 {:.1f}ms  max {:.1f}ms".format(
+        *(value * 1000 for value in (np.percentile(latencies, 50), np.percentile(latencies, 99), latencies.max()))))
+    print("{:.1f} requests/s".format(len(latencies) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
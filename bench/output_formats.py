@@ -0,0 +1,65 @@
+"""
+Compares the write time, file size and read time of the lossless output formats in src.steg.OUTPUT_FORMATS.
+
+The reference set consists of synthetic photo-like images of several sizes and test/files/medium.png,
+images from an optional directory are used instead.
+
+Usage: python -m bench.output_formats [image directory]
+"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src import steg
+from src.shard import list_images
+
+SIZES = [(480, 640), (1080, 1920), (2000, 3000)]
+
+
+def synthetic_image(height, width, seed=0):
+    """Smooth gradients plus sensor noise, which compress roughly like a photograph."""
+    rng = np.random.default_rng(seed)
+    y = np.arange(height, dtype=np.float32)[:, None]
+    x = np.arange(width, dtype=np.float32)[None, :]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    for c in range(3):
+        # built channel by channel to keep large carriers within memory
+        image[..., c] = 123 + 100 * np.sin(x / (37 + 13 * c) + y / (53 + 7 * c))
+    image += rng.integers(0, 9, image.shape, dtype=np.uint8)
+    return image
+
+
+def reference_images(directory=None):
+    if directory is not None:
+        for filename in list_images(directory):
+            yield os.path.basename(filename), cv2.imread(filename)
+        return
+    for height, width in SIZES:
+        yield "synthetic {}x{}".format(width, height), synthetic_image(height, width)
+    yield "medium.png", cv2.imread(os.path.join("test", "files", "medium.png"))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else None
+    print("{:<24} {:<6} {:>10} {:>10} {:>10} {:>7}".format("image", "format", "write", "read", "size", "ratio"))
+    for name, image in reference_images(directory):
+        payload = os.urandom(image.size // 16)
+        hidden = steg.hide_data(image.copy(), payload, "bin")
+        for output_format in steg.OUTPUT_FORMATS:
+            data, write_time = timed(steg.encode_image, hidden, output_format)
+            _, read_time = timed(steg.load_image, data)
+            print("{:<24} {:<6} {:>9.3f}s {:>9.3f}s {:>8.1f}MB {:>6.2f}x".format(
+                name, output_format, write_time, read_time, len(data) / 1e6, hidden.nbytes / len(data)))
+
+
+if __name__ == "__main__":
+    main()
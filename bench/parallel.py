@@ -0,0 +1,77 @@
+"""
+Measures how band-parallel embedding and extraction scale with the number of threads on large images.
+
+For every bits-per-channel setting a payload filling the synthetic carrier is embedded and extracted with 1, 2, 4, ...
+threads up to the number of CPUs. Embedding is bit-pack plus embed, extraction is extract plus unpack (the parallel
+mode does both in one stage per band), header, encryption and checksum are not included.
+
+Usage: python -m bench.parallel [-s MEGAPIXELS] [-b BITS ...] [-w WORKERS ...] [-r REPEAT]
+"""
+import argparse
+import os
+import statistics
+
+from bench.output_formats import synthetic_image
+from bench.suite import FILETYPE, image_dimensions
+from src import instrument, steg
+from src.capacity import capacity
+from src.header import VersionedHeader
+
+EMBED_STAGES = ("bit-pack", "embed")
+EXTRACT_STAGES = ("extract", "unpack")
+
+
+def default_workers():
+    workers, count = [], 1
+    while count < (os.cpu_count() or 1):
+        workers.append(count)
+        count *= 2
+    return workers + [os.cpu_count() or 1]
+
+
+def measure(image, payload, bits, workers):
+    """
+    Embed and extract the payload once.
+
+    :return: A tuple (embed seconds, extract seconds).
+    """
+    profile = instrument.Profile()
+    with instrument.listening(profile):
+        hidden = steg.hide_data(image.copy(), payload, FILETYPE, setup=[bits, True], checksum=False, workers=workers)
+        values, _ = steg.extract_data(hidden, workers=workers)
+    if values != payload:
+        raise RuntimeError("Extracted payload differs with {} workers".format(workers))
+    stages = profile.stages()
+    return tuple(sum(stages[name]["duration"] for name in names if name in stages)
+                 for names in (EMBED_STAGES, EXTRACT_STAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scaling of band-parallel embed and extract")
+    parser.add_argument("-s", "--megapixels", type=float, default=50, help="Size of the carrier")
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=[1, 2, 4], help="Bits per channel")
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=default_workers(), help="Thread counts")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Runs per setting, the median is reported")
+    args = parser.parse_args()
+
+    height, width = image_dimensions(args.megapixels)
+    image = synthetic_image(height, width)
+    header_length = VersionedHeader().header_length(FILETYPE)
+    print("{:.0f} MP carrier, {} CPUs".format(height * width / 1e6, os.cpu_count()))
+    print("{:>4} {:>7} {:>9} {:>10} {:>8} {:>10} {:>8}".format("bits", "workers", "payload", "embed", "speedup",
+                                                               "extract", "speedup"))
+    for bits in args.bits:
+        payload = os.urandom(capacity(image.shape, bits, True, header_length) // 8)
+        baseline = None
+        for workers in args.workers:
+            runs = [measure(image, payload, bits, workers) for _ in range(args.repeat)]
+            embed = statistics.median(run[0] for run in runs)
+            extract = statistics.median(run[1] for run in runs)
+            baseline = baseline or (embed, extract)
+            print("{:>4} {:>7} {:>7.1f}MB {:>8.0f}ms {:>7.2f}x {:>8.0f}ms {:>7.2f}x".format(
+                bits, workers, len(payload) / 1e6, embed * 1000, baseline[0] / embed, extract * 1000,
+                baseline[1] / extract))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compares hiding messages in a fixed set of carriers by decoding the carrier on every call with hiding them through a
+src.pool.CarrierPool, which keeps the decoded carriers in memory.
+
+The carriers are synthetic photo-like PNGs written to a temporary directory, images from an optional directory are
+used instead. Every round hides a small message in each carrier, the first pooled round fills the cache.
+
+Usage: python -m bench.pool [-r ROUNDS] [--cache-size MB] [image directory]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+
+from src import steg
+from src.pool import CarrierPool
+from src.shard import list_images
+from bench.output_formats import synthetic_image
+
+SIZES = [(480, 640), (1080, 1920), (2000, 3000)]
+
+
+def write_carriers(directory):
+    for height, width in SIZES:
+        for seed in range(2):
+            cv2.imwrite(os.path.join(directory, "{}x{}-{}.png".format(width, height, seed)),
+                        synthetic_image(height, width, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Decoding carriers per call versus a carrier pool")
+    parser.add_argument("directory", nargs="?", help="Directory of carriers, synthetic ones by default")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="Times every carrier is used")
+    parser.add_argument("--cache-size", type=int, default=256, help="Memory of the pool for decoded carriers, in MB")
+    args = parser.parse_args()
+
+    directory = args.directory or tempfile.mkdtemp()
+    try:
+        if args.directory is None:
+            write_carriers(directory)
+        carriers = list_images(directory)
+        payload = os.urandom(1024)
+
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for carrier in carriers:
+                with open(carrier, "rb") as f:
+                    steg.encode_bytes(f.read(), payload, "bin", output_format="fast")
+        uncached = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pool = CarrierPool(directory, args.cache_size << 20)
+        index = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            for carrier in carriers:
+                pool.hide(payload, "bin", carrier=carrier, output_format="fast")
+        pooled = time.perf_counter() - start
+    finally:
+        if args.directory is None:
+            shutil.rmtree(directory)
+
+    calls = args.rounds * len(carriers)
+    stats = pool.stats()
+    print("{} carriers, {} calls".format(len(carriers), calls))
+    print("decode per call  {:>8.1f}ms per call".format(uncached / calls * 1000))
+    print("pool             {:>8.1f}ms per call  (index {:.1f}ms, {} hits, {} misses, {:.0f}MB cached)".format(
+        pooled / calls * 1000, index * 1000, stats.hits, stats.misses, stats.size / 1e6))
+    print("speedup          {:>8.2f}x".format(uncached / pooled))
+
+
+if __name__ == "__main__":
+    main()
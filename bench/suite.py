@@ -0,0 +1,161 @@
+"""
+Measures the throughput of every phase of the steg pipeline on synthetic carriers.
+
+Sweeps image sizes, 1-4 bits per channel, single and all channels, plain and encrypted payloads.
+Every configuration runs in a fresh process, so the reported peak RSS belongs to that configuration alone.
+For each phase the duration, MB/s and the peak RSS after the phase are recorded, the results are saved as JSON
+so runs of different commits can be compared.
+
+Usage: python -m bench.suite [-s MEGAPIXELS ...] [-b BITS ...] [-f FILL] [-o results.json]
+       python -m bench.suite compare baseline.json results.json
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from bench.output_formats import synthetic_image
+from src import steg
+from src.bitutils import bytes2symbols
+from src.capacity import ENCRYPTION_OVERHEAD, capacity
+from src.header import VersionedHeader
+from src.instrument import peak_rss
+
+SIZES = [0.1, 1, 5, 20, 50]
+KEY = b"0" * 32
+FILETYPE = "bin"
+
+
+def image_dimensions(megapixels):
+    width = int(math.sqrt(megapixels * 1e6 * 4 / 3))
+    return int(megapixels * 1e6) // width, width
+
+
+def run_configuration(config):
+    """Run all phases of one configuration, returns its result dict."""
+    height, width = image_dimensions(config["megapixels"])
+    carrier = steg.encode_image(synthetic_image(height, width), "fast")
+    key = KEY if config["encrypted"] else None
+    bits, all_channels = config["bits"], config["all_channels"]
+
+    header_length = VersionedHeader().header_length(FILETYPE)
+    available = capacity((height, width, 3), bits, all_channels, header_length) // 8
+    payload_size = int(available * config["fill"]) - (ENCRYPTION_OVERHEAD if key is not None else 0)
+    payload = os.urandom(max(payload_size, 1))
+    phases = {}
+
+    def phase(name, size, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        duration = time.perf_counter() - start
+        phases[name] = {
+            "seconds": duration,
+            "bytes": size,
+            "mb_per_s": size / 1e6 / duration if duration else None,
+            "peak_rss_mb": peak_rss(),
+        }
+        return result
+
+    image = phase("read", height * width * 3, steg.load_image, carrier)
+    msg = payload
+    if key is not None:
+        msg = phase("encrypt", len(payload), steg.encrypt, payload, key)
+    symbols = phase("bit-pack", len(msg), bytes2symbols, msg, bits)
+
+    def embed():
+        flat_image = image.reshape(-1, 3)
+        data_start = steg.embed_header(flat_image, len(msg) * 8, FILETYPE, bits, all_channels, key is not None)
+        steg.embed_message(flat_image, data_start, symbols, bits, all_channels)
+
+    phase("embed", len(msg), embed)
+    hidden = phase("write", image.nbytes, steg.encode_image, image)
+    values, _ = phase("extract", len(msg), steg.extract_data, steg.load_image(hidden))
+    if key is not None:
+        values = phase("decrypt", len(values), steg.decrypt, values, key)
+    if values != payload:
+        raise AssertionError("Roundtrip failed for {}".format(config))
+
+    return dict(config, shape=[height, width, 3], payload_bytes=len(payload), phases=phases)
+
+
+def configurations(sizes, bit_depths, fill):
+    for megapixels in sizes:
+        for bits in bit_depths:
+            for all_channels in (False, True):
+                for encrypted in (False, True):
+                    yield {"megapixels": megapixels, "bits": bits, "all_channels": all_channels,
+                           "encrypted": encrypted, "fill": fill}
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit or None,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def describe(result):
+    return "{:>5}MP {} bit {:<6} {:<9}".format(
+        result["megapixels"], result["bits"], "all" if result["all_channels"] else "single",
+        "encrypted" if result["encrypted"] else "plain")
+
+
+def run(args):
+    results = []
+    # a new process per configuration, so the peak RSS is not inherited from larger runs
+    with multiprocessing.get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        for result in pool.imap(run_configuration, configurations(args.sizes, args.bits, args.fill)):
+            results.append(result)
+            print(describe(result) + "  " + "  ".join(
+                "{} {:.0f}MB/s".format(name, phase["mb_per_s"] or float("inf")) for name, phase in result["phases"].items())
+                + "  peak {:.0f}MB".format(max(phase["peak_rss_mb"] for phase in result["phases"].values())), flush=True)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print("Results written to {}".format(args.output))
+
+
+def compare(baseline_filename, results_filename):
+    """Print the throughput ratio of every phase of matching configurations, > 1 means faster than the baseline."""
+    def load(filename):
+        with open(filename) as f:
+            data = json.load(f)
+        return {(r["megapixels"], r["bits"], r["all_channels"], r["encrypted"]): r for r in data["results"]}
+
+    baseline, results = load(baseline_filename), load(results_filename)
+    for configuration in sorted(baseline.keys() & results.keys()):
+        old, new = baseline[configuration]["phases"], results[configuration]["phases"]
+        ratios = ["{} {:.2f}x".format(name, old[name]["seconds"] / new[name]["seconds"])
+                  for name in new if name in old and new[name]["seconds"]]
+        print(describe(results[configuration]) + "  " + "  ".join(ratios))
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == "compare":
+        return compare(sys.argv[2], sys.argv[3])
+    parser = argparse.ArgumentParser(description="Throughput benchmark of the steg pipeline")
+    parser.add_argument("-s", "--sizes", type=float, nargs="+", default=SIZES, help="Carrier sizes in megapixels")
+    parser.add_argument("-b", "--bits", type=int, nargs="+", default=[1, 2, 3, 4], choices=range(1, 5), help="Bits per channel")
+    parser.add_argument("-f", "--fill", type=float, default=0.9, help="Share of the capacity used by the payload")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON file for the results")
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,180 @@
 import argparse
+import os
+import time
 
-import src.steg as steg
+from src.formats import OUTPUT_FORMATS
+
+# the methods import the modules they need, so --help and capacity start without loading cv2, numpy and cryptography
 
 
 def hide(args):
     print("-- HIDE --")
-    steg.encode(args.input_file, message_filename=args.file_to_be_hidden, key=args.key, hidden_filename=args.output)
+    settings = dict(message_filename=args.file_to_be_hidden, key=args.key, hidden_filename=args.output,
+                    output_format=args.format, compression=args.compression, scatter=args.scatter, compress=args.compress)
+    if args.stream:
+        import src.stream as stream
+        stream.encode_stream(args.input_file, **settings)
+    else:
+        import src.steg as steg
+        steg.encode(args.input_file, workers=args.workers, **settings)
 
 
 def reveal(args):
     print("-- REVEAL --")
-    steg.decode(args.input_file, key=args.key, output_name=args.output)
-    
+    if args.stream:
+        import src.stream as stream
+        stream.decode_stream(args.input_file, key=args.key, output_name=args.output)
+    else:
+        import src.steg as steg
+        steg.decode(args.input_file, key=args.key, output_name=args.output, workers=args.workers)
+
+
+def hide_shards(args):
+    print("-- HIDE SHARDS --")
+    import src.shard as shard
+    shard.encode_shards(args.input_file, args.file_to_be_hidden, hidden_prefix=args.output, key=args.key, workers=args.workers,
+                         output_format=args.format, compression=args.compression, scatter=args.scatter)
+
+
+def reveal_shards(args):
+    print("-- REVEAL SHARDS --")
+    import src.shard as shard
+    shard.decode_shards(args.input_file, key=args.key, output_name=args.output, workers=args.workers)
+
+
+def show_capacity(args):
+    print("-- CAPACITY --")
+    import src.capacity as capacity
+    payload_size = os.path.getsize(args.file_to_be_hidden) if args.file_to_be_hidden else 0
+    filetype = os.path.splitext(args.file_to_be_hidden or "")[1][1:]
+    encrypted = args.key is not None
+    compressed = False
+    if args.compress and args.file_to_be_hidden:
+        import src.compression as compression
+        with open(args.file_to_be_hidden, "rb") as f:
+            algorithm, payload = compression.compress(f.read(), None if args.compress is True else args.compress)
+        compressed = algorithm is not None
+        if compressed:
+            print("Compressed with {} from {} to {} bytes".format(compression.NAMES[algorithm], payload_size, len(payload)))
+            payload_size = len(payload)
+    if os.path.isdir(args.input_file):
+        ranking = capacity.rank_carriers(args.input_file, payload_size, filetype, encrypted, compressed)
+        for filename, plan in ranking:
+            bits, all_channels = plan["setup"]
+            print("{}  {}x{}  {} bit(s), {} channel(s)".format(filename, plan["shape"][1], plan["shape"][0], bits, plan["shape"][2] if all_channels else 1))
+        print("{} carrier(s) fit a payload of {} bytes".format(len(ranking), payload_size))
+        return
+    plan = capacity.plan(args.input_file, payload_size, filetype, encrypted, compressed)
+    channels = plan["shape"][2]
+    print("{}x{} pixels, {} channels, {} bits per channel".format(plan["shape"][1], plan["shape"][0], channels, plan["depth"]))
+    for (bits, all_channels), size in plan["capacity"].items():
+        print("{} bit(s), {} channel(s): {} bytes".format(bits, channels if all_channels else 1, size))
+    if plan["setup"] is None:
+        print("A payload of {} bytes does not fit".format(payload_size))
+    else:
+        print("Optimal setup for {} bytes: {} bit(s), {} channel(s)".format(payload_size, plan["setup"][0], channels if plan["setup"][1] else 1))
+
+
+def report_batch(results):
+    """
+    Print the outcome of every job of a batch followed by a summary.
+
+    :param results: An iterable of batch.JobResult.
+
+    :return: The number of failed jobs.
+    """
+    start = time.perf_counter()
+    total = failed = 0
+    for result in results:
+        total += 1
+        if result.error is None:
+            print("OK    {} ({:.2f}s)".format(result.job[0], result.duration))
+        else:
+            failed += 1
+            print("FAIL  {} - {}".format(result.job[0], result.error))
+    elapsed = time.perf_counter() - start
+    print("{}/{} jobs succeeded in {:.2f}s ({:.1f} jobs/s)".format(total - failed, total, elapsed, total / elapsed if elapsed else 0))
+    return failed
+
+
+def verify(args):
+    print("-- VERIFY --")
+    import src.batch as batch
+    import src.scan as scan
+    filenames = scan.find_images([args.input_file] + args.more_files)
+    return report_batch(batch.verify_batch(filenames, key=args.key, workers=args.workers))
+
+
+def inspect(args):
+    print("-- INSPECT --")
+    import src.scan as scan
+    filenames = scan.find_images([args.input_file] + args.more_files)
+    inspections = scan.inspect_images(filenames, args.workers)
+    rows = scan.write_report(inspections, args.output) if args.output else map(scan.report_row, inspections)
+    found = 0
+    for row in rows:
+        if row["payload"]:
+            found += 1
+            print("{}  {} bytes, filetype {!r}, {} bit(s), {} channel(s){}{}".format(
+                row["file"], row["size"], row["filetype"], row["bits"], row["channels"] if row["all_channels"] else 1,
+                ", encrypted" if row["encrypted"] else "", ", scattered" if row["scattered"] else ""))
+    print("{}/{} image(s) carry a message".format(found, len(filenames)))
+
+
+def hide_batch(args):
+    print("-- HIDE BATCH --")
+    import src.batch as batch
+    jobs = batch.read_manifest(args.input_file)
+    return report_batch(batch.encode_batch(jobs, key=args.key, workers=args.workers, output_format=args.format,
+                                           compression=args.compression, scatter=args.scatter, compress=args.compress))
+
+
+def reveal_batch(args):
+    print("-- REVEAL BATCH --")
+    import src.batch as batch
+    jobs = batch.directory_jobs(args.input_file, args.output)
+    return report_batch(batch.decode_batch(jobs, key=args.key, workers=args.workers))
+
 
 def main():
     parser = argparse.ArgumentParser(description="SteganoPy - Hide data inside of images")
-    parser.add_argument("method", choices=["hide", "reveal"], help="Method to execute")
-    parser.add_argument("input_file", help="Filename of medíum")
+    parser.add_argument("method", choices=["hide", "reveal", "hide-batch", "reveal-batch", "hide-shards", "reveal-shards", "capacity", "inspect", "verify", "serve"], help="Method to execute")
+    parser.add_argument("input_file", nargs="?", help="Filename of medíum (CSV manifest for hide-batch, directory for reveal-batch and the shard methods, file or directory for capacity, files or directories for inspect and verify, HOST:PORT or unix:PATH to listen on for serve)")
     parser.add_argument("-k", "--key", help="(Optional) AES key")
-    parser.add_argument("-o", "--output", help="(Optional) Filename of result")
+    parser.add_argument("-o", "--output", help="(Optional) Filename of result (output directory for reveal-batch, filename prefix for hide-shards, JSON or CSV report for inspect)")
+    parser.add_argument("-s", "--stream", action="store_true", help="(Optional) Process the message in chunks to bound memory usage")
+    parser.add_argument("-w", "--workers", type=int, help="(Optional) Number of worker processes for batches, shards, inspect, verify and serve, threads embedding or extracting in bands for hide and reveal (0 for one per CPU)")
+    parser.add_argument("-f", "--format", choices=list(OUTPUT_FORMATS), help="(Optional) Lossless output format of hidden images: png (default), fast (uncompressed PNG), small (smallest PNG), webp or tiff")
+    parser.add_argument("-c", "--compression", type=int, choices=range(10), metavar="[0-9]", help="(Optional) PNG compression level, overrides the level of the output format")
+    parser.add_argument("-r", "--scatter", action="store_true", help="(Optional) Scatter the message across the whole image, derived from the AES key")
+    parser.add_argument("-z", "--compress", nargs="?", const="auto", choices=["auto", "zlib", "lzma", "zstd"], help="(Optional) Compress the message before hiding it, the algorithm is chosen automatically unless given (zstd needs the zstandard package)")
+    parser.add_argument("-p", "--profile", action="store_true", help="(Optional) Print the time spent in each stage of hide and reveal")
+    parser.add_argument("--queue-size", type=int, default=64, help="(Optional) Number of jobs serve accepts at once, further requests get 503")
+    parser.add_argument("--max-request-size", type=int, default=64, help="(Optional) Largest request body serve accepts, in MB")
+    parser.add_argument("--max-response-size", type=int, default=256, help="(Optional) Largest message serve decompresses for reveal, in MB")
+    parser.add_argument("--carriers", help="(Optional) Directory of carriers serve hides in when a request sends no medium")
+    parser.add_argument("--cache-size", type=int, default=256, help="(Optional) Memory for decoded carriers per serve worker, in MB")
     args, unknown_args = parser.parse_known_args()
+    if args.input_file is None and args.method != "serve":
+        parser.error("the following arguments are required: input_file")
     if args.key:
         args.key = args.key.encode('utf-8')
-    if args.method == "hide":
+    if args.compress and args.method == "hide-shards":
+        parser.error("--compress is not supported for hide-shards")
+    args.compress = True if args.compress == "auto" else args.compress or False
+    if not args.profile:
+        return run(args, unknown_args)
+    import src.instrument as instrument
+    profile = instrument.Profile()
+    try:
+        with instrument.listening(profile):
+            run(args, unknown_args)
+    finally:
+        print(profile.report())
+
+
+def run(args, unknown_args):
+    if args.method in ("hide", "hide-shards"):
         # Create the argument parser specific to hide
         hide_parser = argparse.ArgumentParser(add_help=False)
         hide_parser.add_argument("file_to_be_hidden", help="File to be hidden")
@@ -31,9 +183,43 @@ def main():
         hide_args.input_file = args.input_file
         hide_args.key = args.key
         hide_args.output = args.output
-        hide(hide_args)
+        hide_args.stream = args.stream
+        hide_args.workers = args.workers
+        hide_args.format = args.format
+        hide_args.compression = args.compression
+        hide_args.scatter = args.scatter
+        hide_args.compress = args.compress
+        if args.method == "hide":
+            hide(hide_args)
+        else:
+            hide_shards(hide_args)
     elif args.method == "reveal":
         reveal(args)
+    elif args.method == "hide-batch":
+        if hide_batch(args):
+            raise SystemExit(1)
+    elif args.method == "reveal-batch":
+        if reveal_batch(args):
+            raise SystemExit(1)
+    elif args.method == "reveal-shards":
+        reveal_shards(args)
+    elif args.method == "serve":
+        import src.server as server
+        server.serve(args.input_file or "127.0.0.1:8080", args.workers, args.queue_size, args.max_request_size << 20,
+                     carriers=args.carriers, cache_size=args.cache_size << 20, max_response_size=args.max_response_size << 20)
+    elif args.method == "capacity":
+        capacity_parser = argparse.ArgumentParser(add_help=False)
+        capacity_parser.add_argument("file_to_be_hidden", nargs="?", help="File to be hidden")
+        args.file_to_be_hidden = capacity_parser.parse_args(unknown_args).file_to_be_hidden
+        show_capacity(args)
+    elif args.method in ("inspect", "verify"):
+        files_parser = argparse.ArgumentParser(add_help=False)
+        files_parser.add_argument("more_files", nargs="*", help="Further files or directories")
+        args.more_files = files_parser.parse_args(unknown_args).more_files
+        if args.method == "inspect":
+            inspect(args)
+        elif verify(args):
+            raise SystemExit(1)
 
 
 if __name__ == "__main__":
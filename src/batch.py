@@ -0,0 +1,134 @@
+import csv
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import raw, steg, stream
+
+JobResult = namedtuple("JobResult", ["job", "error", "duration"])
+
+
+def _encode_job(medium_filename, message_filename, hidden_filename, key=None, output_format=None, compression=None,
+                scatter=False, compress=False):
+    steg.encode(medium_filename, message_filename, hidden_filename, key=key, output_format=output_format, compression=compression,
+                scatter=scatter, compress=compress)
+
+
+def _decode_job(filename, output_name, key=None):
+    steg.decode(filename, key=key, output_name=output_name)
+
+
+def _verify_job(filename, key=None):
+    stream.verify_stream(filename, key=key)
+
+
+def _run_job(func, job, kwargs):
+    start = time.perf_counter()
+    try:
+        func(*job, **kwargs)
+        error = None
+    except Exception as e:
+        error = "{}: {}".format(type(e).__name__, e)
+    return JobResult(job, error, time.perf_counter() - start)
+
+
+def run_batch(func, jobs, workers=None, **kwargs):
+    """
+    Run many jobs across a pool of worker processes.
+
+    A failing job does not abort the batch, its error is reported in the result instead.
+
+    :param func: A picklable function called as func(*job, **kwargs) for every job.
+    :param jobs: An iterable of argument tuples.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+
+    :return: A generator yielding a JobResult(job, error, duration) for every job as soon as it finishes,
+             error is None on success.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_run_job, func, tuple(job), kwargs) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def encode_batch(jobs, key=None, workers=None, output_format=None, compression=None, scatter=False, compress=False):
+    """
+    Hide many messages in parallel.
+
+    :param jobs: An iterable of (medium_filename, message_filename, hidden_filename) tuples.
+    :param key: (Optional) The encryption key used for all messages.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+    :param output_format: (Optional) The name of the format in steg.OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+    :param scatter: (Optional) Scatter the messages across the whole images with a permutation derived from the key.
+    :param compress: (Optional) Compress the messages before hiding them, True or the name of an algorithm, see steg.hide_data.
+
+    :return: A generator yielding a JobResult for every job as soon as it finishes.
+    """
+    return run_batch(_encode_job, jobs, workers, key=key, output_format=output_format, compression=compression,
+                     scatter=scatter, compress=compress)
+
+
+def decode_batch(jobs, key=None, workers=None):
+    """
+    Reveal many messages in parallel.
+
+    :param jobs: An iterable of (filename, output_name) tuples.
+    :param key: (Optional) The decryption key used for all messages.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+
+    :return: A generator yielding a JobResult for every job as soon as it finishes.
+    """
+    return run_batch(_decode_job, jobs, workers, key=key)
+
+
+def verify_batch(filenames, key=None, workers=None):
+    """
+    Check the integrity of many hidden messages in parallel, without writing them.
+
+    :param filenames: An iterable of image filenames.
+    :param key: (Optional) The key used for all messages, needed for scattered messages.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+
+    :return: A generator yielding a JobResult for every image as soon as it is checked.
+    """
+    return run_batch(_verify_job, ((filename,) for filename in filenames), workers, key=key)
+
+
+def read_manifest(manifest_filename):
+    """
+    Read the jobs of a hide batch from a CSV manifest.
+
+    The manifest needs the columns medium, message and output.
+
+    :param manifest_filename: The filename of the CSV manifest.
+
+    :return: A list of (medium_filename, message_filename, hidden_filename) tuples.
+
+    :raises ValueError: If a column is missing.
+    """
+    with open(manifest_filename, newline="") as f:
+        reader = csv.DictReader(f)
+        missing = {"medium", "message", "output"} - set(reader.fieldnames or [])
+        if missing:
+            raise ValueError("Manifest is missing the column(s) {}".format(", ".join(sorted(missing))))
+        return [(row["medium"], row["message"], row["output"]) for row in reader]
+
+
+def directory_jobs(directory, output_directory=None, extensions=steg.OUTPUT_EXTENSIONS + raw.RAW_EXTENSIONS):
+    """
+    Create reveal jobs for all images in a directory.
+
+    :param directory: The directory containing the images.
+    :param output_directory: (Optional) The directory for the revealed messages, defaults to the current directory.
+    :param extensions: The file extensions of the images to include.
+
+    :return: A list of (filename, output_name) tuples, the output is named after the image.
+    """
+    jobs = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() in extensions:
+            jobs.append((os.path.join(directory, name), os.path.join(output_directory or "", stem)))
+    return jobs
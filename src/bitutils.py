@@ -31,3 +31,64 @@ def bits2string(input_bits=None):
         # convert byte to unicode character
         output_string += chr(int(byte, 2))
     return output_string
+
+
+def bytes2symbols(data, bits=1):
+    """
+        Splits a byte sequence into n-bit symbols (most significant bit first).
+
+        The last symbol is padded with zeros on the right if the number of bits
+        in data is not a multiple of bits.
+
+        :param data: The input bytes (or a uint8 array).
+        :param bits: The number of bits per symbol, 1-8.
+
+        :return: A uint8 array containing one symbol per element.
+    """
+    import numpy as np
+
+    if not 1 <= bits <= 8:
+        raise ValueError("Only 1-8 bits per symbol are supported")
+    data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else np.asarray(data, dtype=np.uint8)
+    if bits == 8:
+        return data.copy()
+    if 8 % bits == 0:
+        # symbols never cross byte boundaries, so shift/mask is enough
+        shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+        return ((data[:, None] >> shifts) & ((1 << bits) - 1)).ravel()
+    unpacked = np.unpackbits(data)
+    unpacked = np.pad(unpacked, (0, -len(unpacked) % bits)).reshape(-1, bits)
+    # left-pad every symbol to a full byte so packbits yields its value
+    padded = np.pad(unpacked, ((0, 0), (8 - bits, 0)))
+    return np.packbits(padded, axis=1).ravel()
+
+
+def symbols2bytes(symbols, bits=1, length=None, offset=0):
+    """
+        Joins n-bit symbols (most significant bit first) back into bytes.
+
+        :param symbols: An integer array of symbols, only the lowest bits of each element are used.
+        :param bits: The number of bits per symbol, 1-8.
+        :param length: (Optional) The number of bits to keep, defaults to all bits.
+        :param offset: (Optional) The number of leading bits of the first symbol to skip.
+
+        :return: The resulting bytes, the last byte is padded with zeros if length is not a multiple of 8.
+    """
+    import numpy as np
+
+    if not 1 <= bits <= 8:
+        raise ValueError("Only 1-8 bits per symbol are supported")
+    symbols = np.asarray(symbols).ravel()
+    if length is None:
+        length = len(symbols) * bits - offset
+    nr_symbols = -(-(offset + length) // bits)
+    if len(symbols) < nr_symbols:
+        raise ValueError("Not enough symbols for {} bits".format(length))
+    symbols = (symbols[:nr_symbols] & ((1 << bits) - 1)).astype(np.uint8)
+    if offset == 0 and length % 8 == 0 and 8 % bits == 0:
+        # symbols never cross byte boundaries, so shift/or is enough
+        grouped = symbols.reshape(-1, 8 // bits)
+        shifts = np.arange(8 - bits, -1, -bits, dtype=np.uint8)
+        return np.bitwise_or.reduce(grouped << shifts, axis=1).astype(np.uint8).tobytes()
+    unpacked = np.unpackbits(symbols[:, None], axis=1)[:, 8 - bits:].ravel()
+    return np.packbits(unpacked[offset:offset + length]).tobytes()
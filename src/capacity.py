@@ -0,0 +1,309 @@
+import io
+import math
+import os
+import struct
+from collections import namedtuple
+from os import path
+
+from .header import *
+from . import raw, video
+
+MAX_BITS_PER_CHANNEL = 4
+# 8 bits of a 16-bit channel change it by less than one step of an 8-bit channel
+MAX_BITS_PER_CHANNEL_16 = 8
+ENCRYPTION_OVERHEAD = 28
+
+ImageInfo = namedtuple("ImageInfo", ["shape", "depth"])
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG color types with an alpha channel, grayscale with alpha and RGBA
+PNG_ALPHA_TYPES = (4, 6)
+# start of frame markers, excluding DHT (C4), JPG (C8) and DAC (CC)
+JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def max_bits_per_channel(depth=8):
+    """
+    :param depth: The number of bits per channel of the medium, 8 or 16.
+
+    :return: The largest number of bits per channel a message may use.
+    """
+    return MAX_BITS_PER_CHANNEL_16 if depth == 16 else MAX_BITS_PER_CHANNEL
+
+
+def modes(depth=8):
+    """
+    :param depth: The number of bits per channel of the medium, 8 or 16.
+
+    :return: The (bits per channel, use all channels) modes of the medium, in the order they are preferred.
+    """
+    return [(1, False)] + [(bits, True) for bits in range(1, max_bits_per_channel(depth) + 1)]
+
+
+# the modes of 8-bit media
+MODES = modes()
+
+
+def medium_depth(medium):
+    """
+    :param medium: A decoded medium, or its shape.
+
+    :return: The number of bits per channel of the medium, shapes are taken to be 8-bit.
+    """
+    dtype = getattr(medium, "dtype", None)
+    return 8 if dtype is None else dtype.itemsize * 8
+
+
+def _png_info(f):
+    f.seek(len(PNG_SIGNATURE))
+    length, chunk_type, width, height, depth, color_type = struct.unpack(">I4sIIBB", f.read(18))
+    if chunk_type != b"IHDR":
+        raise ValueError("Invalid PNG file")
+    # images with an alpha channel or a transparent color are loaded with 4 channels, all others with 3
+    channels = 4 if color_type in PNG_ALPHA_TYPES else 3
+    if color_type in (2, 3):
+        # the transparency chunk precedes the image data, look for it as far as the data reaches
+        f.seek(len(PNG_SIGNATURE) + 8 + length + 4)
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                break
+            length, chunk_type = struct.unpack(">I4s", head)
+            if chunk_type == b"tRNS":
+                channels = 4
+            if chunk_type in (b"tRNS", b"IDAT", b"IEND"):
+                break
+            f.seek(length + 4, os.SEEK_CUR)
+    return (height, width, channels), 16 if depth == 16 else 8
+
+
+def _jpeg_info(f):
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            raise ValueError("Invalid JPEG file")
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("Invalid JPEG file")
+        marker = marker[0]
+        # markers without a segment
+        if marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            continue
+        length = struct.unpack(">H", f.read(2))[0]
+        if marker in JPEG_SOF_MARKERS:
+            _, height, width = struct.unpack(">BHH", f.read(5))
+            return (height, width, 3), 8
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def image_info(filename):
+    """
+    Read the shape and the bit depth of an image from its file header, without decoding any pixels.
+
+    Supports PNG, JPEG, the uncompressed carriers of src.raw and videos, whose frames are stacked into one image.
+
+    :param filename: The filename of the image.
+
+    :return: An ImageInfo(shape, depth), the shape (height, width, channels) and the bits per channel the image has
+             once loaded as medium.
+
+    :raises FileNotFoundError: If the image is not found.
+    :raises ValueError: If the image format is not supported or its header is truncated.
+    """
+    if raw.is_raw(filename):
+        shape, depth = raw.raw_info(filename)
+        return ImageInfo(tuple(shape), depth)
+    if video.is_video(filename):
+        return ImageInfo(video.video_shape(filename), 8)
+    with open(filename, "rb") as f:
+        return _encoded_info(f, filename)
+
+
+def image_shape(filename):
+    """
+    Read the shape of an image from its file header, without decoding any pixels, see image_info.
+
+    :param filename: The filename of the image.
+
+    :return: The shape (height, width, channels) the image has once loaded as medium.
+
+    :raises FileNotFoundError: If the image is not found.
+    :raises ValueError: If the image format is not supported.
+    """
+    return image_info(filename).shape
+
+
+def image_bytes_info(data):
+    """
+    Read the shape and the bit depth of an encoded image in memory from its header, without decoding any pixels.
+
+    :param data: The beginning of the encoded PNG or JPEG image as bytes, at least up to the dimensions. A transparent
+                 color of a PNG image is only noticed if the data reaches up to the image data.
+
+    :return: An ImageInfo(shape, depth) of the image once loaded as medium.
+
+    :raises ValueError: If the image format is not supported or its header is truncated.
+    """
+    return _encoded_info(io.BytesIO(data), "in-memory image")
+
+
+def image_bytes_shape(data):
+    """
+    Read the shape of an encoded image in memory from its header, without decoding any pixels, see image_bytes_info.
+
+    :param data: The beginning of the encoded PNG or JPEG image as bytes, at least up to the dimensions.
+
+    :return: The shape (height, width, channels) the image has once loaded as medium.
+
+    :raises ValueError: If the image format is not supported.
+    """
+    return image_bytes_info(data).shape
+
+
+def _encoded_info(f, name):
+    signature = f.read(8)
+    try:
+        if signature == PNG_SIGNATURE:
+            shape, depth = _png_info(f)
+        elif signature[:2] == b"\xff\xd8":
+            shape, depth = _jpeg_info(f)
+        else:
+            raise ValueError("Unsupported image format: {}".format(name))
+    except struct.error:
+        raise ValueError("Truncated image header: {}".format(name))
+    return ImageInfo(shape, depth)
+
+
+def capacity(shape, bits, all_channels, header_length=0):
+    """
+    Calculate how many message bits fit into a medium.
+
+    :param shape: The shape of the medium (height, width, channels).
+    :param bits: The number of bits per channel.
+    :param all_channels: Whether or not all channels are used.
+    :param header_length: The length of the header in bits, it is stored using one bit of every channel.
+
+    :return: The number of message bits that fit into the medium.
+    """
+    channels = shape[2] if len(shape) > 2 else 1
+    pixels = shape[0] * shape[1] - math.ceil(header_length / channels)
+    return max(pixels, 0) * bits * (channels if all_channels else 1)
+
+
+def get_optimal_setup(message_size, medium, header_length=0, depth=None):
+    """
+    Calculate the optimal settings needed to encode the message.
+
+    :param message_size: The size of the message in bits.
+    :param medium: The medium to hide the message in, or its shape.
+    :param header_length: (Optional) The length of the header in bits.
+    :param depth: (Optional) The bits per channel of the medium, by default taken from the medium (see medium_depth).
+
+    :return: A list containing the optimal setup [bits_per_pixel, use_all_channels].
+    
+    :raises OverflowError: If the message does not fit into the medium.
+    """
+    shape = getattr(medium, "shape", medium)
+    for needed_bits, all_channels in modes(depth or medium_depth(medium)):
+        if message_size <= capacity(shape, needed_bits, all_channels, header_length):
+            return [needed_bits, all_channels]
+    raise OverflowError("Message does not fit into medium!")
+
+
+def ensure_correct_setup(setup, msg_size, medium, header_length=0, depth=None):
+    """
+    Ensures that the settings are suitable for hiding the message in the given medium.
+
+    :param setup: The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param msg_size: The size of the message in bits.
+    :param medium: The medium to hide the message in, or its shape.
+    :param header_length: (Optional) The length of the header in bits.
+    :param depth: (Optional) The bits per channel of the medium, by default taken from the medium (see medium_depth).
+
+    :return: The corrected setup if necessary, or the original setup if it is already valid.
+    """
+    depth = depth or medium_depth(medium)
+    if setup is None:
+        return get_optimal_setup(msg_size, medium, header_length, depth)
+    too_large = msg_size > capacity(getattr(medium, "shape", medium), setup[0], setup[1], header_length)
+    if setup[0] > max_bits_per_channel(depth) or too_large:
+        print("Invalid setup, choosing setup automatically...")
+        return get_optimal_setup(msg_size, medium, header_length, depth)
+    return setup
+
+
+def plan(medium, payload_size, filetype="", encrypted=False, compressed=False):
+    """
+    Plan how a payload fits into a medium, without decoding the medium.
+
+    :param medium: The filename of the medium, the encoded medium as bytes, its ImageInfo
+                   or its shape (taken to be 8-bit).
+    :param payload_size: The size of the payload in bytes, after compression if it is compressed.
+    :param filetype: (Optional) The filetype stored in the header.
+    :param encrypted: (Optional) Whether or not the payload will be encrypted.
+    :param compressed: (Optional) Whether or not the payload is compressed, which adds a field to the header.
+
+    :return: A dictionary with the shape, the bits per channel (depth), the capacity in bytes per
+             (bits per channel, use all channels) mode of the depth and the optimal setup
+             (None if the payload does not fit).
+    """
+    if isinstance(medium, str):
+        shape, depth = image_info(medium)
+    elif isinstance(medium, (bytes, bytearray)):
+        shape, depth = image_bytes_info(medium)
+    elif isinstance(medium, ImageInfo):
+        shape, depth = tuple(medium.shape), medium.depth
+    else:
+        shape, depth = tuple(medium), 8
+    # messages are hidden with a checksum in their header
+    flags = VersionedHeader.FLAG_CHECKSUM | (VersionedHeader.FLAG_COMPRESSED if compressed else 0)
+    header_length = VersionedHeader().header_length(filetype, flags)
+    message_size = (payload_size + (ENCRYPTION_OVERHEAD if encrypted else 0)) * 8
+    try:
+        setup = get_optimal_setup(message_size, shape, header_length, depth)
+    except OverflowError:
+        setup = None
+    return {
+        "shape": shape,
+        "depth": depth,
+        "capacity": {mode: capacity(shape, mode[0], mode[1], header_length) // 8 - (ENCRYPTION_OVERHEAD if encrypted else 0)
+                     for mode in modes(depth)},
+        "setup": setup,
+    }
+
+
+def rank_carriers(media, payload_size, filetype="", encrypted=False, compressed=False):
+    """
+    Rank candidate media for a payload, without decoding them.
+
+    Media needing fewer modified bits come first, ties are broken by the smallest total capacity
+    so large media stay available for large payloads. Unreadable media and media the payload
+    does not fit into are left out.
+
+    :param media: A directory or a list of filenames.
+    :param payload_size: The size of the payload in bytes, after compression if it is compressed.
+    :param filetype: (Optional) The filetype stored in the header.
+    :param encrypted: (Optional) Whether or not the payload will be encrypted.
+    :param compressed: (Optional) Whether or not the payload is compressed.
+
+    :return: A list of (filename, plan) tuples, best first.
+    """
+    if isinstance(media, str):
+        media = sorted(path.join(media, name) for name in os.listdir(media))
+    ranking = []
+    for filename in media:
+        try:
+            medium_plan = plan(filename, payload_size, filetype, encrypted, compressed)
+        except (OSError, ValueError):
+            continue
+        if medium_plan["setup"] is not None:
+            ranking.append((filename, medium_plan))
+    # the modes of 16-bit media extend those of 8-bit media, so their indices compare
+    ranking.sort(key=lambda item: (modes(item[1]["depth"]).index(tuple(item[1]["setup"])),
+                                   max(item[1]["capacity"].values())))
+    return ranking
@@ -0,0 +1,223 @@
+"""
+Compression of messages before they are encrypted and embedded.
+
+The algorithm is chosen from a quick estimate of the entropy of the message: data that is already compressed or
+encrypted is stored as is, otherwise zstd is used if the zstandard package is installed, lzma for small messages
+(where its better ratio is affordable) and zlib for everything else.
+"""
+import lzma
+import math
+import zlib
+from collections import Counter
+
+# the ids stored in the header
+ZLIB = 1
+LZMA = 2
+ZSTD = 3
+ALGORITHMS = {"zlib": ZLIB, "lzma": LZMA, "zstd": ZSTD}
+NAMES = {algorithm: name for name, algorithm in ALGORITHMS.items()}
+
+# messages with more bits of entropy per byte are not worth compressing
+MAX_ENTROPY = 7.5
+# bytes taken from the start, middle and end of a message to estimate its entropy
+SAMPLE_SIZE = 16 << 10
+# largest message compressed with lzma when choosing automatically
+LZMA_MAX_SIZE = 4 << 20
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 9
+# largest piece of output produced by one step of decompression, so a small message can not expand all at once
+OUTPUT_SIZE = 1 << 20
+# zstd can not bound the output of a step, the input is fed in slices this large instead
+ZSTD_INPUT_SIZE = 1 << 10
+
+
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available():
+    """
+    Get the names of the algorithms that can be used.
+
+    :return: A list of algorithm names, zstd is only included if the zstandard package is installed.
+    """
+    return [name for name, algorithm in ALGORITHMS.items() if algorithm != ZSTD or _zstd() is not None]
+
+
+def entropy(data):
+    """
+    Estimate the entropy of data from the byte frequencies of samples of it.
+
+    :param data: The data as bytes.
+
+    :return: The estimated entropy in bits per byte, between 0 and 8.
+    """
+    if len(data) > 3 * SAMPLE_SIZE:
+        middle = (len(data) - SAMPLE_SIZE) // 2
+        data = data[:SAMPLE_SIZE] + data[middle:middle + SAMPLE_SIZE] + data[-SAMPLE_SIZE:]
+    if not data:
+        return 0.0
+    counts = Counter(data).values()
+    return -sum(count / len(data) * math.log2(count / len(data)) for count in counts)
+
+
+def choose_algorithm(data, size=None):
+    """
+    Choose the compression algorithm for a message.
+
+    :param data: The message, or a sample of it (see entropy), as bytes.
+    :param size: (Optional) The size of the whole message in bytes, defaults to the size of data.
+
+    :return: The algorithm id, or None if the message should not be compressed.
+    """
+    if entropy(data) > MAX_ENTROPY:
+        return None
+    if _zstd() is not None:
+        return ZSTD
+    return LZMA if (len(data) if size is None else size) <= LZMA_MAX_SIZE else ZLIB
+
+
+def algorithm_id(algorithm):
+    """
+    Get the id of an algorithm.
+
+    :param algorithm: The name of the algorithm in ALGORITHMS.
+
+    :return: The algorithm id.
+
+    :raises ValueError: If the algorithm is unknown or not available.
+    """
+    if algorithm not in available():
+        raise ValueError("Unsupported compression {}, choose one of {}".format(algorithm, ", ".join(available())))
+    return ALGORITHMS[algorithm]
+
+
+def compressor(algorithm):
+    """
+    Create an object compressing data chunk by chunk.
+
+    :param algorithm: The algorithm id.
+
+    :return: An object with the methods compress(data) and flush(), both returning the next compressed bytes.
+    """
+    if algorithm == ZLIB:
+        return zlib.compressobj(ZLIB_LEVEL)
+    if algorithm == LZMA:
+        return lzma.LZMACompressor()
+    if algorithm == ZSTD and _zstd() is not None:
+        return _zstd().ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    raise ValueError("Unsupported compression algorithm {}".format(algorithm))
+
+
+def decompressor(algorithm):
+    """
+    Create an object decompressing data chunk by chunk.
+
+    :param algorithm: The algorithm id, as stored in the header.
+
+    :return: An object with the method decompress(data) returning the next decompressed bytes
+             and the attribute eof telling if the end of the compressed data was reached.
+
+    :raises ValueError: If the algorithm is unknown or not available.
+    """
+    if algorithm == ZLIB:
+        return zlib.decompressobj()
+    if algorithm == LZMA:
+        return lzma.LZMADecompressor()
+    if algorithm == ZSTD:
+        zstandard = _zstd()
+        if zstandard is None:
+            raise ValueError("The message is compressed with zstd, which needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise ValueError("Unsupported compression algorithm {}".format(algorithm))
+
+
+def compress(data, algorithm=None):
+    """
+    Compress a message, keeping it uncompressed if that is smaller.
+
+    :param data: The message as bytes.
+    :param algorithm: (Optional) The name of the algorithm in ALGORITHMS, chosen automatically if not given.
+
+    :return: A tuple (algorithm id or None if the message is not compressed, the compressed message).
+    """
+    algorithm = choose_algorithm(data) if algorithm is None else algorithm_id(algorithm)
+    if algorithm is None:
+        return None, data
+    c = compressor(algorithm)
+    compressed = c.compress(data) + c.flush()
+    if len(compressed) >= len(data):
+        return None, data
+    return algorithm, compressed
+
+
+def decompress(data, algorithm, max_size=None):
+    """
+    Decompress a message.
+
+    :param data: The compressed message as bytes.
+    :param algorithm: The algorithm id, as stored in the header.
+    :param max_size: (Optional) The largest accepted size of the decompressed message in bytes.
+
+    :return: The decompressed message.
+
+    :raises ValueError: If the compressed message is invalid, truncated or decompresses to more than max_size bytes.
+    """
+    return b"".join(decompress_chunks([data], algorithm, max_size))
+
+
+def _decompress_steps(d, algorithm, data):
+    # yield the output of the data step by step, each step produces at most OUTPUT_SIZE bytes
+    # (zstd: whatever ZSTD_INPUT_SIZE bytes expand to)
+    if algorithm == ZLIB:
+        while True:
+            output = d.decompress(data, OUTPUT_SIZE)
+            data = d.unconsumed_tail
+            yield output
+            if not data and len(output) < OUTPUT_SIZE:
+                return
+    elif algorithm == LZMA:
+        yield d.decompress(data, OUTPUT_SIZE)
+        while not d.eof and not d.needs_input:
+            yield d.decompress(b"", OUTPUT_SIZE)
+    else:
+        for start in range(0, len(data), ZSTD_INPUT_SIZE):
+            yield d.decompress(data[start:start + ZSTD_INPUT_SIZE])
+
+
+def decompress_chunks(chunks, algorithm, max_size=None):
+    """
+    Decompress a message chunk by chunk.
+
+    The output is produced in bounded steps, so max_size is enforced before a small message expands much further.
+
+    :param chunks: An iterable of the chunks of the compressed message.
+    :param algorithm: The algorithm id, as stored in the header.
+    :param max_size: (Optional) The largest accepted size of the decompressed message in bytes.
+
+    :return: A generator yielding the decompressed chunks.
+
+    :raises ValueError: If the compressed message is invalid, truncated or decompresses to more than max_size bytes.
+    """
+    d = decompressor(algorithm)
+    # lzma raises EOFError for data following the end of the compressed message
+    errors = (zlib.error, lzma.LZMAError, EOFError) + ((_zstd().ZstdError,) if algorithm == ZSTD else ())
+    size = 0
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            for output in _decompress_steps(d, algorithm, chunk):
+                size += len(output)
+                if max_size is not None and size > max_size:
+                    raise ValueError("The decompressed message exceeds {} bytes".format(max_size))
+                if output:
+                    yield output
+    except errors as e:
+        raise ValueError("Invalid compressed message: {}".format(e))
+    if not d.eof:
+        raise ValueError("Truncated compressed message")
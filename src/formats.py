@@ -0,0 +1,22 @@
+"""
+The lossless output formats of hidden images.
+
+The encoder parameters are given by the names of the cv2 constants, so the formats can be listed without importing cv2.
+"""
+
+# name: (file extension, {cv2.imencode parameter: value}), parameters missing from the installed cv2 are skipped
+OUTPUT_FORMATS = {
+    "png": (".png", {}),
+    # skip the row filters as well, they only help the compressor
+    "fast": (".png", {"IMWRITE_PNG_COMPRESSION": 0, "IMWRITE_PNG_FILTER": "IMWRITE_PNG_FILTER_NONE"}),
+    # the filtered strategy copes best with the noisy low bits of stego images
+    "small": (".png", {"IMWRITE_PNG_COMPRESSION": 9, "IMWRITE_PNG_STRATEGY": "IMWRITE_PNG_STRATEGY_FILTERED"}),
+    "webp": (".webp", {"IMWRITE_WEBP_QUALITY": 101}),
+    "tiff": (".tiff", {}),
+}
+# extensions of the images that can be read, in addition to the uncompressed ones in raw
+OUTPUT_EXTENSIONS = (".png", ".webp", ".tif", ".tiff")
+# extensions of the formats storing 16 bits per channel, cv2 silently reduces 16-bit images to 8 bits in the others
+DEEP_EXTENSIONS = (".png", ".tiff")
+# extensions of the formats keeping the color of transparent pixels, lossless WebP discards it where alpha is 0
+ALPHA_EXTENSIONS = (".png", ".tiff")
@@ -1,5 +1,24 @@
+from collections import namedtuple
+
 from .bitutils import *
 
+
+class Header(namedtuple("Header", ["version", "length", "filetype", "bits", "all_channels", "encrypted", "header_length",
+                                   "shard_id", "shard_index", "shard_count", "scattered", "checksum", "compression"],
+                        defaults=(None, None, None, False, None, None))):
+    """
+    A decoded header of any version, fields not supported by a version are None.
+    """
+    __slots__ = ()
+
+    @property
+    def shard(self):
+        """
+        The tuple (shard_id, shard_index, shard_count), or None if the message is not a shard.
+        """
+        return None if self.shard_id is None else (self.shard_id, self.shard_index, self.shard_count)
+
+
 class HeaderUtils:
     _instance = None
     
@@ -106,3 +125,219 @@ class HeaderUtils:
         all_channels = header[-2] == '1'
         encrypted = header[-1] == '1'
         return length, filetype, bits, all_channels, encrypted
+
+
+class VersionedHeader:
+    """
+    Header starting with a magic value and a version, followed by flags, the content length,
+    the bits per channel, a variable-length filetype and the optional fields enabled by the flags.
+
+    The magic value is never a multiple of 8, so it can not be mistaken for the content length
+    that starts a legacy header (which always counts whole bytes).
+    """
+    MAGIC = 0x535059  # "SPY"
+    MAGIC_BITS = 24
+    VERSION = 2
+    VERSION_BITS = 8
+    FLAGS_BITS = 8
+
+    FLAG_ALL_CHANNELS = 1 << 0
+    FLAG_ENCRYPTED = 1 << 1
+    FLAG_SHARD = 1 << 2
+    FLAG_SCATTERED = 1 << 3
+    FLAG_CHECKSUM = 1 << 4
+    FLAG_COMPRESSED = 1 << 5
+    SUPPORTED_FLAGS = FLAG_ALL_CHANNELS | FLAG_ENCRYPTED | FLAG_SHARD | FLAG_SCATTERED | FLAG_CHECKSUM | FLAG_COMPRESSED
+
+    # (flag, field name, bits) of the optional fields, in the order they are stored
+    OPTIONAL_FIELDS = (
+        (FLAG_SHARD, "shard_id", 32),
+        (FLAG_SHARD, "shard_index", 16),
+        (FLAG_SHARD, "shard_count", 16),
+        (FLAG_CHECKSUM, "checksum", 32),
+        (FLAG_COMPRESSED, "compression", 8),
+    )
+
+    def __init__(self, cl_bits=40, ft_length_bits=8, bpp=4):
+        """
+        Initializes a new instance of the VersionedHeader class.
+
+        :param cl_bits: The number of bits used to represent the content length.
+        :param ft_length_bits: The number of bits used to represent the length of the filetype in bytes.
+        :param bpp: The number of bits used to represent the bits per pixel.
+        """
+        self.content_length_bits = cl_bits
+        self.filetype_length_bits = ft_length_bits
+        self.bits_per_pixel = bpp
+
+        self.max_bits_per_pixel = 2**self.bits_per_pixel
+        self.max_filesize = 2**self.content_length_bits - 1
+        self.max_filetype_bytes = 2**self.filetype_length_bits - 1
+        self.fixed_length = self.MAGIC_BITS + self.VERSION_BITS + self.FLAGS_BITS + cl_bits + bpp + ft_length_bits
+
+
+    def header_length(self, filetype="", flags=0):
+        """
+        Calculates the length of a header.
+
+        :param filetype: The filetype.
+        :param flags: The flags of the header, they decide which optional fields are present.
+
+        :return: The length of the header in bits.
+        """
+        optional_length = sum(bits for flag, _, bits in self.OPTIONAL_FIELDS if flags & flag)
+        return self.fixed_length + len(filetype.encode('utf-8')) * 8 + optional_length
+
+
+    def required_length(self, header):
+        """
+        Calculates the length of a header from its beginning.
+
+        :param header: At least the first fixed_length bits of the encoded header.
+
+        :return: The length of the whole header in bits.
+        """
+        flags_start = self.MAGIC_BITS + self.VERSION_BITS
+        flags = int(header[flags_start:flags_start + self.FLAGS_BITS], 2)
+        filetype_length = int(header[self.fixed_length - self.filetype_length_bits:self.fixed_length], 2)
+        return self.header_length("", flags) + filetype_length * 8
+
+
+    def check_compatibility(self, content_length, filetype, bits_per_pixel, optional=None):
+        """
+        Checks if the input parameters are compatible with the header format.
+
+        :param content_length: The length of the message.
+        :param filetype: The filetype.
+        :param bits_per_pixel: The number of bits used per pixel.
+        :param optional: (Optional) A dictionary of optional field names and their values.
+
+        :raises: TypeError if any of the parameters are the wrong type.
+        :raises: OverflowError if any of the parameters are out of range.
+        """
+        if not isinstance(content_length, int):
+            raise TypeError("content_length should be an int")
+        if not isinstance(bits_per_pixel, int):
+            raise TypeError("bits_per_pixel should be an int")
+        if not isinstance(filetype, str):
+            raise TypeError("filetype should be a string")
+        for _, name, bits in self.OPTIONAL_FIELDS:
+            value = (optional or {}).get(name)
+            if value is not None and not 0 <= value < 2**bits:
+                raise OverflowError("{} out of range for header, max is {} - was given {}".format(name, 2**bits - 1, value))
+        if len(filetype.encode('utf-8')) > self.max_filetype_bytes:
+            raise OverflowError("Filetype too long for header, max is {} bytes - was given {}".format(self.max_filetype_bytes, len(filetype.encode('utf-8'))))
+        if content_length < 0 or content_length > self.max_filesize:
+            raise OverflowError("Content too large for header, max is {} bits - was given {}".format(self.max_filesize, content_length))
+        if bits_per_pixel <= 0 or bits_per_pixel > self.max_bits_per_pixel:
+            raise OverflowError("Unsupported bits per pixel, was given {} - range is [1,{}]".format(bits_per_pixel, self.max_bits_per_pixel))
+
+
+    def encode_header(self, content_length, filetype, bits_per_pixel, use_all_channels, encrypted, shard=None, scattered=False,
+                      checksum=None, compression=None):
+        """
+        Encodes the header to be embedded in the medium.
+
+        :param content_length: The length of the message.
+        :param filetype: The filetype.
+        :param bits_per_pixel: The number of bits used per pixel.
+        :param use_all_channels: Whether or not to use all channels.
+        :param encrypted: Whether or not the message is encrypted.
+        :param shard: (Optional) A tuple (shard_id, shard_index, shard_count) if the message is one shard of a larger payload.
+        :param scattered: (Optional) Whether or not the message is scattered across the image by a keyed permutation.
+        :param checksum: (Optional) The CRC32 of the message as stored in the medium.
+        :param compression: (Optional) The id of the algorithm the message was compressed with before encryption.
+
+        :return: The encoded header data.
+        """
+        optional = {}
+        if shard is not None:
+            optional.update(zip(("shard_id", "shard_index", "shard_count"), shard))
+        if checksum is not None:
+            optional["checksum"] = checksum
+        if compression is not None:
+            optional["compression"] = compression
+        self.check_compatibility(content_length, filetype, bits_per_pixel, optional)
+        flags = (self.FLAG_ALL_CHANNELS if use_all_channels else 0) | (self.FLAG_ENCRYPTED if encrypted else 0)
+        flags |= self.FLAG_SHARD if shard is not None else 0
+        flags |= self.FLAG_SCATTERED if scattered else 0
+        flags |= self.FLAG_CHECKSUM if checksum is not None else 0
+        flags |= self.FLAG_COMPRESSED if compression is not None else 0
+        filetype = filetype.encode('utf-8')
+        header = "{0:b}".format(self.MAGIC).zfill(self.MAGIC_BITS)
+        header += "{0:b}".format(self.VERSION).zfill(self.VERSION_BITS)
+        header += "{0:b}".format(flags).zfill(self.FLAGS_BITS)
+        header += "{0:b}".format(content_length).zfill(self.content_length_bits)
+        header += "{0:b}".format(bits_per_pixel - 1).zfill(self.bits_per_pixel)
+        header += "{0:b}".format(len(filetype)).zfill(self.filetype_length_bits)
+        header += ''.join(format(byte, '08b') for byte in filetype)
+        for flag, name, bits in self.OPTIONAL_FIELDS:
+            if flags & flag:
+                header += "{0:b}".format(optional[name]).zfill(bits)
+        return header
+
+
+    def decode_header(self, header):
+        """
+        Decodes the header data for later extraction of content.
+
+        :param header: The encoded header, data following the header is ignored.
+
+        :return: The decoded Header.
+
+        :raises: ValueError if the header is invalid or of another version.
+        """
+        if not all(c in '01' for c in header):
+            raise ValueError("Invalid characters in header")
+        if len(header) < self.fixed_length:
+            raise ValueError("Mismatched header size")
+        fields = []
+        position = 0
+        for size in (self.MAGIC_BITS, self.VERSION_BITS, self.FLAGS_BITS, self.content_length_bits, self.bits_per_pixel, self.filetype_length_bits):
+            fields.append(int(header[position:position + size], 2))
+            position += size
+        magic, version, flags, length, bits, filetype_length = fields
+        if magic != self.MAGIC or version != self.VERSION:
+            raise ValueError("Unsupported header version")
+        if flags & ~self.SUPPORTED_FLAGS:
+            raise ValueError("Unsupported header flags")
+        header_length = self.header_length("", flags) + filetype_length * 8
+        if len(header) < header_length:
+            raise ValueError("Mismatched header size")
+        filetype_end = position + filetype_length * 8
+        filetype = bytes(int(header[i:i + 8], 2) for i in range(position, filetype_end, 8))
+        try:
+            filetype = filetype.decode('utf-8')
+        except UnicodeDecodeError:
+            raise ValueError("Invalid filetype in header")
+        position = filetype_end
+        optional = {}
+        for flag, name, size in self.OPTIONAL_FIELDS:
+            if flags & flag:
+                optional[name] = int(header[position:position + size], 2)
+                position += size
+        return Header(self.VERSION, length, filetype, bits + 1, bool(flags & self.FLAG_ALL_CHANNELS),
+                      bool(flags & self.FLAG_ENCRYPTED), header_length, scattered=bool(flags & self.FLAG_SCATTERED), **optional)
+
+
+def decode_header(read_bits):
+    """
+    Decodes a header of any version, detecting the version automatically.
+
+    :param read_bits: The header as a binary string (data following the header is ignored),
+                      or a function returning the first n bits of the medium as a binary string.
+
+    :return: The decoded Header, legacy headers are reported as version 1.
+
+    :raises: ValueError if the header is invalid.
+    """
+    if not callable(read_bits):
+        header = read_bits
+        read_bits = lambda n: header[:n]
+    versioned = VersionedHeader()
+    prefix = read_bits(versioned.MAGIC_BITS)
+    if prefix == "{0:b}".format(versioned.MAGIC).zfill(versioned.MAGIC_BITS):
+        return versioned.decode_header(read_bits(versioned.required_length(read_bits(versioned.fixed_length))))
+    legacy = HeaderUtils()
+    length, filetype, bits, all_channels, encrypted = legacy.decode_header(read_bits(legacy.header_length))
+    return Header(1, length, filetype, bits, all_channels, encrypted, legacy.header_length)
@@ -0,0 +1,193 @@
+"""
+Timing and memory instrumentation of the pipeline stages.
+
+The stages are wrapped in span(name, nbytes), every finished span is passed as a SpanEvent to the registered listeners.
+Without listeners span returns a shared no-op context, so the instrumentation costs one function call per stage.
+"""
+import json
+import logging
+import sys
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+SpanEvent = namedtuple("SpanEvent", ["name", "duration", "bytes", "peak_rss"])
+
+_listeners = []
+
+
+def peak_rss():
+    """
+    Get the peak resident set size of the process.
+
+    :return: The peak RSS in MB, or None if it can not be determined on this platform.
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1 << 20) if sys.platform == "darwin" else rss / 1024
+
+
+class _Span:
+    __slots__ = ("name", "bytes", "start")
+
+    def __init__(self, name, nbytes):
+        self.name = name
+        self.bytes = nbytes
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        event = SpanEvent(self.name, time.perf_counter() - self.start, self.bytes, peak_rss())
+        for listener in list(_listeners):
+            listener(event)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(name, nbytes=0):
+    """
+    Measure a pipeline stage.
+
+    Use as "with span(name, nbytes) as s:", the number of bytes can also be set later by assigning s.bytes.
+
+    :param name: The name of the stage.
+    :param nbytes: (Optional) The number of bytes processed by the stage.
+
+    :return: A context manager reporting a SpanEvent to all listeners when it exits.
+    """
+    if not _listeners:
+        return NULL_SPAN
+    return _Span(name, nbytes)
+
+
+def add_listener(listener):
+    """
+    Register a callable receiving a SpanEvent for every finished stage.
+
+    :param listener: The callable.
+    """
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    """
+    Unregister a listener registered by add_listener.
+
+    :param listener: The callable.
+    """
+    _listeners.remove(listener)
+
+
+@contextmanager
+def listening(listener):
+    """
+    Register a listener for the duration of a with block.
+
+    :param listener: A callable receiving a SpanEvent for every finished stage.
+
+    :return: A context manager yielding the listener.
+    """
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+
+def mb_per_s(event):
+    if not event.bytes or not event.duration:
+        return None
+    return event.bytes / 1e6 / event.duration
+
+
+class LogCollector:
+    """
+    A listener logging every span as a JSON object.
+
+    :param logger: (Optional) The logger, defaults to the "stegapy" logger.
+    :param level: (Optional) The log level, defaults to logging.INFO.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger("stegapy")
+        self.level = level
+
+    def __call__(self, event):
+        record = {
+            "span": event.name,
+            "duration_ms": round(event.duration * 1000, 3),
+            "bytes": event.bytes,
+            "mb_per_s": mb_per_s(event),
+            "peak_rss_mb": event.peak_rss,
+        }
+        self.logger.log(self.level, json.dumps(record), extra={"span": record})
+
+
+class Profile:
+    """
+    A listener collecting all spans, report() summarizes them per stage.
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+    def stages(self):
+        """
+        Aggregate the collected spans per stage, in the order the stages first occurred.
+
+        :return: A dict mapping the stage name to a dict with the keys calls, duration, bytes and peak_rss.
+        """
+        stages = {}
+        for event in self.events:
+            stage = stages.setdefault(event.name, {"calls": 0, "duration": 0.0, "bytes": 0, "peak_rss": None})
+            stage["calls"] += 1
+            stage["duration"] += event.duration
+            stage["bytes"] += event.bytes
+            if event.peak_rss is not None:
+                stage["peak_rss"] = max(stage["peak_rss"] or 0, event.peak_rss)
+        return stages
+
+    def report(self):
+        """
+        Format the per-stage breakdown as a table.
+
+        :return: The table as a string.
+        """
+        stages = self.stages()
+        total = sum(stage["duration"] for stage in stages.values())
+        lines = ["{:<14} {:>5} {:>10} {:>6} {:>10} {:>9} {:>9}".format(
+            "stage", "calls", "time", "share", "size", "MB/s", "peak RSS")]
+        for name, stage in stages.items():
+            rate = mb_per_s(SpanEvent(name, stage["duration"], stage["bytes"], None))
+            lines.append("{:<14} {:>5} {:>8.1f}ms {:>5.1f}% {:>8.2f}MB {:>9} {:>9}".format(
+                name, stage["calls"], stage["duration"] * 1000, 100 * stage["duration"] / total if total else 0,
+                stage["bytes"] / 1e6, "{:.1f}".format(rate) if rate else "-",
+                "{:.0f}MB".format(stage["peak_rss"]) if stage["peak_rss"] is not None else "-"))
+        lines.append("{:<14} {:>5} {:>8.1f}ms".format("total", len(self.events), total * 1000))
+        return "\n".join(lines)
@@ -0,0 +1,78 @@
+"""
+Band-parallel processing of large images on a thread pool.
+
+The message is split into bands of consecutive symbols (and so of consecutive pixel rows), every band is processed by
+a thread writing into its own part of a preallocated output. NumPy releases the GIL in the ufuncs doing the work, so
+the bands run on several cores. The thread pools are created once per worker count and reused.
+"""
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# smallest band worth a thread of its own, in symbols
+MIN_BAND_SIZE = 1 << 20
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def thread_pool(workers):
+    """
+    Get the thread pool for a number of workers, it is created on first use.
+
+    :param workers: The number of threads.
+
+    :return: A ThreadPoolExecutor.
+    """
+    with _lock:
+        if workers not in _executors:
+            _executors[workers] = ThreadPoolExecutor(workers, thread_name_prefix="band")
+        return _executors[workers]
+
+
+def resolve_workers(workers):
+    """
+    :param workers: The requested number of threads, 0 for one per CPU, None or 1 to work serially.
+
+    :return: The number of threads to use.
+    """
+    if workers == 0:
+        return os.cpu_count() or 1
+    return max(workers or 1, 1)
+
+
+def bands(count, workers, unit=1, min_size=MIN_BAND_SIZE):
+    """
+    Split a range of symbols into bands of roughly equal size.
+
+    :param count: The number of symbols.
+    :param workers: The number of threads.
+    :param unit: (Optional) Every band but the last starts and ends at a multiple of unit.
+    :param min_size: (Optional) The smallest band, fewer bands than workers are used for small ranges.
+
+    :return: A list of (first, end) symbol ranges covering range(count).
+    """
+    nr_bands = max(min(resolve_workers(workers), count // max(min_size, 1)), 1)
+    size = max(math.ceil(math.ceil(count / nr_bands) / unit) * unit, 1)
+    return [(first, min(first + size, count)) for first in range(0, count, size)] or [(0, 0)]
+
+
+def run(func, ranges, workers):
+    """
+    Call func(first, end) for every band, on the thread pool if there is more than one band.
+
+    :param func: The function processing one band.
+    :param ranges: The bands, see bands.
+    :param workers: The number of threads.
+
+    :raises Exception: The first exception raised by func, after all bands finished.
+    """
+    if len(ranges) == 1:
+        func(*ranges[0])
+        return
+    futures = [thread_pool(resolve_workers(workers)).submit(func, first, end) for first, end in ranges]
+    # the bands write into shared buffers, so none may still be running when returning or raising
+    wait(futures)
+    for future in futures:
+        future.result()
@@ -0,0 +1,182 @@
+"""
+A pool of carrier images that are reused for many messages.
+
+The pool indexes the carriers once, reading only their file headers, and keeps the decoded pixels of recently used
+carriers in memory, so hiding a message does not decode the carrier again. The cache is bounded by the total size of
+the decoded pixels, the least recently used carriers are evicted first.
+"""
+import bisect
+import threading
+from collections import OrderedDict, namedtuple
+
+from .capacity import ENCRYPTION_OVERHEAD, capacity, modes
+from .header import VersionedHeader
+from . import shard, steg
+
+CACHE_SIZE = 256 << 20
+
+Carrier = namedtuple("Carrier", ["filename", "shape", "capacity"])
+CacheStats = namedtuple("CacheStats", ["hits", "misses", "evictions", "size", "count"])
+
+
+class CarrierPool:
+    """
+    An index of carrier images with an LRU cache of their decoded pixels, safe to use from several threads.
+    """
+
+    def __init__(self, carriers, cache_size=CACHE_SIZE):
+        """
+        :param carriers: A directory or a list of filenames of the carriers.
+        :param cache_size: (Optional) The largest total size of the decoded pixels kept in memory, in bytes.
+
+        :raises FileNotFoundError: If a carrier is not found.
+        """
+        self.cache_size = cache_size
+        self.carriers = []
+        for filename in shard.list_images(carriers):
+            shape, depth = shard.image_info(filename)
+            # message bits per mode of the bit depth, before the header is taken off
+            self.carriers.append(Carrier(filename, shape, {mode: capacity(shape, *mode) for mode in modes(depth)}))
+        # sorted by the capacity at the densest mode, so the smallest carrier that can fit a payload is found by bisection
+        self.carriers.sort(key=lambda carrier: (max(carrier.capacity.values()), carrier.filename))
+        self._largest = [max(carrier.capacity.values()) for carrier in self.carriers]
+        self._by_filename = {carrier.filename: carrier for carrier in self.carriers}
+        self._cache = OrderedDict()
+        self._cached_bytes = 0
+        self._hits = self._misses = self._evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.carriers)
+
+    def carrier(self, filename):
+        """
+        Get a carrier of the pool.
+
+        :param filename: The filename of the carrier.
+
+        :return: The Carrier(filename, shape, capacity), capacity maps every mode of the bit depth of the image
+                 (see capacity.modes) to the number of message bits the whole image holds.
+
+        :raises KeyError: If the carrier is not in the pool.
+        """
+        return self._by_filename[filename]
+
+    def fits(self, carrier, payload_size, filetype="", encrypted=False, compressed=False, setup=None):
+        """
+        Check if a payload fits into a carrier.
+
+        :param carrier: The Carrier.
+        :param payload_size: The size of the payload in bytes, after compression if it is compressed.
+        :param filetype: (Optional) The filetype stored in the header.
+        :param encrypted: (Optional) Whether or not the payload will be encrypted.
+        :param compressed: (Optional) Whether or not the payload is compressed.
+        :param setup: (Optional) The setup [bits_per_pixel, use_all_channels] the payload has to fit at,
+                      by default any mode of the carrier will do.
+
+        :return: True if the payload fits.
+        """
+        message_size = (payload_size + (ENCRYPTION_OVERHEAD if encrypted else 0)) * 8
+        header_length = VersionedHeader().header_length(filetype, steg.header_flags(compressed=compressed))
+        if setup is None:
+            candidates = carrier.capacity
+        elif setup[0] <= max(bits for bits, _ in carrier.capacity):
+            candidates = [tuple(setup)]
+        else:
+            # more bits per channel than the bit depth of the carrier allows
+            return False
+        return any(message_size <= capacity(carrier.shape, bits, all_channels, header_length)
+                   for bits, all_channels in candidates)
+
+    def smallest_fit(self, payload_size, filetype="", encrypted=False, compressed=False, setup=None):
+        """
+        Find the smallest carrier a payload fits into.
+
+        :param payload_size: The size of the payload in bytes, after compression if it is compressed.
+        :param filetype: (Optional) The filetype stored in the header.
+        :param encrypted: (Optional) Whether or not the payload will be encrypted.
+        :param compressed: (Optional) Whether or not the payload is compressed.
+        :param setup: (Optional) The setup [bits_per_pixel, use_all_channels] the payload has to fit at.
+
+        :return: The Carrier with the smallest capacity the payload fits into.
+
+        :raises OverflowError: If the payload fits into no carrier.
+        """
+        message_size = (payload_size + (ENCRYPTION_OVERHEAD if encrypted else 0)) * 8
+        # carriers holding fewer bits than the message at the densest mode can not fit it
+        for carrier in self.carriers[bisect.bisect_left(self._largest, message_size):]:
+            if self.fits(carrier, payload_size, filetype, encrypted, compressed, setup):
+                return carrier
+        raise OverflowError("The payload of {} bytes fits into none of the {} carriers".format(payload_size, len(self)))
+
+    def load(self, filename):
+        """
+        Get the decoded pixels of a carrier, from the cache if possible.
+
+        :param filename: The filename of the carrier.
+
+        :return: The pixels as a read-only array, copy it before modifying it.
+
+        :raises KeyError: If the carrier is not in the pool.
+        :raises FileNotFoundError: If the carrier can not be decoded.
+        """
+        self.carrier(filename)
+        with self._lock:
+            image = self._cache.get(filename)
+            if image is not None:
+                self._cache.move_to_end(filename)
+                self._hits += 1
+                return image
+            self._misses += 1
+        # decode outside the lock, so other threads can use the cache meanwhile
+        image = steg.read_image(filename)
+        if image is None:
+            raise FileNotFoundError("Medium not found: {}".format(filename))
+        image.flags.writeable = False
+        with self._lock:
+            if filename not in self._cache and image.nbytes <= self.cache_size:
+                self._cache[filename] = image
+                self._cached_bytes += image.nbytes
+                while self._cached_bytes > self.cache_size:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cached_bytes -= evicted.nbytes
+                    self._evictions += 1
+        return image
+
+    def stats(self):
+        """
+        :return: The CacheStats(hits, misses, evictions, size in bytes, number of cached carriers).
+        """
+        with self._lock:
+            return CacheStats(self._hits, self._misses, self._evictions, self._cached_bytes, len(self._cache))
+
+    def hide(self, payload, filetype="", key=None, setup=None, carrier=None, output_format=None, compression=None,
+             scatter=False, compress=False):
+        """
+        Hide a message in a carrier of the pool.
+
+        :param payload: The message as bytes.
+        :param filetype: (Optional) The file extension of the message, stored in the header.
+        :param key: (Optional) The encryption key to encrypt the message.
+        :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+        :param carrier: (Optional) The filename of the carrier, by default the smallest carrier the message fits into.
+        :param output_format: (Optional) The name of the format in steg.OUTPUT_FORMATS, defaults to "png".
+        :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+        :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+        :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm,
+                         see steg.hide_data. The carrier is then chosen by the compressed size.
+
+        :return: A tuple (filename of the carrier used, the resulting image as bytes).
+
+        :raises KeyError: If the carrier is not in the pool.
+        :raises OverflowError: If the message fits into no carrier.
+        """
+        # the message is compressed once, both to choose the carrier and to be hidden
+        algorithm = None
+        if compress:
+            algorithm, payload = steg.compress_message(payload, compress)
+        if carrier is None:
+            carrier = self.smallest_fit(len(payload), filetype, key is not None, algorithm is not None, setup).filename
+        return carrier, steg.encode_bytes(self.load(carrier), payload, filetype, key, setup, output_format, compression,
+                                          scatter, precompressed=algorithm)
+
@@ -0,0 +1,121 @@
+from os import path
+
+RAW_EXTENSIONS = (".ppm", ".pnm", ".npy")
+# the dtypes of .npy carriers, 8 or 16 bits per channel
+RAW_DTYPES = ("uint8", "uint16")
+
+
+def is_raw(filename):
+    """
+    Check if a file is an uncompressed carrier that can be memory-mapped.
+
+    :param filename: The filename of the carrier.
+
+    :return: True for binary PPM and .npy files.
+    """
+    return path.splitext(filename)[1].lower() in RAW_EXTENSIONS
+
+
+def _read_token(f):
+    token = b""
+    while True:
+        char = f.read(1)
+        if not char:
+            raise ValueError("Invalid PPM file")
+        if char == b"#":
+            f.readline()
+        elif char.isspace():
+            if token:
+                return token
+        else:
+            token += char
+
+
+def read_ppm_header(f):
+    """
+    Read the header of a binary (P6) PPM file.
+
+    :param f: The file opened in binary mode, positioned at its start.
+
+    :return: A tuple (height, width, bits per channel, offset of the pixel data).
+
+    :raises ValueError: If the file is not an 8-bit or 16-bit binary PPM file.
+    """
+    if _read_token(f) != b"P6":
+        raise ValueError("Only binary (P6) PPM files are supported")
+    width, height, maxval = (int(_read_token(f)) for _ in range(3))
+    if maxval not in (255, 65535):
+        raise ValueError("Only 8-bit and 16-bit PPM files are supported")
+    return height, width, 8 if maxval == 255 else 16, f.tell()
+
+
+def raw_info(filename):
+    """
+    Read the shape and the bit depth of an uncompressed carrier from its file header.
+
+    :param filename: The filename of the carrier.
+
+    :return: A tuple (shape (height, width, channels), bits per channel).
+
+    :raises ValueError: If the file is not a supported carrier.
+    """
+    with open(filename, "rb") as f:
+        if filename.lower().endswith(".npy"):
+            import numpy as np
+
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, _, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, _, dtype = np.lib.format.read_array_header_2_0(f)
+            return shape, dtype.itemsize * 8
+        height, width, depth, _ = read_ppm_header(f)
+        return (height, width, 3), depth
+
+
+def raw_shape(filename):
+    """
+    Read the shape of an uncompressed carrier from its file header.
+
+    :param filename: The filename of the carrier.
+
+    :return: The shape (height, width, channels).
+
+    :raises ValueError: If the file is not a supported carrier.
+    """
+    return raw_info(filename)[0]
+
+
+def open_raw(filename, writable=False):
+    """
+    Memory-map the pixels of an uncompressed carrier, nothing is read until pixels are accessed.
+
+    PPM pixels are presented in BGR order, so the embedded data is laid out exactly
+    as in the image loaded by cv2. 16-bit PPM samples are big-endian and mapped as such.
+
+    :param filename: The filename of the carrier.
+    :param writable: Whether or not changes to the returned array are written to the file.
+
+    :return: The pixels as array of shape (height, width, channels), with 8 or 16 bits per channel.
+
+    :raises FileNotFoundError: If the carrier is not found.
+    :raises ValueError: If the file is not a supported carrier.
+    """
+    import numpy as np
+
+    if not path.isfile(filename):
+        raise FileNotFoundError("Medium not found")
+    mode = "r+" if writable else "r"
+    if filename.lower().endswith(".npy"):
+        image = np.load(filename, mmap_mode=mode)
+        if image.dtype.name not in RAW_DTYPES or image.ndim != 3:
+            raise ValueError("Only 8-bit and 16-bit arrays of shape (height, width, channels) are supported")
+        # the pixels are embedded through a flat (pixels, channels) view, other layouts would be copied and not written back
+        if not image.flags.c_contiguous:
+            raise ValueError("Only arrays in C order are supported, save the array with np.ascontiguousarray")
+        return image
+    with open(filename, "rb") as f:
+        height, width, depth, offset = read_ppm_header(f)
+    dtype = np.uint8 if depth == 8 else ">u2"
+    image = np.memmap(filename, dtype=dtype, mode=mode, offset=offset, shape=(height, width, 3))
+    return image[:, :, ::-1]
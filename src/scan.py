@@ -0,0 +1,380 @@
+"""
+Quick scan of many images for hidden messages, reading only the header and never the message itself.
+
+PNG images are inflated and unfiltered only as far as the pixels holding the header, usually a fraction of the
+first row, and uncompressed carriers are memory-mapped. Other formats are decoded completely. A header that decodes
+is additionally checked for plausibility, as the LSBs of an image without a message are effectively random and
+especially the legacy header (which has no magic value) decodes from almost anything.
+"""
+import csv
+import json
+import math
+import os
+import re
+import struct
+import zlib
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from .capacity import ENCRYPTION_OVERHEAD, PNG_ALPHA_TYPES, PNG_SIGNATURE, capacity, max_bits_per_channel
+from .formats import OUTPUT_EXTENSIONS
+from .header import decode_header
+from . import compression, raw
+
+Inspection = namedtuple("Inspection", ["filename", "shape", "header", "error"])
+
+REPORT_FIELDS = ["file", "width", "height", "channels", "payload", "version", "size", "filetype", "encrypted",
+                 "scattered", "bits", "all_channels", "shard_id", "shard_index", "shard_count", "checksum",
+                 "compression", "error"]
+SCAN_EXTENSIONS = OUTPUT_EXTENSIONS + raw.RAW_EXTENSIONS
+# filetypes are file extensions, anything else is most likely noise
+FILETYPE_PATTERN = re.compile(r"[A-Za-z0-9_+.-]*")
+
+# compressed bytes read and bytes inflated at once, only a small part of a PNG is ever read
+READ_SIZE = 8 << 10
+INFLATE_SIZE = 64 << 10
+# samples per pixel of the PNG color types: grayscale, RGB, palette, grayscale with alpha and RGBA
+PNG_SAMPLES = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+class PNGPrefixReader:
+    """
+    Decodes the first pixels of a PNG image without inflating or unfiltering the rest of it.
+
+    The pixels are presented like the medium loaded by steg.read_image: in BGR order, with an alpha channel for images
+    with alpha or a transparent color, grayscale expanded to 3 channels and 16-bit samples kept as they are.
+    Supports non-interlaced images with 8 or 16 bits per sample and 8-bit palette images.
+    """
+
+    def __init__(self, f):
+        """
+        :param f: The PNG file opened in binary mode, positioned at its start.
+
+        :raises ValueError: If the file is not a PNG image or the PNG variant is not supported.
+        """
+        if f.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+            raise ValueError("Invalid PNG file")
+        self.f = f
+        length, chunk_type = self._chunk()
+        if chunk_type != b"IHDR":
+            raise ValueError("Invalid PNG file")
+        self.width, self.height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", f.read(13))
+        f.seek(4, os.SEEK_CUR)
+        if not _supported_png(depth, color_type, interlace):
+            raise ValueError("Unsupported PNG variant")
+        self.color_type = color_type
+        self.depth = depth
+        self.sample_bytes = depth // 8
+        self.pixel_bytes = PNG_SAMPLES[color_type] * self.sample_bytes
+        self.row_bytes = self.width * self.pixel_bytes
+        self.palette = None
+        self.transparency = None
+        # skip to the image data, remembering the palette and the transparency on the way
+        while True:
+            length, chunk_type = self._chunk()
+            if chunk_type == b"IDAT":
+                break
+            if chunk_type == b"PLTE":
+                self.palette = f.read(length)
+                f.seek(4, os.SEEK_CUR)
+            elif chunk_type == b"tRNS" and color_type in (2, 3):
+                self.transparency = f.read(length)
+                f.seek(4, os.SEEK_CUR)
+            elif chunk_type == b"IEND":
+                raise ValueError("PNG file without image data")
+            else:
+                f.seek(length + 4, os.SEEK_CUR)
+        if color_type == 3 and self.palette is None:
+            raise ValueError("Palette PNG file without palette")
+        # a transparent color is turned into an alpha channel, as for images with alpha
+        self.channels = 4 if color_type in PNG_ALPHA_TYPES or self.transparency is not None else 3
+        if color_type == 2 and self.transparency is not None:
+            self.transparency = struct.unpack(">3H", self.transparency[:6])
+        self.idat_remaining = length
+        self.inflater = zlib.decompressobj()
+        # inflated, still filtered data starting at the filter byte of the current row
+        self.filtered = bytearray()
+        # the previous row (complete) and the unfiltered beginning of the current one
+        self.previous = bytes(self.row_bytes)
+        self.current = bytearray()
+        self.row = 0
+        self.values = []
+
+    def _chunk(self):
+        head = self.f.read(8)
+        if len(head) < 8:
+            raise ValueError("Truncated PNG file")
+        return struct.unpack(">I4s", head)
+
+    def _read_idat(self):
+        while not self.idat_remaining:
+            self.f.seek(4, os.SEEK_CUR)
+            self.idat_remaining, chunk_type = self._chunk()
+            if chunk_type != b"IDAT":
+                raise ValueError("Truncated PNG image data")
+        data = self.f.read(min(self.idat_remaining, READ_SIZE))
+        if not data:
+            raise ValueError("Truncated PNG file")
+        self.idat_remaining -= len(data)
+        return data
+
+    def _inflate(self, size):
+        # inflate until the filtered data of the current row holds size bytes
+        while len(self.filtered) < size:
+            if self.inflater.eof:
+                raise ValueError("Truncated PNG image data")
+            data = self.inflater.unconsumed_tail or self._read_idat()
+            self.filtered += self.inflater.decompress(data, INFLATE_SIZE)
+
+    def _unfilter(self, end):
+        # unfilter the current row up to byte end, filters only refer to bytes on the left and above
+        self._inflate(end + 1)
+        filter_type = self.filtered[0]
+        data, previous, current, step = self.filtered, self.previous, self.current, self.pixel_bytes
+        for i in range(len(current), end):
+            left = current[i - step] if i >= step else 0
+            if filter_type == 0:
+                value = data[i + 1]
+            elif filter_type == 1:
+                value = data[i + 1] + left
+            elif filter_type == 2:
+                value = data[i + 1] + previous[i]
+            elif filter_type == 3:
+                value = data[i + 1] + ((left + previous[i]) >> 1)
+            elif filter_type == 4:
+                value = data[i + 1] + _paeth(left, previous[i], previous[i - step] if i >= step else 0)
+            else:
+                raise ValueError("Invalid PNG filter type")
+            current.append(value & 0xFF)
+
+    def _convert(self, row_data):
+        # convert raw pixels to their channel values in BGR(A) order
+        if self.sample_bytes == 2:
+            samples = struct.unpack(">{}H".format(len(row_data) // 2), row_data)
+        else:
+            samples = row_data
+        opaque = (1 << self.depth) - 1
+        values = []
+        if self.color_type == 3:
+            if max(samples, default=0) >= len(self.palette) // 3:
+                raise ValueError("Invalid palette index")
+            for index in samples:
+                values += self.palette[3 * index:3 * index + 3][::-1]
+                if self.channels == 4:
+                    values.append(self.transparency[index] if index < len(self.transparency) else opaque)
+            return values
+        nr_samples = PNG_SAMPLES[self.color_type]
+        for i in range(0, len(samples), nr_samples):
+            pixel = tuple(samples[i:i + nr_samples])
+            values += pixel[:1] * 3 if nr_samples <= 2 else pixel[2::-1]
+            if self.color_type in PNG_ALPHA_TYPES:
+                values.append(pixel[-1])
+            elif self.channels == 4:
+                values.append(0 if pixel == self.transparency else opaque)
+        return values
+
+    def read(self, nr_pixels):
+        """
+        Decode the first pixels of the image.
+
+        :param nr_pixels: The number of pixels (in row-major order) to decode.
+
+        :return: The channel values of the pixels as list of integers, channels per pixel in BGR(A) order.
+
+        :raises ValueError: If the image has fewer pixels or its data is invalid.
+        """
+        if nr_pixels > self.width * self.height:
+            raise ValueError("Image too small to contain a header")
+        while len(self.values) < self.channels * nr_pixels:
+            row_pixels = min(self.width, nr_pixels - self.row * self.width)
+            start = len(self.current)
+            self._unfilter(row_pixels * self.pixel_bytes)
+            self.values += self._convert(bytes(self.current[start:]))
+            if len(self.current) == self.row_bytes:
+                del self.filtered[:self.row_bytes + 1]
+                self.previous, self.current = bytes(self.current), bytearray()
+                self.row += 1
+        return self.values[:self.channels * nr_pixels]
+
+
+def _supported_png(depth, color_type, interlace):
+    return not interlace and color_type in PNG_SAMPLES and depth in ((8,) if color_type == 3 else (8, 16))
+
+
+def _prefix_decodable(f):
+    # whether the file is a PNG image the PNGPrefixReader supports
+    # the signature, the length and type of the IHDR chunk and its 13 bytes
+    head = f.read(len(PNG_SIGNATURE) + 8 + 13)
+    f.seek(0)
+    if len(head) < len(PNG_SIGNATURE) + 8 + 13 or not head.startswith(PNG_SIGNATURE) or head[12:16] != b"IHDR":
+        return False
+    _, _, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", head[16:])
+    return _supported_png(depth, color_type, interlace)
+
+
+def _open_reader(filename, f):
+    """
+    :return: A tuple (shape, bits per channel, function returning the channel values of the first n pixels).
+    """
+    if raw.is_raw(filename):
+        image = raw.open_raw(filename)
+    elif _prefix_decodable(f):
+        reader = PNGPrefixReader(f)
+        return (reader.height, reader.width, reader.channels), reader.depth, reader.read
+    else:
+        # other formats are decoded completely
+        import cv2
+        import numpy as np
+        from .steg import medium_image
+
+        image = cv2.imdecode(np.frombuffer(f.read(), dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+        if image is None:
+            raise ValueError("Unsupported image format: {}".format(filename))
+        image = medium_image(image)
+    height, width, channels = image.shape
+
+    def read_pixels(nr_pixels):
+        if nr_pixels > height * width:
+            raise ValueError("Image too small to contain a header")
+        # only the rows holding the pixels are copied out of a memory-mapped carrier
+        return image[:math.ceil(nr_pixels / width)].reshape(-1, channels)[:nr_pixels].ravel().tolist()
+
+    return image.shape, image.dtype.itemsize * 8, read_pixels
+
+
+def check_plausible(header, shape, depth=8):
+    """
+    Check that a decoded header describes a message that can actually be hidden in the image.
+
+    :param header: The decoded Header.
+    :param shape: The shape (height, width, channels) of the image.
+    :param depth: (Optional) The number of bits per channel of the image.
+
+    :raises ValueError: If the header is implausible, most likely it was decoded from the LSBs of an image without message.
+    """
+    if not 1 <= header.bits <= max_bits_per_channel(depth):
+        raise ValueError("Unsupported number of bits per channel")
+    # messages are whole bytes and never empty
+    if header.length == 0 or header.length % 8:
+        raise ValueError("Content length is not a whole number of bytes")
+    if header.length > capacity(shape, header.bits, header.all_channels, header.header_length):
+        raise ValueError("Content length exceeds medium")
+    if header.encrypted and header.length < ENCRYPTION_OVERHEAD * 8:
+        raise ValueError("Content length is too short for an encrypted message")
+    if not FILETYPE_PATTERN.fullmatch(header.filetype):
+        raise ValueError("Invalid filetype in header")
+    if header.shard is not None and not header.shard_index < header.shard_count:
+        raise ValueError("Invalid shard index")
+
+
+def inspect_image(filename):
+    """
+    Read the header of the message hidden in an image, without extracting the message.
+
+    :param filename: The filename of the image.
+
+    :return: An Inspection(filename, shape, header, error), header is None if the image does not carry a message
+             and error then gives the reason, shape is None if the image could not be read.
+    """
+    shape = None
+    try:
+        with open(filename, "rb") as f:
+            shape, depth, read_pixels = _open_reader(filename, f)
+            channels = shape[2]
+
+            def read_bits(n):
+                values = read_pixels(math.ceil(n / channels))[:n]
+                return "".join("1" if value & 1 else "0" for value in values)
+
+            header = decode_header(read_bits)
+        check_plausible(header, shape, depth)
+        return Inspection(filename, shape, header, None)
+    except (OSError, ValueError, struct.error) as e:
+        return Inspection(filename, shape, None, str(e))
+
+
+def find_images(paths, extensions=SCAN_EXTENSIONS):
+    """
+    Expand files and directories to the images to inspect.
+
+    :param paths: An iterable of filenames and directories.
+    :param extensions: The file extensions of the images to include from directories, files are always included.
+
+    :return: A list of filenames, the contents of each directory sorted by name.
+    """
+    filenames = []
+    for name in paths:
+        if os.path.isdir(name):
+            filenames += sorted(entry.path for entry in os.scandir(name)
+                                if entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions)
+        else:
+            filenames.append(name)
+    return filenames
+
+
+def inspect_images(filenames, workers=None):
+    """
+    Inspect many images across a pool of worker processes.
+
+    :param filenames: A list of filenames.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+
+    :return: A generator yielding an Inspection for every image, in the order of the filenames.
+    """
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(filenames) < 2:
+        yield from map(inspect_image, filenames)
+        return
+    # hand out the images in chunks, inspecting one takes far less time than sending it to a worker
+    chunk_size = max(1, min(256, len(filenames) // (4 * workers)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(inspect_image, filenames, chunksize=chunk_size)
+
+
+def report_row(inspection):
+    """
+    Flatten an Inspection into a row of the report.
+
+    :param inspection: The Inspection.
+
+    :return: A dictionary with the keys REPORT_FIELDS, the size of the message is given in bytes.
+    """
+    header = inspection.header
+    row = dict.fromkeys(REPORT_FIELDS)
+    row.update(file=inspection.filename, payload=header is not None, error=inspection.error)
+    if inspection.shape is not None:
+        row.update(height=inspection.shape[0], width=inspection.shape[1], channels=inspection.shape[2])
+    if header is not None:
+        row.update(version=header.version, size=header.length // 8, filetype=header.filetype, encrypted=header.encrypted,
+                   scattered=header.scattered, bits=header.bits, all_channels=header.all_channels,
+                   shard_id=header.shard_id, shard_index=header.shard_index, shard_count=header.shard_count,
+                   checksum=header.checksum, compression=compression.NAMES.get(header.compression, header.compression))
+    return row
+
+
+def write_report(inspections, report_filename):
+    """
+    Write the inspections to a report, as CSV if the filename ends with .csv and as JSON otherwise.
+
+    :param inspections: An iterable of Inspection.
+    :param report_filename: The filename of the report.
+
+    :return: The list of report rows written.
+    """
+    rows = [report_row(inspection) for inspection in inspections]
+    with open(report_filename, "w", newline="") as f:
+        if report_filename.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            json.dump(rows, f, indent=2)
+    return rows
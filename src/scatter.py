@@ -0,0 +1,82 @@
+"""
+Keyed pseudo-random permutation of the message slots of an image.
+
+The permutation is a Feistel network on the smallest square covering the slots, an index is split into two digits
+of base ceil(sqrt(size)) and the rounds add a keyed hash modulo that base. Indices falling outside the slots are
+walked through the network again until they land inside (cycle walking), which is rare as the square barely
+exceeds the slots. Every index is permuted on its own, so only the indices of the symbols actually embedded or
+extracted are computed, never a full-size index array.
+"""
+import hashlib
+import math
+from functools import lru_cache
+
+import numpy as np
+
+ROUNDS = 4
+# symbols scattered at once, bounds the temporary index arrays
+CHUNK_SYMBOLS = 1 << 20
+
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+_SHIFT = np.uint64(32)
+
+
+def _mix(x):
+    # the splitmix64 finalizer, a cheap bijective hash of 64 bit integers
+    x = (x ^ (x >> np.uint64(30))) * _MIX_1
+    x = (x ^ (x >> np.uint64(27))) * _MIX_2
+    return x ^ (x >> np.uint64(31))
+
+
+class Permutation:
+    """
+    A keyed permutation of range(size).
+    """
+
+    def __init__(self, key, size):
+        """
+        :param key: The key as bytes.
+        :param size: The number of elements to permute.
+        """
+        self.size = size
+        self.base = np.uint64(math.isqrt(max(size, 1) - 1) + 1)
+        digest = hashlib.blake2b(key, digest_size=8 * ROUNDS, person=b"StegaPy scatter").digest()
+        self.round_keys = np.frombuffer(digest, dtype="<u8")
+
+    def _feistel(self, x):
+        left, right = np.divmod(x, self.base)
+        for round_key in self.round_keys:
+            # scale the upper half of the hash to [0, base) instead of the slower modulo
+            digit = left + ((_mix(right ^ round_key) >> _SHIFT) * self.base >> _SHIFT)
+            digit -= self.base * (digit >= self.base)
+            left, right = right, digit
+        return left * self.base + right
+
+    def __call__(self, indices):
+        """
+        Permute indices.
+
+        :param indices: An array of indices in range(size).
+
+        :return: An array of the permuted indices.
+        """
+        x = self._feistel(np.asarray(indices, dtype=np.uint64))
+        outside = np.flatnonzero(x >= self.size)
+        while len(outside):
+            x[outside] = self._feistel(x[outside])
+            outside = outside[x[outside] >= self.size]
+        return x.astype(np.intp)
+
+
+@lru_cache(maxsize=16)
+def permutation(key, size):
+    """
+    Get the permutation of range(size) derived from a key, cached for repeated use.
+
+    :param key: The key as bytes.
+    :param size: The number of elements to permute.
+
+    :return: The Permutation.
+    """
+    return Permutation(bytes(key), size)
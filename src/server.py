@@ -0,0 +1,354 @@
+"""
+A long-running HTTP service for hide, reveal and capacity, served over TCP or a Unix socket.
+
+Requests are parsed on an asyncio event loop, embedding and extraction run in a pool of worker processes that is
+started (and warmed up) once, so the import and startup costs are not paid per request.
+
+Endpoints:
+    POST /hide?medium_length=N[&filetype=&bits=&all_channels=&format=&compression=&scatter=&compress=]
+         The body is the encoded medium (its first N bytes) followed by the payload, returns the encoded image.
+         If the server has a carrier pool, medium_length can be left out: the body is the payload alone and the
+         smallest carrier of the pool it fits into is used (or the one named by carrier=NAME), its name is returned
+         percent-encoded in the header X-Carrier.
+    POST /reveal
+         The body is the encoded image, returns the payload with the headers X-Filetype (percent-encoded, the filetype
+         comes from the image) and X-Encrypted.
+    POST /capacity?payload_size=N[&filetype=&encrypted=]
+         The body is the encoded medium (the beginning up to its dimensions suffices), returns the plan as JSON.
+    GET /health
+         Returns the number of jobs waiting or running as JSON.
+The AES key is passed in the X-Key header.
+"""
+import asyncio
+import json
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, quote, urlsplit
+
+from cryptography.exceptions import InvalidTag
+
+from . import capacity, pool, steg
+
+MAX_REQUEST_SIZE = 64 << 20
+MAX_RESPONSE_SIZE = 256 << 20
+MAX_HEADER_SIZE = 16 << 10
+QUEUE_SIZE = 64
+MAX_CONNECTIONS = 256
+
+CONTENT_TYPES = {".png": "image/png", ".webp": "image/webp", ".tiff": "image/tiff"}
+
+
+class HTTPError(Exception):
+    """
+    An error answered with the given HTTP status.
+    """
+
+    def __init__(self, status, message=None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _hide(medium, payload, filetype, key, setup, output_format, compression, scatter, compress):
+    return steg.encode_bytes(medium, payload, filetype, key, setup, output_format, compression, scatter, compress)
+
+
+# the carrier pool of a worker process, every worker decodes and caches the carriers it uses itself
+_pool = None
+
+
+def _init_worker(carriers, cache_size):
+    global _pool
+    if carriers is not None:
+        _pool = pool.CarrierPool(carriers, cache_size)
+
+
+def _hide_pooled(carrier, payload, filetype, key, setup, output_format, compression, scatter, compress):
+    if carrier is not None:
+        matches = [c.filename for c in _pool.carriers if os.path.basename(c.filename) == carrier]
+        if not matches:
+            raise ValueError("Unknown carrier {}".format(carrier))
+        carrier = matches[0]
+    filename, image = _pool.hide(payload, filetype, key, setup, carrier, output_format, compression, scatter, compress)
+    return os.path.basename(filename), image
+
+
+def _reveal(image, key, max_size):
+    return steg.decode_bytes(image, key, max_size=max_size)
+
+
+def _warm_up():
+    return os.getpid()
+
+
+def parse_address(address):
+    """
+    Parse the address to serve on.
+
+    :param address: "unix:PATH" for a Unix socket, otherwise "HOST:PORT", "HOST" or ":PORT".
+
+    :return: A tuple (host, port, unix socket path), the unused parts are None.
+    """
+    if address.startswith("unix:"):
+        return None, None, address[len("unix:"):]
+    host, _, port = address.rpartition(":") if ":" in address else (address, None, "")
+    return host or "127.0.0.1", int(port) if port else 8080, None
+
+
+def _flag(query, name):
+    return query.get(name, "0").lower() in ("1", "true", "yes")
+
+
+def _int(query, name, default=None):
+    value = query.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "{} must be an integer".format(name))
+
+
+def _compress(query):
+    # compress=1 chooses the algorithm automatically, compress=NAME uses the given one
+    value = query.get("compress", "0")
+    if value.lower() in ("0", "false", "no"):
+        return False
+    return _flag(query, "compress") or value
+
+
+class Server:
+    """
+    The HTTP service, see the module documentation for the endpoints.
+    """
+
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE, max_request_size=MAX_REQUEST_SIZE,
+                 max_connections=MAX_CONNECTIONS, carriers=None, cache_size=pool.CACHE_SIZE,
+                 max_response_size=MAX_RESPONSE_SIZE):
+        """
+        :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+        :param queue_size: (Optional) The number of jobs waiting or running at once, further jobs are rejected with 503.
+        :param max_request_size: (Optional) The largest accepted request body in bytes, larger ones are rejected with 413.
+        :param max_connections: (Optional) The number of connections served at once, further ones wait to be read.
+        :param carriers: (Optional) A directory or a list of filenames of carriers for /hide without a medium.
+        :param cache_size: (Optional) The largest total size of decoded carriers each worker keeps in memory, in bytes.
+        :param max_response_size: (Optional) The largest message /reveal decompresses in bytes, larger ones are rejected
+                                  with 400.
+        """
+        self.workers = workers or os.cpu_count()
+        self.queue_size = queue_size
+        self.max_request_size = max_request_size
+        self.max_connections = max_connections
+        self.carriers = carriers
+        self.cache_size = cache_size
+        self.max_response_size = max_response_size
+        self.pending = 0
+        self.executor = None
+        self.server = None
+
+    async def start(self, address="127.0.0.1:8080"):
+        """
+        Start the worker processes and listen on the address.
+
+        :param address: The address, see parse_address.
+
+        :return: The asyncio server.
+        """
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.carriers, self.cache_size))
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warm_up) for _ in range(self.workers)))
+        self.connections = asyncio.Semaphore(self.max_connections)
+        host, port, unix_path = parse_address(address)
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, unix_path, limit=MAX_HEADER_SIZE)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+        return self.server
+
+    async def close(self):
+        """
+        Stop listening and shut the worker processes down.
+        """
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.executor is not None:
+            self.executor.shutdown()
+
+    async def submit(self, func, *args):
+        """
+        Run a job in the worker processes.
+
+        :raises HTTPError: 503 if queue_size jobs are already waiting or running.
+        """
+        if self.pending >= self.queue_size:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Server busy")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def handle(self, reader, writer):
+        async with self.connections:
+            try:
+                keep_alive = True
+                while keep_alive:
+                    keep_alive = await self.handle_request(reader, writer)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            except Exception:
+                # a bug must not leave the client without an answer
+                try:
+                    await self.respond(writer, HTTPStatus.INTERNAL_SERVER_ERROR, close=True)
+                except ConnectionError:
+                    pass
+            finally:
+                writer.close()
+
+    async def handle_request(self, reader, writer):
+        """
+        Read, dispatch and answer one request.
+
+        :return: Whether or not the connection stays open for another request.
+        """
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as error:
+            if error.partial:
+                await self.respond(writer, HTTPStatus.BAD_REQUEST, b"Incomplete request", close=True)
+            return False
+        except asyncio.LimitOverrunError:
+            await self.respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, close=True)
+            return False
+        try:
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            method, target, version = request_line.split(" ")
+            headers = {}
+            for line in filter(None, header_lines):
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length", 0))
+            if length < 0:
+                raise ValueError("Negative Content-Length")
+        except ValueError:
+            await self.respond(writer, HTTPStatus.BAD_REQUEST, b"Malformed request", close=True)
+            return False
+        if length > self.max_request_size:
+            # the body is not read, so the connection can not be reused
+            await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, close=True)
+            return False
+        body = await reader.readexactly(length)
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        key = headers.get("x-key")
+        key = key.encode("utf-8") if key else None
+        try:
+            status, response_headers, content = await self.dispatch(method, url.path, query, key, body)
+        except HTTPError as error:
+            status, response_headers, content = error.status, {}, str(error).encode()
+        except (ValueError, struct.error) as error:
+            status, response_headers, content = HTTPStatus.BAD_REQUEST, {}, str(error).encode()
+        except OverflowError as error:
+            status, response_headers, content = HTTPStatus.UNPROCESSABLE_ENTITY, {}, str(error).encode()
+        except InvalidTag:
+            status, response_headers, content = HTTPStatus.FORBIDDEN, {}, b"Decryption failed"
+        await self.respond(writer, status, content, response_headers, close=not keep_alive)
+        return keep_alive
+
+    async def dispatch(self, method, route, query, key, body):
+        """
+        Answer a request.
+
+        :return: A tuple (HTTP status, dictionary of headers, body).
+        """
+        if route == "/health" and method == "GET":
+            return HTTPStatus.OK, {"Content-Type": "application/json"}, json.dumps({"pending": self.pending}).encode()
+        if route not in ("/hide", "/reveal", "/capacity"):
+            raise HTTPError(HTTPStatus.NOT_FOUND)
+        if method != "POST":
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+
+        if route == "/capacity":
+            plan = capacity.plan(body, _int(query, "payload_size", 0), query.get("filetype", ""),
+                                 _flag(query, "encrypted") or key is not None)
+            content = {
+                "shape": plan["shape"],
+                "depth": plan["depth"],
+                "capacity": [{"bits": bits, "all_channels": all_channels, "bytes": size}
+                             for (bits, all_channels), size in plan["capacity"].items()],
+                "setup": plan["setup"],
+            }
+            return HTTPStatus.OK, {"Content-Type": "application/json"}, json.dumps(content).encode()
+
+        if route == "/reveal":
+            payload, filetype, encrypted = await self.submit(_reveal, body, key, self.max_response_size)
+            # the filetype is read from the image, so it may hold anything, even line breaks
+            headers = {"Content-Type": "application/octet-stream", "X-Filetype": quote(filetype, safe=""),
+                       "X-Encrypted": str(int(encrypted))}
+            return HTTPStatus.OK, headers, payload
+
+        medium_length = _int(query, "medium_length")
+        if medium_length is None and self.carriers is None:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "medium_length is required, the server has no carrier pool")
+        if medium_length is not None and not 0 < medium_length <= len(body):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "medium_length must give the size of the medium at the start of the body")
+        bits = _int(query, "bits")
+        setup = None if bits is None else [bits, _flag(query, "all_channels")]
+        output_format = query.get("format")
+        extension, _ = steg.output_settings(output_format)
+        settings = (query.get("filetype", ""), key, setup, output_format, _int(query, "compression"), _flag(query, "scatter"),
+                    _compress(query))
+        headers = {"Content-Type": CONTENT_TYPES[extension]}
+        if medium_length is None:
+            carrier, image = await self.submit(_hide_pooled, query.get("carrier"), body, *settings)
+            # carrier filenames may hold characters the latin-1 response head can not carry
+            headers["X-Carrier"] = quote(carrier, safe="")
+        else:
+            image = await self.submit(_hide, body[:medium_length], body[medium_length:], *settings)
+        return HTTPStatus.OK, headers, image
+
+    async def respond(self, writer, status, content=None, headers=None, close=False):
+        content = status.phrase.encode() if content is None else content
+        head = ["HTTP/1.1 {} {}".format(status.value, status.phrase), "Content-Length: {}".format(len(content))]
+        head += ["{}: {}".format(name, value) for name, value in (headers or {}).items()]
+        if close:
+            head.append("Connection: close")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + content)
+        await writer.drain()
+
+
+async def _serve(address, **settings):
+    server = Server(**settings)
+    try:
+        listener = await server.start(address)
+        names = [socket.getsockname() for socket in listener.sockets]
+        print("Serving on {} with {} workers".format(", ".join(map(str, names)), server.workers))
+        await listener.serve_forever()
+    finally:
+        await server.close()
+
+
+def serve(address="127.0.0.1:8080", workers=None, queue_size=QUEUE_SIZE, max_request_size=MAX_REQUEST_SIZE,
+          max_connections=MAX_CONNECTIONS, carriers=None, cache_size=pool.CACHE_SIZE, max_response_size=MAX_RESPONSE_SIZE):
+    """
+    Run the HTTP service until interrupted.
+
+    :param address: (Optional) "HOST:PORT" or "unix:PATH", defaults to 127.0.0.1:8080.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+    :param queue_size: (Optional) The number of jobs waiting or running at once, further jobs are rejected with 503.
+    :param max_request_size: (Optional) The largest accepted request body in bytes.
+    :param max_connections: (Optional) The number of connections served at once.
+    :param carriers: (Optional) A directory or a list of filenames of carriers for /hide without a medium.
+    :param cache_size: (Optional) The largest total size of decoded carriers each worker keeps in memory, in bytes.
+    :param max_response_size: (Optional) The largest message /reveal decompresses in bytes.
+    """
+    try:
+        asyncio.run(_serve(address, workers=workers, queue_size=queue_size, max_request_size=max_request_size,
+                           max_connections=max_connections, carriers=carriers, cache_size=cache_size,
+                           max_response_size=max_response_size))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,208 @@
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+
+from .header import *
+from . import capacity, steg
+
+IMAGE_EXTENSIONS = (".png", ".bmp", ".tif", ".tiff", ".jpg", ".jpeg", ".webp")
+
+
+def list_images(carriers, extensions=IMAGE_EXTENSIONS):
+    """
+    Resolve a directory or a list of filenames to a list of images.
+
+    :param carriers: A directory or a list of filenames.
+    :param extensions: The file extensions of the images to include from a directory.
+
+    :return: A sorted list of filenames.
+    """
+    if isinstance(carriers, str):
+        return sorted(path.join(carriers, name) for name in os.listdir(carriers)
+                      if path.splitext(name)[1].lower() in extensions)
+    return list(carriers)
+
+
+def image_info(filename):
+    """
+    Get the shape and the bit depth of an image, reading only the file header where the format allows it.
+
+    :param filename: The filename of the image.
+
+    :return: The capacity.ImageInfo(shape, depth) of the decoded image.
+
+    :raises FileNotFoundError: If the image is not found.
+    """
+    try:
+        return capacity.image_info(filename)
+    except ValueError:
+        pass
+    image = steg.read_image(filename)
+    if image is None:
+        raise FileNotFoundError("Medium not found: {}".format(filename))
+    return capacity.ImageInfo(image.shape, capacity.medium_depth(image))
+
+
+def image_shape(filename):
+    """
+    Get the shape of an image, reading only the file header where the format allows it.
+
+    :param filename: The filename of the image.
+
+    :return: The shape (height, width, channels) of the decoded image.
+
+    :raises FileNotFoundError: If the image is not found.
+    """
+    return image_info(filename).shape
+
+
+def plan_shards(payload_size, shapes, header_length, overhead=0):
+    """
+    Plan how many payload bytes each carrier takes.
+
+    Carriers are used in the given order until the payload fits at the maximal bits per channel of their depth,
+    the payload is then split across them in proportion to their capacity.
+
+    :param payload_size: The size of the payload in bytes.
+    :param shapes: An iterable of the shapes (taken to be 8-bit) or the capacity.ImageInfo of the carriers,
+                   only read until the payload fits.
+    :param header_length: The length of a shard header in bits.
+    :param overhead: (Optional) The number of bytes added to every shard, e.g. by encryption.
+
+    :return: A list with the number of payload bytes per used carrier.
+
+    :raises OverflowError: If the payload does not fit into the carriers.
+    """
+    capacities = []
+    for medium in shapes:
+        shape, depth = medium if isinstance(medium, capacity.ImageInfo) else (medium, 8)
+        bits = capacity.max_bits_per_channel(depth)
+        capacities.append(max(capacity.capacity(shape, bits, True, header_length) // 8 - overhead, 0))
+        if sum(capacities) >= payload_size:
+            break
+    total = sum(capacities)
+    if total < payload_size or total == 0:
+        raise OverflowError("Message does not fit into the carriers!")
+    sizes = [payload_size * carrier_capacity // total for carrier_capacity in capacities]
+    # hand out the bytes lost to rounding down, never exceeding a capacity
+    remainder = payload_size - sum(sizes)
+    for i, carrier_capacity in enumerate(capacities):
+        extra = min(remainder, carrier_capacity - sizes[i])
+        sizes[i] += extra
+        remainder -= extra
+    return sizes
+
+
+def _embed_shard(medium_filename, data, hidden_filename, filetype, key, shard, output_format, compression, scatter):
+    image = steg.read_image(medium_filename)
+    if image is None:
+        raise FileNotFoundError("Medium not found: {}".format(medium_filename))
+    image = steg.hide_data(image, data, filetype, key, shard=shard, scatter=scatter)
+    with open(hidden_filename, "wb") as f:
+        f.write(steg.encode_image(image, output_format, compression))
+    return hidden_filename
+
+
+def encode_shards(carriers, message_filename, hidden_prefix=None, key=None, workers=None, output_format=None, compression=None,
+                  scatter=False):
+    """
+    Split a message across several carrier images, embedding the shards in parallel.
+
+    Every shard stores the shard set id, its index and the number of shards in its header.
+    Encrypted shards authenticate these fields, so they can not be swapped unnoticed.
+
+    :param carriers: A directory or a list of filenames of the carrier images.
+    :param message_filename: The filename of the message file to be hidden.
+    :param hidden_prefix: (Optional) The prefix of the resulting image files, the shard index and the extension are appended.
+    :param key: (Optional) The encryption key to encrypt the shards.
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+    :param output_format: (Optional) The name of the format in steg.OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+    :param scatter: (Optional) Scatter the shards across the whole images with a permutation derived from the key.
+
+    :return: The list of filenames of the resulting images.
+
+    :raises OverflowError: If the message does not fit into the carriers.
+    """
+    carriers = list_images(carriers)
+    with open(message_filename, "rb") as f:
+        msg = f.read()
+    filetype = path.splitext(message_filename)[1][1:]
+    hidden_prefix = hidden_prefix or "hidden"
+
+    header_length = VersionedHeader().header_length(filetype, steg.header_flags(shard=True))
+    overhead = capacity.ENCRYPTION_OVERHEAD if key is not None else 0
+    infos = (image_info(carrier) for carrier in carriers)
+    sizes = plan_shards(len(msg), infos, header_length, overhead)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+
+        shard_id = secrets.randbits(32)
+        digits = len(str(len(sizes) - 1))
+        futures = []
+        offset = 0
+        for index, size in enumerate(sizes):
+            hidden_filename = steg.hidden_filename_for("{}_{}".format(hidden_prefix, str(index).zfill(digits)), output_format)
+            shard = (shard_id, index, len(sizes))
+            futures.append(executor.submit(_embed_shard, carriers[index], msg[offset:offset + size], hidden_filename,
+                                           filetype, key, shard, output_format, compression, scatter))
+            offset += size
+        hidden_filenames = [future.result() for future in futures]
+    print("Message was hidden in {} shards with prefix {}".format(len(hidden_filenames), hidden_prefix))
+    return hidden_filenames
+
+
+def _reveal_shard(filename, key):
+    image = steg.read_image(filename)
+    if image is None:
+        raise FileNotFoundError("Image not found: {}".format(filename))
+    return steg.reveal_data(image, key)
+
+
+def assemble_shards(shards):
+    """
+    Reassemble a payload from its shards.
+
+    :param shards: An iterable of (data, Header) tuples in any order.
+
+    :return: A tuple (payload as bytes, the filetype).
+
+    :raises ValueError: If the shards belong to different sets, or shards are missing or duplicated.
+    """
+    by_index = {}
+    shard_set = None
+    for data, header in shards:
+        if header.shard is None:
+            raise ValueError("Image does not contain a shard")
+        if shard_set is None:
+            shard_set = (header.shard_id, header.shard_count, header.filetype)
+        elif shard_set != (header.shard_id, header.shard_count, header.filetype):
+            raise ValueError("Shards belong to different payloads")
+        if header.shard_index in by_index:
+            raise ValueError("Duplicate shard {}".format(header.shard_index))
+        by_index[header.shard_index] = data
+    if shard_set is None:
+        raise ValueError("No shards given")
+    missing = sorted(set(range(shard_set[1])) - set(by_index))
+    if missing:
+        raise ValueError("Missing shards {}".format(", ".join(map(str, missing))))
+    return b"".join(by_index[i] for i in range(shard_set[1])), shard_set[2]
+
+
+def decode_shards(images, key=None, output_name=None, workers=None):
+    """
+    Reveal a message split across several images, decoding the shards in parallel.
+
+    :param images: A directory or a list of filenames of the images, in any order.
+    :param key: The encryption key used to decrypt the shards.
+    :param output_name: The name of the output file (without extension).
+    :param workers: (Optional) The number of worker processes, defaults to the number of CPUs.
+
+    :raises: ValueError if shards are missing, duplicated or belong to different payloads.
+    :raises: InvalidTag if the decryption of a shard fails.
+    """
+    images = list_images(images, steg.OUTPUT_EXTENSIONS)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        shards = list(executor.map(_reveal_shard, images, [key] * len(images)))
+    payload, filetype = assemble_shards(shards)
+    steg.write_bytes_to_file(payload, filetype, output_name)
@@ -1,76 +1,558 @@
 import secrets
 import math
+import os
+import shutil
+import zlib
 from os import path
-from cryptography.exceptions import InvalidTag
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 import cv2
 import numpy as np
 
 from .bitutils import *
+from .capacity import MAX_BITS_PER_CHANNEL, capacity, ensure_correct_setup, get_optimal_setup
+from .formats import ALPHA_EXTENSIONS, DEEP_EXTENSIONS, OUTPUT_EXTENSIONS, OUTPUT_FORMATS
 from .header import *
+from .instrument import span
+from . import compression as compressors, parallel, raw, scatter, video
 
 FILL_WITH_NOISE = False
+# the channels written in single channel mode, the alpha channel of RGBA images is left unchanged
+COLOR_CHANNELS = 3
+# the channel types of media, 8 and 16 bits per channel
+MEDIUM_DTYPES = (np.uint8, np.uint16)
 
 
-def get_optimal_setup(message_size, medium):
+def reshape_array(arr, num_columns=3):
     """
-    Calculate the optimal settings needed to encode the message.
-
-    :param message_size: The size of the message in bytes.
-    :param medium: The medium to hide the message in.
+    Reshape a 1-dimensional array into a 2-dimensional array with a specified number of columns.
+    :param arr: The 1-dimensional array to be reshaped.
+    :param num_columns: The desired number of columns in the reshaped array.
 
-    :return: A list containing the optimal setup [bits_per_pixel, use_all_channels].
+    :return: The reshaped array.
+    """
+    num_rows = (len(arr) + num_columns - 1) // num_columns
+    num_padding = num_rows * num_columns - len(arr)
     
-    :raises OverflowError: If the message does not fit into the medium.
+    padded_array = np.pad(arr, (0, num_padding), mode='constant')
+    arr = padded_array.reshape(num_rows, num_columns)
+
+    return arr
+
+
+def embed_symbols(flat_image, start, symbols, bits):
+    """
+    Substitute the lowest bits of consecutive pixels with the given symbols (in place).
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel to write to.
+    :param symbols: The symbols to embed, an array of shape (pixels, channels).
+    :param bits: The number of bits per channel to substitute.
     """
-    if message_size < medium.shape[0] * medium.shape[1]:
-        return [1, False]
-    if message_size < np.prod(medium.shape):
-        return [1, True]
-    needed_bits = math.ceil(message_size / np.prod(medium.shape))
-    if needed_bits < HeaderUtils().max_bits_per_pixel:
-        return [needed_bits, True]
-    raise OverflowError("Message does not fit into medium!")
+    mask = flat_image.dtype.type(np.iinfo(flat_image.dtype).max ^ ((1 << bits) - 1))
+    pixel_slice = slice(start, start + len(symbols))
+    flat_image[pixel_slice] = (flat_image[pixel_slice] & mask) | symbols
 
 
-def ensure_correct_setup(setup, msg_size, medium):
+def message_range(start, offset, count, channels, all_channels):
     """
-    Ensures that the settings are suitable for hiding the message in the given medium.
+    Locate a run of message symbols in the image.
 
-    :param setup: The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
-    :param msg_size: The size of the message in bytes.
-    :param medium: The medium to hide the message in.
+    :param start: The index of the first pixel after the header.
+    :param offset: The index of the first symbol of the run within the message.
+    :param count: The number of symbols in the run.
+    :param channels: The number of channels of the image.
+    :param all_channels: A boolean indicating whether the symbols are spread across all channels.
 
-    :return: The corrected setup if necessary, or the original setup if it is already valid.
+    :return: A tuple (first pixel, end pixel, index of the first symbol within the channels of those pixels).
     """
-    msg_size += HeaderUtils().header_length
-    if setup is None:
-        return get_optimal_setup(msg_size, medium)
-    if msg_size > medium.shape[0] * medium.shape[1] * setup[0] * (3 if setup[1] else 1):
-        print("Invalid setup, choosing setup automatically...")
-        return get_optimal_setup(msg_size, medium)
-    return setup
+    if not all_channels:
+        return start + offset, start + offset + count, 0
+    first = start * channels + offset
+    return first // channels, -(-(first + count) // channels), first % channels
 
 
-def reshape_array(arr, num_columns=3):
+def scatter_permutation(flat_image, start, all_channels, key):
     """
-    Reshape a 1-dimensional array into a 2-dimensional array with a specified number of columns.
-    :param arr: The 1-dimensional array to be reshaped.
-    :param num_columns: The desired number of columns in the reshaped array.
+    Get the keyed permutation scattering the message symbols across the message area.
 
-    :return: The reshaped array.
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel after the header.
+    :param all_channels: A boolean indicating whether the symbols are spread across all channels.
+    :param key: The key the permutation is derived from.
+
+    :return: A scatter.Permutation of the symbol slots after the header.
     """
-    num_rows = (len(arr) + num_columns - 1) // num_columns
-    num_padding = num_rows * num_columns - len(arr)
-    
-    padded_array = np.pad(arr, (0, num_padding), mode='constant')
-    arr = padded_array.reshape(num_rows, num_columns)
+    slots = len(flat_image) - start
+    return scatter.permutation(key, slots * flat_image.shape[1] if all_channels else slots)
 
-    return arr
 
+def scattered_slots(flat_image, start, offset, count, all_channels, permutation):
+    """
+    Locate scattered message symbols in the image.
+
+    :return: A tuple (pixel indices, channel indices or None if the symbols use whole pixels).
+    """
+    slots = permutation(np.arange(offset, offset + count))
+    if not all_channels:
+        return start + slots, None
+    pixels, channels = np.divmod(slots, flat_image.shape[1])
+    return start + pixels, channels
+
+
+def embed_scattered(flat_image, start, symbols, bits, all_channels, offset, permutation):
+    mask = flat_image.dtype.type(np.iinfo(flat_image.dtype).max ^ ((1 << bits) - 1))
+    for chunk in range(0, len(symbols), scatter.CHUNK_SYMBOLS):
+        chunk_symbols = symbols[chunk:chunk + scatter.CHUNK_SYMBOLS]
+        pixels, channels = scattered_slots(flat_image, start, offset + chunk, len(chunk_symbols), all_channels, permutation)
+        if all_channels:
+            flat_image[pixels, channels] = (flat_image[pixels, channels] & mask) | chunk_symbols
+            continue
+        colors = flat_image[:, :COLOR_CHANNELS]
+        if FILL_WITH_NOISE:
+            noise_array = np.random.randint(2, size=(len(chunk_symbols), colors.shape[1] - 1))
+            chunk_symbols = np.column_stack((chunk_symbols, noise_array))
+        else:
+            chunk_symbols = chunk_symbols[:, None]
+        colors[pixels] = (colors[pixels] & mask) | chunk_symbols
+
+
+def embed_message(flat_image, start, symbols, bits, all_channels, offset=0, permutation=None):
+    """
+    Substitute the lowest bits of the message area with the given symbols (in place).
+
+    With all_channels set the symbols are spread across all channels, alpha included. Otherwise every symbol is written
+    to the color channels of a pixel and the alpha channel of RGBA images is left unchanged.
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel after the header.
+    :param symbols: A flat array of symbols to embed.
+    :param bits: The number of bits per channel to substitute.
+    :param all_channels: A boolean indicating whether to spread the symbols across all channels.
+    :param offset: (Optional) The index of the first symbol within the message, used when embedding in chunks.
+    :param permutation: (Optional) The scatter_permutation placing the symbols, by default they are consecutive.
+    """
+    if permutation is not None:
+        return embed_scattered(flat_image, start, symbols, bits, all_channels, offset, permutation)
+    channels = flat_image.shape[1]
+    first, end, skip = message_range(start, offset, len(symbols), channels, all_channels)
+    if all_channels:
+        block = flat_image[first:end].reshape(-1)
+        embed_symbols(block, skip, symbols, bits)
+        if not np.may_share_memory(block, flat_image):
+            flat_image[first:end] = block.reshape(-1, channels)
+        return
+    colors = flat_image[:, :COLOR_CHANNELS]
+    if FILL_WITH_NOISE:
+        noise_array = np.random.randint(2, size=(len(symbols), colors.shape[1] - 1))
+        symbols = np.column_stack((symbols, noise_array))
+    else:
+        symbols = symbols[:, None]
+    embed_symbols(colors, first, symbols, bits)
+
+
+def band_unit(bits, channels, all_channels):
+    """
+    Get the granularity of the bands a message is split into for parallel processing.
+
+    Bands start at whole bytes of the message, so every band packs its own bytes, and across all channels at whole
+    pixels, so no pixel is written by two bands.
+
+    :return: The number of symbols every band but the last is a multiple of.
+    """
+    unit = 8 // math.gcd(8, bits)
+    return unit * channels // math.gcd(unit, channels) if all_channels else unit
+
+
+def embed_bytes(flat_image, start, msg, bits, all_channels, permutation=None, workers=None):
+    """
+    Pack a message into symbols and embed it (in place), band by band on a thread pool.
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel after the header.
+    :param msg: The message as bytes.
+    :param bits: The number of bits per channel to substitute.
+    :param all_channels: A boolean indicating whether to spread the symbols across all channels.
+    :param permutation: (Optional) The scatter_permutation placing the symbols, by default they are consecutive.
+    :param workers: (Optional) The number of threads, 0 for one per CPU, defaults to 1.
+    """
+    msg = memoryview(msg)
+
+    def embed_band(first, end):
+        data = msg[first * bits // 8:math.ceil(end * bits / 8)]
+        embed_message(flat_image, start, bytes2symbols(data, bits)[:end - first], bits, all_channels, first, permutation)
+
+    count = math.ceil(len(msg) * 8 / bits)
+    parallel.run(embed_band, parallel.bands(count, workers, band_unit(bits, flat_image.shape[1], all_channels)), workers)
+
+
+def extract_bytes(flat_image, start, length, bits, all_channels, permutation=None, workers=None):
+    """
+    Extract a message and unpack it into bytes, band by band on a thread pool.
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel after the header.
+    :param length: The length of the message in bits.
+    :param bits: The number of bits per symbol.
+    :param all_channels: A boolean indicating whether the symbols are spread across all channels.
+    :param permutation: (Optional) The scatter_permutation the symbols were placed with.
+    :param workers: (Optional) The number of threads, 0 for one per CPU, defaults to 1.
+
+    :return: The message as bytes, the last byte is padded with zeros if length is not a multiple of 8.
+
+    :raises ValueError: If the image does not contain enough pixels.
+    """
+    count = math.ceil(length / bits)
+    values = np.empty(math.ceil(length / 8), dtype=np.uint8)
+
+    def extract_band(first, end):
+        symbols = extract_symbols(flat_image, start, end - first, bits, all_channels, first, permutation)
+        band_length = min(end * bits, length) - first * bits
+        values[first * bits // 8:math.ceil((first * bits + band_length) / 8)] = np.frombuffer(
+            symbols2bytes(symbols, bits, band_length), dtype=np.uint8)
+
+    if permutation is None and message_range(start, 0, count, flat_image.shape[1], all_channels)[1] > len(flat_image):
+        raise ValueError("Content length exceeds medium, the image does not contain a valid message")
+    parallel.run(extract_band, parallel.bands(count, workers, band_unit(bits, flat_image.shape[1], all_channels)), workers)
+    return values.tobytes()
+
+
+def medium_image(image):
+    """
+    Bring an image decoded with cv2.IMREAD_UNCHANGED into the layout of a medium.
+
+    The alpha channel and 16-bit channels are kept, grayscale images are expanded to 3 channels.
+
+    :param image: The decoded image as a NumPy array.
+
+    :return: The image as array of shape (height, width, channels).
 
-def encode(medium_filename, message_filename, hidden_filename, key=None, setup=None):
+    :raises ValueError: If the image has neither 8 nor 16 bits per channel.
+    """
+    if image.dtype not in MEDIUM_DTYPES:
+        raise ValueError("Only images with 8 or 16 bits per channel are supported")
+    if image.ndim == 2 or image.shape[2] == 1:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def read_image(filename):
+    """
+    Decode an image file as medium, keeping its alpha channel and its bit depth, see medium_image.
+
+    :param filename: The filename of the image.
+
+    :return: The decoded image as a NumPy array, or None if the file can not be decoded (like cv2.imread).
+
+    :raises ValueError: If the image has neither 8 nor 16 bits per channel.
+    """
+    image = cv2.imread(filename, cv2.IMREAD_UNCHANGED)
+    return None if image is None else medium_image(image)
+
+
+def load_image(data):
+    """
+    Decode an image from an in-memory buffer, keeping its alpha channel and its bit depth, see medium_image.
+
+    :param data: The encoded image (e.g. the content of a PNG file) as bytes, or an already decoded image array.
+
+    :return: The decoded image as a NumPy array.
+
+    :raises ValueError: If the data can not be decoded as an image.
+    """
+    if isinstance(data, np.ndarray):
+        return data
+    with span("image-decode", len(data)):
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Data could not be decoded as an image")
+    return medium_image(image)
+
+
+def associated_data(shard):
+    """
+    Get the data authenticated along with an encrypted message.
+
+    Binds a shard to its position in the shard set, so shards can not be swapped unnoticed.
+
+    :param shard: A tuple (shard_id, shard_index, shard_count), or None if the message is not a shard.
+
+    :return: The associated data as bytes.
+    """
+    if shard is None:
+        return b""
+    return "{}:{}:{}".format(*shard).encode()
+
+
+def encrypt(msg, key, associated=b""):
+    """
+    Encrypt a message using AES-GCM.
+
+    :param msg: The message as bytes.
+    :param key: The encryption key.
+    :param associated: (Optional) Additional data to authenticate.
+
+    :return: The random 12 byte nonce followed by the ciphertext and the tag.
+    """
+    # imported here, so paths without encryption do not load the crypto stack
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    nonce = secrets.token_bytes(12)
+    with span("encrypt", len(msg)):
+        return nonce + AESGCM(key).encrypt(nonce, msg, associated)
+
+
+def decrypt(values, key, associated=b""):
+    """
+    Decrypt a message encrypted by encrypt.
+
+    :param values: The nonce followed by the ciphertext and the tag.
+    :param key: The encryption key.
+    :param associated: (Optional) The additional data authenticated during encryption.
+
+    :return: The decrypted message.
+
+    :raises InvalidTag: If the decryption fails.
+    """
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+    with span("decrypt", len(values)):
+        return AESGCM(key).decrypt(values[:12], values[12:], associated)
+
+
+def embed_header(flat_image, length, filetype, bits, all_channels, encrypted, shard=None, scattered=False, checksum=None,
+                 compression=None):
+    """
+    Encode the header and write it to the first pixels of an image (in place).
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param length: The length of the message in bits.
+    :param filetype: The filetype.
+    :param bits: The number of bits per channel used for the message.
+    :param all_channels: Whether or not the message uses all channels.
+    :param encrypted: Whether or not the message is encrypted.
+    :param shard: (Optional) A tuple (shard_id, shard_index, shard_count) if the message is one shard of a larger payload.
+    :param scattered: (Optional) Whether or not the message is scattered across the image.
+    :param checksum: (Optional) The CRC32 of the message as stored in the image.
+    :param compression: (Optional) The id of the algorithm the message was compressed with, see src.compression.
+
+    :return: The index of the first pixel after the header.
+    """
+    with span("header"):
+        header_bits = VersionedHeader().encode_header(length, filetype, bits, all_channels, encrypted, shard, scattered, checksum,
+                                                      compression)
+        header_array = np.frombuffer(header_bits.encode(), dtype=np.uint8) - ord('0')
+        header_array = reshape_array(header_array, flat_image.shape[1])
+        embed_symbols(flat_image, 0, header_array, 1)
+    return len(header_array)
+
+
+def header_flags(shard=False, checksum=True, compressed=False):
+    """
+    Get the header flags deciding which optional fields a header has.
+
+    :param shard: (Optional) Whether or not the message is a shard.
+    :param checksum: (Optional) Whether or not the header stores a checksum of the message.
+    :param compressed: (Optional) Whether or not the message is compressed.
+
+    :return: The flags, as accepted by VersionedHeader.header_length.
+    """
+    flags = (VersionedHeader.FLAG_SHARD if shard else 0) | (VersionedHeader.FLAG_CHECKSUM if checksum else 0)
+    return flags | (VersionedHeader.FLAG_COMPRESSED if compressed else 0)
+
+
+def compress_message(msg, compress):
+    """
+    Compress a message before it is encrypted and hidden.
+
+    :param msg: The message as bytes.
+    :param compress: True to choose the algorithm automatically, or the name of an algorithm in compression.ALGORITHMS.
+
+    :return: A tuple (algorithm id or None if the message is kept uncompressed, the message to hide).
+    """
+    with span("compress", len(msg)):
+        return compressors.compress(msg, None if compress is True else compress)
+
+
+def check_checksum(values, header):
+    """
+    Compare the message extracted from an image with the checksum in its header.
+
+    :param values: The message as stored in the image (before decryption).
+    :param header: The decoded Header, nothing is checked if it has no checksum.
+
+    :raises ValueError: If the checksum does not match, i.e. the message is corrupted.
+    """
+    if header.checksum is not None and zlib.crc32(values) != header.checksum:
+        raise ValueError("Checksum mismatch, the message is corrupted")
+
+
+def hide_data(image, msg, filetype="", key=None, setup=None, shard=None, scatter=False, checksum=True, compress=False,
+              workers=None, precompressed=None):
+    """
+    Hide a message in a decoded image (in place).
+
+    :param image: The image to hide the message in, as a NumPy array.
+    :param msg: The message as bytes.
+    :param filetype: (Optional) The file extension of the message, stored in the header.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param shard: (Optional) A tuple (shard_id, shard_index, shard_count) if the message is one shard of a larger payload.
+    :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+    :param checksum: (Optional) Store the CRC32 of the message in the header, so corruption is detected when extracting.
+    :param compress: (Optional) Compress the message before encrypting it, True to choose the algorithm automatically
+                     or the name of an algorithm in compression.ALGORITHMS. Incompressible messages are kept as they are.
+    :param workers: (Optional) The number of threads embedding the message in bands, 0 for one per CPU, defaults to 1.
+    :param precompressed: (Optional) The algorithm id the message is already compressed with (see compress_message),
+                          it is then stored as is and compress is ignored.
+
+    :return: The image containing the message.
+
+    :raises ValueError: If scatter is set without a key or the compression algorithm is not available.
+    :raises OverflowError: If there is insufficient space in the medium to hide the message.
+    """
+    if scatter and key is None:
+        raise ValueError("Scattering requires a key")
+    algorithm = precompressed
+    if compress and precompressed is None:
+        algorithm, msg = compress_message(msg, compress)
+    if key is not None:
+        msg = encrypt(msg, key, associated_data(shard))
+
+    msg_length = len(msg) * 8
+
+    header_length = VersionedHeader().header_length(filetype, header_flags(shard, checksum, algorithm is not None))
+    nr_bits, use_all_channels = ensure_correct_setup(setup, msg_length, image, header_length)
+
+    flat_image = image.reshape(-1, image.shape[-1])
+    data_start = embed_header(flat_image, msg_length, filetype, nr_bits, use_all_channels, key is not None, shard, scatter,
+                              zlib.crc32(msg) if checksum else None, algorithm)
+    permutation = scatter_permutation(flat_image, data_start, use_all_channels, key) if scatter else None
+    if parallel.resolve_workers(workers) > 1:
+        # every band packs its part of the message, so there is no separate bit-pack stage
+        with span("embed", len(msg)):
+            embed_bytes(flat_image, data_start, msg, nr_bits, use_all_channels, permutation, workers)
+        return flat_image.reshape(image.shape)
+    with span("bit-pack", len(msg)):
+        msg_array = bytes2symbols(msg, nr_bits)
+    with span("embed", len(msg)):
+        embed_message(flat_image, data_start, msg_array, nr_bits, use_all_channels, permutation=permutation)
+    return flat_image.reshape(image.shape)
+
+
+def output_settings(output_format=None, compression=None):
+    """
+    Get the file extension and the encoder parameters of an output format.
+
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+
+    :return: A tuple (file extension, list of cv2.imencode parameters).
+
+    :raises ValueError: If the format is unknown or the compression level does not apply.
+    """
+    if output_format is None:
+        output_format = "png"
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("Unsupported output format {}, choose one of {}".format(output_format, ", ".join(OUTPUT_FORMATS)))
+    extension, names = OUTPUT_FORMATS[output_format]
+    params = {getattr(cv2, name): getattr(cv2, value) if isinstance(value, str) else value
+              for name, value in names.items() if hasattr(cv2, name)}
+    if compression is not None:
+        if extension != ".png" or not 0 <= compression <= 9:
+            raise ValueError("Compression level must be 0-9 and only applies to PNG output")
+        params[cv2.IMWRITE_PNG_COMPRESSION] = compression
+    return extension, [value for item in params.items() for value in item]
+
+
+def check_output_depth(image, output_format=None):
+    """
+    Check that an output format stores all bits of every channel of an image.
+
+    :param image: The image as a NumPy array.
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+
+    :raises ValueError: If the image has 16 bits per channel and the format stores only 8, or the format drops the
+                        color of transparent pixels and the image has pixels that are or may become transparent.
+    """
+    extension = output_settings(output_format)[0]
+    if image.dtype != np.uint8 and extension not in DEEP_EXTENSIONS:
+        raise ValueError("The {} format does not store 16 bits per channel".format(output_format))
+    # substituting the low bits of the alpha channel can turn an almost transparent pixel into a transparent one
+    if (extension not in ALPHA_EXTENSIONS and image.ndim == 3 and image.shape[-1] == 4
+            and (image[..., 3] < 1 << MAX_BITS_PER_CHANNEL).any()):
+        raise ValueError("The {} format does not store the color of transparent pixels, use png or tiff for images "
+                         "with (almost) transparent pixels".format(output_format))
+
+
+def encode_image(image, output_format=None, compression=None):
+    """
+    Encode an image losslessly.
+
+    :param image: The image as a NumPy array.
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+
+    :return: The encoded image as bytes.
+
+    :raises ValueError: If the image can not be encoded, e.g. a 16-bit image in a format storing only 8 bits per channel.
+    """
+    extension, params = output_settings(output_format, compression)
+    check_output_depth(image, output_format)
+    with span("image-encode", image.nbytes):
+        success, data = cv2.imencode(extension, image, params)
+    if not success:
+        raise ValueError("Image could not be encoded")
+    return data.tobytes()
+
+
+def encode_bytes(medium, payload, filetype="", key=None, setup=None, output_format=None, compression=None, scatter=False,
+                 compress=False, workers=None, precompressed=None):
+    """
+    Encode a message into an image in memory using LSB Steganography.
+
+    :param medium: The medium to hide the message in, as encoded image bytes or as a decoded image array (which is not modified).
+    :param payload: The message as bytes.
+    :param filetype: (Optional) The file extension of the message, stored in the header.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+    :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+    :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm, see hide_data.
+    :param workers: (Optional) The number of threads embedding the message, 0 for one per CPU, see hide_data.
+    :param precompressed: (Optional) The algorithm id the payload is already compressed with, see hide_data.
+
+    :return: The resulting steganographic image as bytes (PNG unless another output format is given).
+
+    :raises ValueError: If the medium can not be decoded, it has 16 bits per channel and the output format stores only 8,
+                        or scatter is set without a key.
+    :raises OverflowError: If there is insufficient space in the medium to hide the message.
+    """
+    image = load_image(medium).copy()
+    check_output_depth(image, output_format)
+    image = hide_data(image, payload, filetype, key, setup, scatter=scatter, compress=compress, workers=workers,
+                      precompressed=precompressed)
+    return encode_image(image, output_format, compression)
+
+
+def hidden_filename_for(hidden_filename, output_format=None):
+    """
+    Complete the filename of a resulting image with the extension of the output format.
+
+    :param hidden_filename: The filename, defaults to "hidden" if None.
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+
+    :return: The filename ending with the extension of the format.
+    """
+    extension, _ = output_settings(output_format)
+    hidden_filename = hidden_filename or "hidden"
+    if not hidden_filename.endswith(extension):
+        hidden_filename += extension
+    return hidden_filename
+
+
+def encode(medium_filename, message_filename, hidden_filename, key=None, setup=None, output_format=None, compression=None,
+           scatter=False, compress=False, workers=None):
     """
     Encode a message into an image file using LSB Steganography.
 
@@ -79,62 +561,108 @@ def encode(medium_filename, message_filename, hidden_filename, key=None, setup=N
     :param hidden_filename: The filename of the resulting steganographic image file.
     :param key: (Optional) The encryption key to encrypt the message.
     :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param output_format: (Optional) The name of the format in OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+    :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+    :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm, see hide_data.
+    :param workers: (Optional) The number of threads embedding the message, 0 for one per CPU, see hide_data.
+
+    Uncompressed media (see raw.is_raw) are memory-mapped and only the pixels holding the message are written,
+    the result keeps the format of the medium. Videos (see video.is_video) are processed frame by frame and written
+    with a lossless codec, output_format, compression and workers only apply to images.
 
     :raises FileNotFoundError: If the medium file is not found.
-    :raises ValueError: If the message file is not found.
+    :raises ValueError: If the message file is not found or scatter is set without a key.
     :raises OverflowError: If there is insufficient space in the medium to hide the message.
     """
-    image = cv2.imread(medium_filename)
-    if image is None:
+    if raw.is_raw(medium_filename):
+        return encode_raw(medium_filename, message_filename, hidden_filename, key, setup, scatter, compress, workers)
+    if video.is_video(medium_filename):
+        return video.encode_video(medium_filename, message_filename, hidden_filename, key, setup, scatter=scatter,
+                                  compress=compress)
+    if not path.isfile(medium_filename):
         raise FileNotFoundError("Medium not found")
-    with open(message_filename, "rb") as f:
-        msg = f.read()
+    with span("read") as s:
+        with open(medium_filename, "rb") as f:
+            medium = f.read()
+        with open(message_filename, "rb") as f:
+            msg = f.read()
+        s.bytes = len(medium) + len(msg)
     if msg is None:
         raise ValueError("Message not found")
-    if key is not None:
-        # encrypt data
-        nonce = secrets.token_bytes(12)
-        msg = nonce + AESGCM(key).encrypt(nonce, msg, b"")
-    if hidden_filename is None:
-        hidden_filename = "hidden"
+    hidden_filename = hidden_filename_for(hidden_filename, output_format)
 
-    msg = ''.join(format(byte, '08b') for byte in msg)
-    
     filetype = path.splitext(message_filename)[1][1:]
-    nr_bits, use_all_channels = ensure_correct_setup(setup, len(msg), image)
-    header_bits = HeaderUtils().encode_header(len(msg), filetype, nr_bits, use_all_channels, key is not None)
+    data = encode_bytes(medium, msg, filetype, key, setup, output_format, compression, scatter, compress, workers)
 
-    header_mask = 1
-    mask = ~((1 << nr_bits) - 1)
-
-    flat_image = image.reshape(-1, image.shape[-1])
-    header_array = [int(bdigit) for bdigit in header_bits]
-    msg_array = [int(msg[i:i+nr_bits], 2) for i in range(0, len(msg), nr_bits)]
+    with span("write", len(data)), open(hidden_filename, "wb") as f:
+        f.write(data)
+    print("Message was hidden in {}".format(hidden_filename))
 
-    header_array = reshape_array(header_array)
-    flat_image[:len(header_array)] = (flat_image[:len(header_array)] & header_mask) + header_array 
 
-    if use_all_channels:
-        msg_array = reshape_array(msg_array)
-    else:
-        if FILL_WITH_NOISE:
-            noise_shape = (len(msg_array), 1)
-            noise_array = np.ravel(np.random.randint(2, size=noise_shape))
-            noise_array2 = np.ravel(np.random.randint(2, size=noise_shape))
-            msg_array = np.stack((msg_array,noise_array,noise_array2), axis=-1)
-        else:
-            msg_array = np.stack((msg_array,msg_array,msg_array), axis=-1)
+def encode_raw(medium_filename, message_filename, hidden_filename, key=None, setup=None, scatter=False, compress=False,
+               workers=None):
+    """
+    Encode a message into an uncompressed carrier, writing only the pixels holding the header and the message.
 
-    msg_slice = slice(len(header_array), len(header_array) + len(msg_array))
-    flat_image[msg_slice] = (flat_image[msg_slice] & mask) + msg_array
+    :param medium_filename: The filename of the medium (.ppm, .pnm or .npy).
+    :param message_filename: The filename of the message file to be hidden.
+    :param hidden_filename: The filename of the resulting carrier, the extension of the medium is appended if missing.
+                            If it is the medium itself, the message is embedded in place.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+    :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm, see hide_data.
+    :param workers: (Optional) The number of threads embedding the message, 0 for one per CPU, see hide_data.
 
-    image = flat_image.reshape(image.shape)
-    if not hidden_filename.endswith(".png"):
-        hidden_filename += ".png"
-    cv2.imwrite(hidden_filename, image)
+    :raises FileNotFoundError: If the medium file is not found.
+    :raises ValueError: If scatter is set without a key.
+    :raises OverflowError: If there is insufficient space in the medium to hide the message.
+    """
+    if not path.isfile(medium_filename):
+        raise FileNotFoundError("Medium not found")
+    with open(message_filename, "rb") as f:
+        msg = f.read()
+    extension = path.splitext(medium_filename)[1]
+    hidden_filename = hidden_filename or "hidden"
+    if not hidden_filename.lower().endswith(extension.lower()):
+        hidden_filename += extension
+    copied = not path.exists(hidden_filename) or not path.samefile(medium_filename, hidden_filename)
+    if copied:
+        shutil.copyfile(medium_filename, hidden_filename)
+
+    image = None
+    filetype = path.splitext(message_filename)[1][1:]
+    try:
+        image = raw.open_raw(hidden_filename, writable=True)
+        hide_data(image, msg, filetype, key, setup, scatter=scatter, compress=compress, workers=workers)
+    except Exception:
+        # the memory map has to be closed before the copy is removed
+        image = None
+        if copied:
+            os.remove(hidden_filename)
+        raise
+    image.flush()
     print("Message was hidden in {}".format(hidden_filename))
 
 
+def decode_raw(filename, key=None, output_name=None, workers=None):
+    """
+    Decodes a hidden message from an uncompressed carrier, reading only the pixels holding the header and the message.
+
+    :param filename: The filename of the carrier (.ppm, .pnm or .npy).
+    :param key: The encryption key used to decrypt the message.
+    :param output_name: The name of the output file (without extension).
+    :param workers: (Optional) The number of threads extracting the message, 0 for one per CPU, see extract_data.
+
+    :raises: FileNotFoundError if the carrier is not found.
+    :raises: ValueError if the key is missing and the message is encrypted.
+    :raises: InvalidTag if the decryption fails.
+    """
+    values, header = reveal_data(raw.open_raw(filename), key, workers)
+    write_bytes_to_file(values, header.filetype, output_name)
+
+
 def write_bytes_to_file(bytes, file_extension, file_name):
     """
     Write bytes to a file with the specified file extension and name.
@@ -144,7 +672,7 @@ def write_bytes_to_file(bytes, file_extension, file_name):
     :param file_name: The name of the file.
     """
     file_name = "{}.{}".format(file_name or "message", file_extension)
-    with open(file_name, "wb") as f:
+    with span("write", len(bytes)), open(file_name, "wb") as f:
         f.write(bytes)
     print("Message written to {}".format(file_name))
 
@@ -157,14 +685,149 @@ def extract_bits(image, bits=1, all_channels=True):
     :param bits: The number of bits to extract per pixel.
     :param all_channels: A boolean indicating whether to extract bits from all color channels.
 
-    :return: A list of extracted bits as binary strings.
+    :return: A flat uint8 array of extracted symbols, one per pixel and channel.
     """
     mask = (1 << bits) - 1
     if not all_channels:
-        image = image[:, :, ::3]
-    result = image & mask
-    result = [bin(x)[2:].zfill(bits) for x in np.ravel(result)]
-    return result
+        image = image[..., :1]
+    return np.ravel(image & mask).astype(np.uint8, copy=False)
+
+
+def read_header(flat_image):
+    """
+    Read and decode the header stored in the first pixels of an image, the header version is detected automatically.
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+
+    :return: A tuple (decoded Header, index of the first pixel after the header).
+
+    :raises ValueError: If the image does not contain a valid header.
+    """
+    channels = flat_image.shape[1]
+
+    def read_bits(n):
+        nr_pixels = math.ceil(n / channels)
+        if len(flat_image) < nr_pixels:
+            raise ValueError("Image too small to contain a header")
+        return ''.join(map(str, extract_bits(flat_image[:nr_pixels])[:n]))
+
+    header = decode_header(read_bits)
+    return header, math.ceil(header.header_length / channels)
+
+
+def extract_scattered(flat_image, start, count, bits, all_channels, offset, permutation):
+    if offset + count > permutation.size:
+        raise ValueError("Content length exceeds medium, the image does not contain a valid message")
+    mask = (1 << bits) - 1
+    symbols = np.empty(count, dtype=np.uint8)
+    for chunk in range(0, count, scatter.CHUNK_SYMBOLS):
+        chunk_count = min(scatter.CHUNK_SYMBOLS, count - chunk)
+        pixels, channels = scattered_slots(flat_image, start, offset + chunk, chunk_count, all_channels, permutation)
+        symbols[chunk:chunk + chunk_count] = flat_image[pixels, 0 if channels is None else channels] & mask
+    return symbols
+
+
+def extract_symbols(flat_image, start, count, bits, all_channels, offset=0, permutation=None):
+    """
+    Extract a number of consecutive symbols, reading only the pixels that hold them.
+
+    :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+    :param start: The index of the first pixel after the header.
+    :param count: The number of symbols to extract.
+    :param bits: The number of bits per symbol.
+    :param all_channels: A boolean indicating whether the symbols are spread across all channels.
+    :param offset: (Optional) The index of the first symbol within the message, used when extracting in chunks.
+    :param permutation: (Optional) The scatter_permutation the symbols were placed with.
+
+    :return: A flat uint8 array containing the symbols.
+
+    :raises ValueError: If the image does not contain enough pixels.
+    """
+    if permutation is not None:
+        return extract_scattered(flat_image, start, count, bits, all_channels, offset, permutation)
+    first, end, skip = message_range(start, offset, count, flat_image.shape[1], all_channels)
+    if end > len(flat_image):
+        raise ValueError("Content length exceeds medium, the image does not contain a valid message")
+    return extract_bits(flat_image[first:end], bits, all_channels)[skip:skip + count]
+
+
+def extract_data(image, key=None, workers=None):
+    """
+    Extract the header and the data hidden within a decoded image using LSB Substitution.
+
+    Only the pixels covered by the header and the message are read.
+
+    :param image: The image containing the hidden data, as a NumPy array.
+    :param key: (Optional) The key the message was scattered with, only needed for scattered messages.
+    :param workers: (Optional) The number of threads extracting the message in bands, 0 for one per CPU, defaults to 1.
+
+    :return: A tuple (extracted data as bytes, the decoded Header).
+
+    :raises: ValueError if the message is scattered and the key is missing, or an unencrypted message does not match
+             the checksum in the header (encrypted messages are authenticated when decrypting).
+    """
+    flat_image = image.reshape(-1, image.shape[-1])
+
+    with span("header"):
+        header, data_start = read_header(flat_image)
+    permutation = None
+    if header.scattered:
+        if key is None:
+            raise ValueError("Decryption key is missing")
+        permutation = scatter_permutation(flat_image, data_start, header.all_channels, key)
+    nbytes = math.ceil(header.length / 8)
+    if parallel.resolve_workers(workers) > 1:
+        # every band unpacks its part of the message, so there is no separate unpack stage
+        with span("extract", nbytes):
+            values = extract_bytes(flat_image, data_start, header.length, header.bits, header.all_channels, permutation,
+                                   workers)
+    else:
+        with span("extract", nbytes):
+            symbols = extract_symbols(flat_image, data_start, math.ceil(header.length / header.bits), header.bits,
+                                      header.all_channels, permutation=permutation)
+        with span("unpack", nbytes):
+            values = symbols2bytes(symbols, header.bits, header.length)
+    if not header.encrypted:
+        check_checksum(values, header)
+    return values, header
+
+
+def fetch_data(image):
+    """
+    Fetch data hidden within a decoded image using LSB Substitution.
+
+    :param image: The image containing the hidden data, as a NumPy array.
+
+    :return: A tuple (extracted data as bytes, the filetype, whether it was encrypted or not).
+    """
+    bytes_data, header = extract_data(image)
+    return bytes_data, header.filetype, header.encrypted
+
+
+def reveal_data(image, key=None, workers=None, max_size=None):
+    """
+    Extract and, if necessary, decrypt and decompress the message hidden within a decoded image.
+
+    :param image: The image containing the hidden message, as a NumPy array.
+    :param key: The encryption key used to decrypt the message.
+    :param workers: (Optional) The number of threads extracting the message, 0 for one per CPU, see extract_data.
+    :param max_size: (Optional) The largest accepted size of a compressed message once decompressed, in bytes.
+
+    :return: A tuple (message as bytes, the decoded Header).
+
+    :raises: ValueError if the key is missing and the message is encrypted, or the message is corrupted.
+    :raises: InvalidTag if the decryption fails.
+    """
+    values, header = extract_data(image, key, workers)
+    if header.encrypted:
+        if key is None:
+            raise ValueError("Decryption key is missing")
+        else:
+            values = decrypt(values, key, associated_data(header.shard))
+    if header.compression is not None:
+        with span("decompress", len(values)):
+            values = compressors.decompress(values, header.compression, max_size)
+    return values, header
 
 
 def fetch_data_from_file(filename):
@@ -174,47 +837,58 @@ def fetch_data_from_file(filename):
     :param filename: The filename of the image file containing the hidden data.
 
     :return: A tuple (extracted data as bytes, the filetype, whether it was encrypted or not).
+
+    :raises FileNotFoundError: If the image file is not found.
     """
-    image = cv2.imread(filename)
-    image_array = np.array(image)
+    with span("image-decode"):
+        image = read_image(filename)
+    if image is None:
+        raise FileNotFoundError("Image not found")
+    return fetch_data(image)
 
-    bits_list = extract_bits(image_array)
-    binary_string = ''.join([str(x) for x in bits_list])
 
-    header_data = binary_string[:HeaderUtils().header_length]
-    length, filetype, bits, all_channels, enc = HeaderUtils().decode_header(header_data)
-    settings_differ_from_header = bits > 1 or not all_channels
+def decode_bytes(png, key=None, workers=None, max_size=None):
+    """
+    Decodes a hidden message from an image in memory.
 
-    if settings_differ_from_header:
-        bits_list = extract_bits(image_array, bits, all_channels)
-        binary_string = ''.join([str(x) for x in bits_list])
+    :param png: The image containing the hidden message, as encoded image bytes or as a decoded image array.
+    :param key: The encryption key used to decrypt the message.
+    :param workers: (Optional) The number of threads extracting the message, 0 for one per CPU, see extract_data.
+    :param max_size: (Optional) The largest accepted size of a compressed message once decompressed, in bytes.
 
-    data_start = len(header_data)*bits
-    if not all_channels:
-        data_start = math.ceil(data_start / 9) * 3
-    else:
-        data_start += 2 * bits
+    :return: A tuple (message as bytes, the filetype, whether it was encrypted or not).
 
-    cut_data = binary_string[data_start:data_start+length]
-    bytes_data = bytes([int(cut_data[i:i+8], 2) for i in range(0, len(cut_data), 8)])
-    return bytes_data, filetype, enc
+    :raises: ValueError if the image can not be decoded or the key is missing and the message is encrypted.
+    :raises: InvalidTag if the decryption fails.
+    """
+    values, header = reveal_data(load_image(png), key, workers, max_size)
+    return values, header.filetype, header.encrypted
 
 
-def decode(filename="hidden.png", key=None, output_name=None):
+def decode(filename="hidden.png", key=None, output_name=None, workers=None):
     """
     Decodes a hidden message from an image file.
 
     :param filename: The name of the image file containing the hidden message.
     :param key: The encryption key used to decrypt the message.
     :param output_name: The name of the output file (without extension).
+    :param workers: (Optional) The number of threads extracting the message, 0 for one per CPU, see extract_data.
 
+    Uncompressed images (see raw.is_raw) are memory-mapped and only the pixels holding the message are read,
+    videos (see video.is_video) are read frame by frame.
+
+    :raises: FileNotFoundError if the image file is not found.
     :raises: ValueError if the key is missing and the message is encrypted.
     :raises: InvalidTag if the decryption fails.
     """
-    values, filetype, enc = fetch_data_from_file(filename)
-    if enc:
-        if key is None:
-            raise ValueError("Decryption key is missing")
-        else:
-            values = AESGCM(key).decrypt(values[:12], values[12:], b"")
-    write_bytes_to_file(values, filetype, output_name)
\ No newline at end of file
+    if raw.is_raw(filename):
+        return decode_raw(filename, key, output_name, workers)
+    if video.is_video(filename):
+        return video.decode_video(filename, key, output_name)
+    if not path.isfile(filename):
+        raise FileNotFoundError("Image not found")
+    with span("read") as s, open(filename, "rb") as f:
+        png = f.read()
+        s.bytes = len(png)
+    values, filetype, enc = decode_bytes(png, key, workers)
+    write_bytes_to_file(values, filetype, output_name)
@@ -0,0 +1,394 @@
+import math
+import os
+import secrets
+import tempfile
+import zlib
+from os import path
+
+from .bitutils import *
+from .header import *
+from .instrument import span
+from . import compression as compressors, raw, steg, video
+
+CHUNK_SIZE = 1 << 20
+NONCE_SIZE = 12
+TAG_SIZE = 16
+
+
+class SymbolWriter:
+    """
+    Embeds a message into the message area of an image chunk by chunk.
+    """
+
+    def __init__(self, flat_image, start, bits, all_channels, permutation=None):
+        """
+        :param flat_image: The image as a 2-dimensional array of shape (pixels, channels), modified in place.
+        :param start: The index of the first pixel after the header.
+        :param bits: The number of bits per channel to substitute.
+        :param all_channels: A boolean indicating whether to spread the symbols across all channels.
+        :param permutation: (Optional) The steg.scatter_permutation placing the symbols.
+        """
+        self.flat_image = flat_image
+        self.start = start
+        self.bits = bits
+        self.all_channels = all_channels
+        self.permutation = permutation
+        self.offset = 0
+        self.pending = b""
+        self.checksum = 0
+
+    def _embed(self, data):
+        symbols = bytes2symbols(data, self.bits)
+        steg.embed_message(self.flat_image, self.start, symbols, self.bits, self.all_channels, self.offset, self.permutation)
+        self.offset += len(symbols)
+
+    def write(self, data):
+        """
+        Embed the next chunk of the message.
+
+        Bytes that would end in the middle of a symbol are kept back until the next call.
+
+        :param data: The chunk as bytes.
+        """
+        self.checksum = zlib.crc32(data, self.checksum)
+        data = self.pending + data
+        # a multiple of `bits` bytes always splits into whole symbols
+        usable = len(data) - len(data) % self.bits
+        if usable:
+            self._embed(data[:usable])
+        self.pending = data[usable:]
+
+    def close(self):
+        """
+        Embed the remaining bytes, padding the last symbol if necessary.
+        """
+        if self.pending:
+            self._embed(self.pending)
+            self.pending = b""
+
+
+class SymbolReader:
+    """
+    Reads arbitrary byte ranges of a message from the message area of an image.
+    """
+
+    def __init__(self, flat_image, start, bits, all_channels, permutation=None):
+        """
+        :param flat_image: The image as a 2-dimensional array of shape (pixels, channels).
+        :param start: The index of the first pixel after the header.
+        :param bits: The number of bits per symbol.
+        :param all_channels: A boolean indicating whether the symbols are spread across all channels.
+        :param permutation: (Optional) The steg.scatter_permutation the symbols were placed with.
+        """
+        self.flat_image = flat_image
+        self.start = start
+        self.bits = bits
+        self.all_channels = all_channels
+        self.permutation = permutation
+
+    def read(self, byte_offset, size):
+        """
+        Read a range of the message.
+
+        :param byte_offset: The index of the first byte within the message.
+        :param size: The number of bytes to read.
+
+        :return: The bytes of the message.
+        """
+        first_symbol, skip = divmod(byte_offset * 8, self.bits)
+        count = -(-(skip + size * 8) // self.bits)
+        symbols = steg.extract_symbols(self.flat_image, self.start, count, self.bits, self.all_channels, first_symbol,
+                                       self.permutation)
+        return symbols2bytes(symbols, self.bits, size * 8, skip)
+
+
+def compress_file(f, compress, chunk_size=CHUNK_SIZE):
+    """
+    Compress a message file chunk by chunk into a temporary file, which is kept in memory while it is small.
+
+    :param f: The message file opened in binary mode.
+    :param compress: True to choose the algorithm automatically, or the name of an algorithm in compression.ALGORITHMS.
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+
+    :return: A tuple (algorithm id, temporary file positioned at its start), or (None, None) if the message is not
+             compressed, f is then positioned at its start again.
+    """
+    size = os.fstat(f.fileno()).st_size
+    if compress is True:
+        # the same samples compression.entropy takes from a message in memory
+        sample_size = compressors.SAMPLE_SIZE
+        if size > 3 * sample_size:
+            sample = b""
+            for offset in (0, (size - sample_size) // 2, size - sample_size):
+                f.seek(offset)
+                sample += f.read(sample_size)
+        else:
+            sample = f.read()
+        f.seek(0)
+        algorithm = compressors.choose_algorithm(sample, size)
+        if algorithm is None:
+            return None, None
+    else:
+        algorithm = compressors.algorithm_id(compress)
+    compressor = compressors.compressor(algorithm)
+    compressed = tempfile.SpooledTemporaryFile(max_size=chunk_size)
+    with span("compress", size):
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            compressed.write(compressor.compress(chunk))
+        compressed.write(compressor.flush())
+    f.seek(0)
+    if compressed.tell() >= size:
+        compressed.close()
+        return None, None
+    compressed.seek(0)
+    return algorithm, compressed
+
+
+def encode_stream(medium_filename, message_filename, hidden_filename, key=None, setup=None, chunk_size=CHUNK_SIZE,
+                  output_format=None, compression=None, scatter=False, compress=False):
+    """
+    Encode a message into an image file, reading and embedding the message chunk by chunk.
+
+    Produces the same format as steg.encode, but the memory used for the message is bounded by chunk_size.
+    Videos (see video.is_video) are passed to video.encode_video.
+
+    :param medium_filename: The filename of the medium to hide the message in.
+    :param message_filename: The filename of the message file to be hidden.
+    :param hidden_filename: The filename of the resulting steganographic image file.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+    :param output_format: (Optional) The name of the format in steg.OUTPUT_FORMATS, defaults to "png".
+    :param compression: (Optional) The PNG compression level 0-9, overriding the level of the format.
+    :param scatter: (Optional) Scatter the message across the whole image with a permutation derived from the key.
+    :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm, see steg.hide_data.
+                     The compressed message is buffered in a temporary file, as its size decides the setup.
+
+    :raises FileNotFoundError: If the medium or the message file is not found.
+    :raises ValueError: If scatter is set without a key or the compression algorithm is not available.
+    :raises OverflowError: If there is insufficient space in the medium to hide the message.
+    """
+    if video.is_video(medium_filename):
+        return video.encode_video(medium_filename, message_filename, hidden_filename, key, setup, chunk_size=chunk_size,
+                                  scatter=scatter, compress=compress)
+    if scatter and key is None:
+        raise ValueError("Scattering requires a key")
+    image = steg.read_image(medium_filename)
+    if image is None:
+        raise FileNotFoundError("Medium not found")
+    steg.check_output_depth(image, output_format)
+    hidden_filename = steg.hidden_filename_for(hidden_filename, output_format)
+    with open(message_filename, "rb") as message:
+        algorithm, compressed = compress_file(message, compress, chunk_size) if compress else (None, None)
+        with compressed or message as f:
+            msg_size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            _embed_stream(image, f, msg_size, path.splitext(message_filename)[1][1:], key, setup, chunk_size, scatter,
+                          algorithm)
+
+    with open(hidden_filename, "wb") as f:
+        f.write(steg.encode_image(image, output_format, compression))
+    print("Message was hidden in {}".format(hidden_filename))
+
+
+def stored_chunks(f, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Read a message chunk by chunk in the form it is stored in the medium.
+
+    :param f: The message file opened in binary mode.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+
+    :return: A generator yielding the chunks of f, or if a key is given the nonce, the encrypted chunks and the tag.
+    """
+    if key is None:
+        yield from iter(lambda: f.read(chunk_size), b"")
+        return
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    nonce = secrets.token_bytes(NONCE_SIZE)
+    encryptor = Cipher(algorithms.AES(key), modes.GCM(nonce)).encryptor()
+    yield nonce
+    for chunk in iter(lambda: f.read(chunk_size), b""):
+        yield encryptor.update(chunk)
+    yield encryptor.finalize() + encryptor.tag
+
+
+def _embed_stream(image, f, msg_size, filetype, key, setup, chunk_size, scatter, algorithm):
+    # embeds the message read from f into image (in place)
+    if key is not None:
+        msg_size += NONCE_SIZE + TAG_SIZE
+    header_length = VersionedHeader().header_length(filetype, steg.header_flags(compressed=algorithm is not None))
+    nr_bits, use_all_channels = steg.ensure_correct_setup(setup, msg_size * 8, image, header_length)
+
+    flat_image = image.reshape(-1, image.shape[-1])
+    # the header holds the checksum, so it is written once the whole message is embedded
+    data_start = math.ceil(header_length / flat_image.shape[1])
+    permutation = steg.scatter_permutation(flat_image, data_start, use_all_channels, key) if scatter else None
+    writer = SymbolWriter(flat_image, data_start, nr_bits, use_all_channels, permutation)
+    for chunk in stored_chunks(f, key, chunk_size):
+        writer.write(chunk)
+    writer.close()
+    steg.embed_header(flat_image, msg_size * 8, filetype, nr_bits, use_all_channels, key is not None, scattered=scatter,
+                      checksum=writer.checksum, compression=algorithm)
+
+
+def _open_message(filename, key):
+    if raw.is_raw(filename):
+        image = raw.open_raw(filename)
+    else:
+        image = steg.read_image(filename)
+        if image is None:
+            raise FileNotFoundError("Image not found")
+    flat_image = image.reshape(-1, image.shape[-1])
+    header, data_start = steg.read_header(flat_image)
+    if header.scattered and key is None:
+        raise ValueError("Decryption key is missing")
+    permutation = steg.scatter_permutation(flat_image, data_start, header.all_channels, key) if header.scattered else None
+    return header, SymbolReader(flat_image, data_start, header.bits, header.all_channels, permutation)
+
+
+def message_chunks(header, chunks, key=None):
+    """
+    Check the integrity of a message read chunk by chunk, front to back.
+
+    Encrypted messages are decrypted and authenticated if the key is given, the nonce is taken from the first chunks
+    and the last bytes are held back as the tag. Otherwise the message is passed on as stored and compared with the
+    checksum in the header.
+
+    :param header: The decoded Header of the message.
+    :param chunks: An iterable of the chunks of the message as stored in the medium.
+    :param key: (Optional) The encryption key used to decrypt the message.
+
+    :return: A generator yielding the chunks of the message.
+
+    :raises: ValueError if the message does not match the checksum in the header.
+    :raises: InvalidTag if the decryption fails.
+    """
+    if not (header.encrypted and key is not None):
+        checksum = 0
+        for chunk in chunks:
+            checksum = zlib.crc32(chunk, checksum)
+            yield chunk
+        if header.checksum is not None and checksum != header.checksum:
+            raise ValueError("Checksum mismatch, the message is corrupted")
+        return
+
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    decryptor = None
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        if decryptor is None:
+            if len(pending) < NONCE_SIZE:
+                continue
+            decryptor = Cipher(algorithms.AES(key), modes.GCM(pending[:NONCE_SIZE])).decryptor()
+            decryptor.authenticate_additional_data(steg.associated_data(header.shard))
+            pending = pending[NONCE_SIZE:]
+        if len(pending) > TAG_SIZE:
+            yield decryptor.update(pending[:-TAG_SIZE])
+            pending = pending[-TAG_SIZE:]
+    if decryptor is None or len(pending) < TAG_SIZE:
+        raise InvalidTag()
+    yield decryptor.finalize_with_tag(pending)
+
+
+def read_message(header, reader, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Read a message chunk by chunk, checking its integrity once it has been read completely, see message_chunks.
+
+    :param header: The decoded Header of the message.
+    :param reader: The SymbolReader of the message.
+    :param key: (Optional) The encryption key used to decrypt the message.
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+
+    :return: A generator yielding the chunks of the message.
+
+    :raises: ValueError if the message does not match the checksum in the header.
+    :raises: InvalidTag if the decryption fails.
+    """
+    end = header.length // 8
+    stored = (reader.read(offset, min(chunk_size, end - offset)) for offset in range(0, end, chunk_size))
+    return message_chunks(header, stored, key)
+
+
+def write_message(chunks, filetype, output_name=None):
+    """
+    Write a message to a file chunk by chunk, removing the partially written file if reading the message fails.
+
+    :param chunks: An iterable of the chunks of the message.
+    :param filetype: The file extension of the message.
+    :param output_name: (Optional) The name of the output file (without extension).
+
+    :return: The name of the written file.
+    """
+    file_name = "{}.{}".format(output_name or "message", filetype)
+    with open(file_name, "wb") as f:
+        try:
+            for chunk in chunks:
+                f.write(chunk)
+        except Exception:
+            f.close()
+            os.remove(file_name)
+            raise
+    print("Message written to {}".format(file_name))
+    return file_name
+
+
+def decode_stream(filename="hidden.png", key=None, output_name=None, chunk_size=CHUNK_SIZE):
+    """
+    Decodes a hidden message from an image file, writing it to the output file chunk by chunk.
+
+    Reads images written by steg.encode and encode_stream alike, compressed messages are decompressed chunk by chunk.
+    If the decryption, the checksum check or the decompression fails, the partially written output file is removed.
+    Videos (see video.is_video) are passed to video.decode_video.
+
+    :param filename: The name of the image file containing the hidden message.
+    :param key: The encryption key used to decrypt the message.
+    :param output_name: The name of the output file (without extension).
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+
+    :raises: FileNotFoundError if the image file is not found.
+    :raises: ValueError if the key is missing and the message is encrypted, or the message is corrupted.
+    :raises: InvalidTag if the decryption fails.
+    """
+    if video.is_video(filename):
+        return video.decode_video(filename, key, output_name)
+    header, reader = _open_message(filename, key)
+    if header.encrypted and key is None:
+        raise ValueError("Decryption key is missing")
+
+    chunks = read_message(header, reader, key, chunk_size)
+    if header.compression is not None:
+        chunks = compressors.decompress_chunks(chunks, header.compression)
+    write_message(chunks, header.filetype, output_name)
+
+
+def verify_stream(filename, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Check the integrity of a hidden message without writing it anywhere.
+
+    The message is read chunk by chunk and compared with the checksum in its header, or authenticated by decrypting
+    it if it is encrypted and the key is given. Uncompressed carriers are memory-mapped, videos are read frame by frame.
+
+    :param filename: The name of the image file containing the hidden message.
+    :param key: (Optional) The encryption key, needed for scattered messages.
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+
+    :return: The decoded Header of the message.
+
+    :raises: FileNotFoundError if the image file is not found.
+    :raises: ValueError if the image has no valid header, the message is corrupted or can not be checked
+             (no checksum and no key).
+    :raises: InvalidTag if the decryption fails.
+    """
+    if video.is_video(filename):
+        return video.verify_video(filename, key)
+    header, reader = _open_message(filename, key)
+    if header.checksum is None and not (header.encrypted and key is not None):
+        raise ValueError("Message has no checksum to verify")
+    for _ in read_message(header, reader, key, chunk_size):
+        pass
+    return header
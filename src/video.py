@@ -0,0 +1,364 @@
+"""
+Lossless videos as carriers.
+
+The frames of a video are treated as one tall image: the header is stored in the first pixels of the first frame and
+the message continues through the pixels of the following frames, with the same header and bit-packing as images.
+Frames are decoded, modified and encoded one at a time, so only one frame and one chunk of the message are held in
+memory. The result is written with a lossless codec through cv2.VideoWriter, any video cv2 can decode is a medium.
+"""
+import itertools
+import math
+import os
+import zlib
+from os import path
+
+from .bitutils import *
+from .header import *
+from . import compression as compressors
+
+VIDEO_EXTENSIONS = (".avi", ".mkv", ".mp4", ".mov", ".webm")
+# the containers the lossless codecs are written to, videos with other extensions are written as .mkv
+OUTPUT_EXTENSIONS = (".avi", ".mkv")
+# name: fourcc of the lossless codecs
+CODECS = {"ffv1": "FFV1", "png": "MPNG"}
+CHUNK_SIZE = 1 << 20
+DEFAULT_FPS = 25
+
+
+def is_video(filename):
+    """
+    Check if a file is a video carrier.
+
+    :param filename: The filename of the carrier.
+
+    :return: True for the extensions in VIDEO_EXTENSIONS.
+    """
+    return path.splitext(filename)[1].lower() in VIDEO_EXTENSIONS
+
+
+class FrameReader:
+    """
+    Decodes the frames of a video one at a time.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The filename of the video.
+
+        :raises FileNotFoundError: If the video is not found or can not be decoded.
+        """
+        import cv2
+
+        if not path.isfile(filename):
+            raise FileNotFoundError("Video not found")
+        self.capture = cv2.VideoCapture(filename)
+        if not self.capture.isOpened():
+            raise FileNotFoundError("Video could not be decoded: {}".format(filename))
+        self.width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.frame_count = max(int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)), 0)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    @property
+    def frame_pixels(self):
+        return self.width * self.height
+
+    @property
+    def shape(self):
+        """
+        The shape (frames * height, width, channels) of the frames stacked into one image.
+        """
+        return self.frame_count * self.height, self.width, 3
+
+    def __iter__(self):
+        while True:
+            ok, frame = self.capture.read()
+            if not ok:
+                return
+            yield frame
+
+    def close(self):
+        self.capture.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def video_shape(filename):
+    """
+    Read the shape of a video from its container, without decoding any frames.
+
+    :param filename: The filename of the video.
+
+    :return: The shape (frames * height, width, channels) of the frames stacked into one image.
+
+    :raises FileNotFoundError: If the video is not found or can not be decoded.
+    """
+    with FrameReader(filename) as reader:
+        return reader.shape
+
+
+def frame_symbols(index, frame_pixels, start, count, slots):
+    """
+    Locate the message symbols held by a frame.
+
+    :param index: The index of the frame.
+    :param frame_pixels: The number of pixels of a frame.
+    :param start: The index of the first pixel after the header, counted from the first frame.
+    :param count: The number of symbols of the message.
+    :param slots: The number of symbols per pixel, the number of channels if all channels are used, otherwise 1.
+
+    :return: A tuple (index of the first symbol, end index), equal if the frame holds no symbols.
+    """
+    first = min(max((index * frame_pixels - start) * slots, 0), count)
+    return first, min(max(((index + 1) * frame_pixels - start) * slots, first), count)
+
+
+class SymbolQueue:
+    """
+    Splits a message read chunk by chunk into symbols, which are taken in runs of any length.
+    """
+
+    def __init__(self, chunks, bits):
+        """
+        :param chunks: An iterable of the chunks of the message.
+        :param bits: The number of bits per symbol.
+        """
+        import numpy as np
+
+        self.chunks = iter(chunks)
+        self.bits = bits
+        self.pending = b""
+        self.symbols = np.empty(0, dtype=np.uint8)
+
+    def take(self, count):
+        """
+        Take the next symbols, the last symbol of the message is padded with zeros.
+
+        :param count: The number of symbols.
+
+        :return: A uint8 array of at most count symbols, shorter only at the end of the message.
+        """
+        import numpy as np
+
+        while len(self.symbols) < count and (self.pending or self.chunks is not None):
+            chunk = next(self.chunks, None) if self.chunks is not None else None
+            if chunk is None:
+                self.chunks = None
+                data, self.pending = self.pending, b""
+            else:
+                data = self.pending + chunk
+                # a multiple of `bits` bytes always splits into whole symbols
+                usable = len(data) - len(data) % self.bits
+                data, self.pending = data[:usable], data[usable:]
+            self.symbols = np.concatenate((self.symbols, bytes2symbols(data, self.bits)))
+        taken, self.symbols = self.symbols[:count], self.symbols[count:]
+        return taken
+
+
+def hidden_filename_for(hidden_filename, medium_filename):
+    """
+    Complete the filename of a resulting video with the extension of its container.
+
+    :param hidden_filename: The filename, defaults to "hidden" if None.
+    :param medium_filename: The filename of the medium, its container is kept if it is in OUTPUT_EXTENSIONS.
+
+    :return: The filename ending with an extension in OUTPUT_EXTENSIONS.
+    """
+    hidden_filename = hidden_filename or "hidden"
+    if path.splitext(hidden_filename)[1].lower() in OUTPUT_EXTENSIONS:
+        return hidden_filename
+    extension = path.splitext(medium_filename)[1].lower()
+    return hidden_filename + (extension if extension in OUTPUT_EXTENSIONS else ".mkv")
+
+
+def encode_video(medium_filename, message_filename, hidden_filename, key=None, setup=None, codec="ffv1",
+                 chunk_size=CHUNK_SIZE, scatter=False, compress=False):
+    """
+    Encode a message into a video, frame by frame.
+
+    The header is part of the first frame, which is written before the message is embedded, so the checksum of an
+    unencrypted message is computed in a first pass over the message file. Encrypted messages are authenticated by
+    their tag and stored without a checksum.
+
+    :param medium_filename: The filename of the video to hide the message in.
+    :param message_filename: The filename of the message file to be hidden.
+    :param hidden_filename: The filename of the resulting video, see hidden_filename_for.
+    :param key: (Optional) The encryption key to encrypt the message.
+    :param setup: (Optional) The setup for hiding the message, as a list containing [bits_per_pixel, use_all_channels].
+    :param codec: (Optional) The lossless codec of the resulting video, a name in CODECS.
+    :param chunk_size: (Optional) The number of message bytes processed at once.
+    :param scatter: (Optional) Not supported for videos, as the frames are processed in order.
+    :param compress: (Optional) Compress the message before hiding it, True or the name of an algorithm, see steg.hide_data.
+                     The compressed message is buffered in a temporary file, as its size decides the setup.
+
+    :raises FileNotFoundError: If the medium or the message file is not found.
+    :raises ValueError: If scatter is set, the codec is not available or the compression algorithm is not available.
+    :raises OverflowError: If there is insufficient space in the medium to hide the message.
+    """
+    import cv2
+    from . import steg, stream
+
+    if scatter:
+        raise ValueError("Scattering is not supported for video carriers")
+    if codec not in CODECS:
+        raise ValueError("Unsupported codec {}, choose one of {}".format(codec, ", ".join(CODECS)))
+    hidden_filename = hidden_filename_for(hidden_filename, medium_filename)
+    filetype = path.splitext(message_filename)[1][1:]
+    with FrameReader(medium_filename) as reader, open(message_filename, "rb") as message:
+        algorithm, compressed = stream.compress_file(message, compress, chunk_size) if compress else (None, None)
+        with compressed or message as f:
+            msg_size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            checksum = None
+            if key is None:
+                checksum = 0
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    checksum = zlib.crc32(chunk, checksum)
+                f.seek(0)
+            else:
+                msg_size += stream.NONCE_SIZE + stream.TAG_SIZE
+            flags = steg.header_flags(checksum=checksum is not None, compressed=algorithm is not None)
+            header_length = VersionedHeader().header_length(filetype, flags)
+            if math.ceil(header_length / 3) > reader.frame_pixels:
+                raise OverflowError("The header does not fit into the first frame")
+            nr_bits, use_all_channels = steg.ensure_correct_setup(setup, msg_size * 8, reader.shape, header_length)
+
+            writer = cv2.VideoWriter(hidden_filename, cv2.VideoWriter_fourcc(*CODECS[codec]), reader.fps,
+                                     (reader.width, reader.height))
+            if not writer.isOpened():
+                raise ValueError("The {} codec is not available".format(codec))
+            try:
+                _embed_frames(reader, writer, stream.stored_chunks(f, key, chunk_size), msg_size * 8, filetype, nr_bits,
+                              use_all_channels, key is not None, checksum, algorithm)
+            except Exception:
+                writer.release()
+                os.remove(hidden_filename)
+                raise
+            writer.release()
+    print("Message was hidden in {}".format(hidden_filename))
+
+
+def _embed_frames(reader, writer, chunks, length, filetype, bits, all_channels, encrypted, checksum, algorithm):
+    # embeds the message into the frames of reader and writes every frame to writer
+    from . import steg
+
+    count = math.ceil(length / bits)
+    symbols = SymbolQueue(chunks, bits)
+    data_start = embedded = 0
+    for index, frame in enumerate(reader):
+        flat_frame = frame.reshape(-1, frame.shape[-1])
+        if index == 0:
+            data_start = steg.embed_header(flat_frame, length, filetype, bits, all_channels, encrypted,
+                                           checksum=checksum, compression=algorithm)
+        first, end = frame_symbols(index, reader.frame_pixels, data_start, count, flat_frame.shape[1] if all_channels else 1)
+        if end > first:
+            steg.embed_message(flat_frame, data_start - index * reader.frame_pixels, symbols.take(end - first), bits,
+                               all_channels, first)
+            embedded = end
+        writer.write(frame)
+    if embedded < count:
+        raise OverflowError("Message does not fit into medium!")
+
+
+def open_message(reader):
+    """
+    Read the header of the message hidden in a video.
+
+    :param reader: The FrameReader of the video, positioned at its first frame.
+
+    :return: A tuple (decoded Header, generator yielding the message as stored, one chunk per frame).
+
+    :raises ValueError: If the video has no frames or no valid header.
+    """
+    from . import steg
+
+    frames = iter(reader)
+    first = next(frames, None)
+    if first is None:
+        raise ValueError("Video has no frames")
+    header, data_start = steg.read_header(first.reshape(-1, first.shape[-1]))
+    if header.scattered:
+        raise ValueError("Scattered messages are not supported for video carriers")
+    return header, _extract_frames(itertools.chain([first], frames), reader.frame_pixels, header, data_start)
+
+
+def _extract_frames(frames, frame_pixels, header, data_start):
+    import numpy as np
+    from . import steg
+
+    bits = header.bits
+    count = math.ceil(header.length / bits)
+    # the number of symbols making up whole bytes
+    unit = 8 // math.gcd(8, bits)
+    pending = np.empty(0, dtype=np.uint8)
+    done = 0
+    for index, frame in enumerate(frames):
+        flat_frame = frame.reshape(-1, frame.shape[-1])
+        first, end = frame_symbols(index, frame_pixels, data_start, count, flat_frame.shape[1] if header.all_channels else 1)
+        symbols = steg.extract_symbols(flat_frame, data_start - index * frame_pixels, end - first, bits,
+                                       header.all_channels, first)
+        pending = np.concatenate((pending, symbols))
+        if end == count:
+            yield symbols2bytes(pending, bits, header.length - done * bits)
+            return
+        usable = len(pending) - len(pending) % unit
+        if usable:
+            yield symbols2bytes(pending[:usable], bits)
+            done += usable
+            pending = pending[usable:]
+    raise ValueError("Content length exceeds medium, the video does not contain a valid message")
+
+
+def decode_video(filename, key=None, output_name=None):
+    """
+    Decodes a hidden message from a video, frame by frame, writing it to the output file as it is extracted.
+
+    If the decryption, the checksum check or the decompression fails, the partially written output file is removed.
+
+    :param filename: The filename of the video containing the hidden message.
+    :param key: The encryption key used to decrypt the message.
+    :param output_name: The name of the output file (without extension).
+
+    :raises: FileNotFoundError if the video is not found.
+    :raises: ValueError if the key is missing and the message is encrypted, or the message is corrupted.
+    :raises: InvalidTag if the decryption fails.
+    """
+    from . import stream
+
+    with FrameReader(filename) as reader:
+        header, stored = open_message(reader)
+        if header.encrypted and key is None:
+            raise ValueError("Decryption key is missing")
+        chunks = stream.message_chunks(header, stored, key)
+        if header.compression is not None:
+            chunks = compressors.decompress_chunks(chunks, header.compression)
+        stream.write_message(chunks, header.filetype, output_name)
+
+
+def verify_video(filename, key=None):
+    """
+    Check the integrity of a message hidden in a video without writing it anywhere, see stream.verify_stream.
+
+    :param filename: The filename of the video containing the hidden message.
+    :param key: (Optional) The encryption key, encrypted messages are only checked with it.
+
+    :return: The decoded Header of the message.
+
+    :raises: FileNotFoundError if the video is not found.
+    :raises: ValueError if the video has no valid header, the message is corrupted or can not be checked
+             (no checksum and no key).
+    :raises: InvalidTag if the decryption fails.
+    """
+    from . import stream
+
+    with FrameReader(filename) as reader:
+        header, stored = open_message(reader)
+        if header.checksum is None and not (header.encrypted and key is not None):
+            raise ValueError("Message has no checksum to verify")
+        for _ in stream.message_chunks(header, stored, key):
+            pass
+    return header
@@ -1,13 +1,47 @@
 import unittest
+from test import test_batch
+from test import test_bitutils
+from test import test_capacity
+from test import test_compression
+from test import test_depth
 from test import test_header
+from test import test_imports
+from test import test_instrument
+from test import test_parallel
+from test import test_pool
+from test import test_raw
+from test import test_scan
+from test import test_scatter
+from test import test_server
+from test import test_shard
 from test import test_stega
+from test import test_stream
+from test import test_video
 
 # Create a test suite
 def suite():
     test_suite = unittest.TestSuite()
+    test_suite.addTest(unittest.makeSuite(test_batch.BatchTest))
+    test_suite.addTest(unittest.makeSuite(test_bitutils.BitEngineTest))
+    test_suite.addTest(unittest.makeSuite(test_capacity.CapacityTest))
+    test_suite.addTest(unittest.makeSuite(test_compression.CompressionTest))
+    test_suite.addTest(unittest.makeSuite(test_depth.DepthTest))
     test_suite.addTest(unittest.makeSuite(test_header.HeaderTest))
     test_suite.addTest(unittest.makeSuite(test_header.HeaderTestDecode))
+    test_suite.addTest(unittest.makeSuite(test_header.VersionedHeaderTest))
+    test_suite.addTest(unittest.makeSuite(test_header.DetectHeaderTest))
+    test_suite.addTest(unittest.makeSuite(test_imports.ImportTest))
+    test_suite.addTest(unittest.makeSuite(test_instrument.InstrumentTest))
+    test_suite.addTest(unittest.makeSuite(test_parallel.ParallelTest))
+    test_suite.addTest(unittest.makeSuite(test_pool.PoolTest))
+    test_suite.addTest(unittest.makeSuite(test_raw.RawTest))
+    test_suite.addTest(unittest.makeSuite(test_scan.ScanTest))
+    test_suite.addTest(unittest.makeSuite(test_scatter.ScatterTest))
+    test_suite.addTest(unittest.makeSuite(test_server.ServerTest))
+    test_suite.addTest(unittest.makeSuite(test_shard.ShardTest))
     test_suite.addTest(unittest.makeSuite(test_stega.StegaTest))
+    test_suite.addTest(unittest.makeSuite(test_stream.StreamTest))
+    test_suite.addTest(unittest.makeSuite(test_video.VideoTest))
     return test_suite
 
 # Run the tests
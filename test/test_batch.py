@@ -0,0 +1,60 @@
+import unittest
+from src import batch
+import os
+import shutil
+
+
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        self.message = "./test/files/test.txt"
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+
+    def test_encode_and_decode_batch(self):
+        jobs = [(self.medium, self.message, os.path.join(self.temp_folder, "encoded{}".format(i))) for i in range(3)]
+        results = list(batch.encode_batch(jobs, key=self.key, workers=2))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result.error is None for result in results))
+
+        output_folder = os.path.join(self.temp_folder, "decoded")
+        os.mkdir(output_folder)
+        jobs = batch.directory_jobs(self.temp_folder, output_folder)
+        self.assertEqual(len(jobs), 3)
+        results = list(batch.decode_batch(jobs, key=self.key, workers=2))
+        self.assertTrue(all(result.error is None for result in results))
+        for i in range(3):
+            with open(self.message) as f1, open(os.path.join(output_folder, "encoded{}.txt".format(i))) as f2:
+                self.assertEqual(list(f1), list(f2), "The files are not equal")
+
+    def test_failing_job_does_not_abort_batch(self):
+        jobs = [(self.medium, self.message, os.path.join(self.temp_folder, "encoded")),
+                ("./test/files/missing.png", self.message, os.path.join(self.temp_folder, "failed"))]
+        results = {result.job[0]: result for result in batch.encode_batch(jobs, workers=2)}
+        self.assertIsNone(results[self.medium].error)
+        self.assertTrue(results["./test/files/missing.png"].error.startswith("FileNotFoundError"))
+
+    def test_verify_batch(self):
+        jobs = [(self.medium, self.message, os.path.join(self.temp_folder, "encoded{}".format(i))) for i in range(2)]
+        list(batch.encode_batch(jobs, workers=2))
+        filenames = [job[2] + ".png" for job in jobs] + [self.medium]
+        results = {result.job[0]: result for result in batch.verify_batch(filenames, workers=2)}
+        self.assertEqual([results[filename].error is None for filename in filenames], [True, True, False])
+
+    def test_read_manifest(self):
+        manifest = os.path.join(self.temp_folder, "manifest.csv")
+        with open(manifest, "w") as f:
+            f.write("medium,message,output\n{},{},out\n".format(self.medium, self.message))
+        self.assertEqual(batch.read_manifest(manifest), [(self.medium, self.message, "out")])
+
+    def test_read_manifest_missing_column(self):
+        manifest = os.path.join(self.temp_folder, "manifest.csv")
+        with open(manifest, "w") as f:
+            f.write("medium,output\n{},out\n".format(self.medium))
+        with self.assertRaises(ValueError):
+            batch.read_manifest(manifest)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
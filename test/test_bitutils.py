@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+from src import bitutils
+
+
+def reference_symbols(data, bits):
+    binary_string = ''.join(format(byte, '08b') for byte in data)
+    return [int(binary_string[i:i+bits].ljust(bits, '0'), 2) for i in range(0, len(binary_string), bits)]
+
+
+class BitEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) + b"test"
+
+    def test_bytes2symbols(self):
+        for bits in range(1, 9):
+            symbols = bitutils.bytes2symbols(self.data, bits)
+            self.assertEqual(symbols.dtype, np.uint8)
+            self.assertEqual(list(symbols), reference_symbols(self.data, bits))
+
+    def test_roundtrip(self):
+        for bits in range(1, 9):
+            symbols = bitutils.bytes2symbols(self.data, bits)
+            self.assertEqual(bitutils.symbols2bytes(symbols, bits, len(self.data) * 8), self.data)
+
+    def test_symbols2bytes_ignores_higher_bits(self):
+        symbols = np.array([0b11111101, 0b11111110, 0b11111111, 0b11111100], dtype=np.uint8)
+        self.assertEqual(bitutils.symbols2bytes(symbols, 2), bytes([0b01101100]))
+
+    def test_symbols2bytes_ignores_trailing_symbols(self):
+        symbols = bitutils.bytes2symbols(b"AB", 3)
+        self.assertEqual(bitutils.symbols2bytes(np.append(symbols, [7, 7, 7]), 3, 16), b"AB")
+
+    def test_symbols2bytes_offset(self):
+        for bits in range(1, 9):
+            symbols = bitutils.bytes2symbols(self.data, bits)
+            for start in (1, 5, 100):
+                first_symbol, offset = divmod(start * 8, bits)
+                self.assertEqual(bitutils.symbols2bytes(symbols[first_symbol:], bits, 24, offset), self.data[start:start + 3])
+
+    def test_empty(self):
+        self.assertEqual(len(bitutils.bytes2symbols(b"", 3)), 0)
+        self.assertEqual(bitutils.symbols2bytes(np.zeros(0, dtype=np.uint8), 3, 0), b"")
+
+    def test_not_enough_symbols(self):
+        with self.assertRaises(ValueError):
+            bitutils.symbols2bytes(np.zeros(2, dtype=np.uint8), 3, 8)
+
+    def test_unsupported_bits(self):
+        with self.assertRaises(ValueError):
+            bitutils.bytes2symbols(self.data, 0)
+        with self.assertRaises(ValueError):
+            bitutils.symbols2bytes(np.zeros(2, dtype=np.uint8), 9)
@@ -0,0 +1,74 @@
+import unittest
+from src import capacity, steg
+import os
+import shutil
+import cv2
+import numpy as np
+
+
+class CapacityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        os.mkdir(self.temp_folder)
+
+    def test_png_shape(self):
+        self.assertEqual(capacity.image_shape(self.medium), steg.read_image(self.medium).shape)
+
+    def test_jpeg_shape(self):
+        filename = os.path.join(self.temp_folder, "medium.jpg")
+        cv2.imwrite(filename, np.zeros((31, 47, 3), dtype=np.uint8), [cv2.IMWRITE_JPEG_PROGRESSIVE, 1])
+        self.assertEqual(capacity.image_shape(filename), (31, 47, 3))
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            capacity.image_shape("./test/files/test.txt")
+
+    def test_truncated_header(self):
+        jpeg = os.path.join(self.temp_folder, "medium.jpg")
+        cv2.imwrite(jpeg, np.zeros((31, 47, 3), dtype=np.uint8))
+        for filename in (self.medium, jpeg):
+            with open(filename, "rb") as f:
+                head = f.read(12)
+            truncated = os.path.join(self.temp_folder, "truncated" + os.path.splitext(filename)[1])
+            with open(truncated, "wb") as f:
+                f.write(head)
+            with self.assertRaises(ValueError):
+                capacity.image_info(truncated)
+            with self.assertRaises(ValueError):
+                capacity.image_bytes_info(head)
+            ranking = capacity.rank_carriers([truncated, self.medium], 10)
+            self.assertEqual([filename for filename, _ in ranking], [self.medium])
+
+    def test_plan_matches_encode(self):
+        image = steg.read_image(self.medium)
+        for payload_size in (10, 10000, 40000, 80000):
+            medium_plan = capacity.plan(self.medium, payload_size, "bin", encrypted=True)
+            image_copy = steg.hide_data(image.copy(), bytes(payload_size), "bin", key=b"0" * 32)
+            header, _ = steg.read_header(image_copy.reshape(-1, image.shape[-1]))
+            self.assertEqual(medium_plan["setup"], [header.bits, header.all_channels])
+            self.assertGreaterEqual(medium_plan["capacity"][tuple(medium_plan["setup"])], payload_size)
+
+    def test_plan_does_not_fit(self):
+        medium_plan = capacity.plan(self.medium, 10**6)
+        self.assertIsNone(medium_plan["setup"])
+        with self.assertRaises(OverflowError):
+            steg.encode_bytes(cv2.imread(self.medium), bytes(max(medium_plan["capacity"].values()) + 1))
+
+    def test_rank_carriers(self):
+        small = os.path.join(self.temp_folder, "small.png")
+        large = os.path.join(self.temp_folder, "large.png")
+        cv2.imwrite(small, np.zeros((50, 50, 3), dtype=np.uint8))
+        cv2.imwrite(large, np.zeros((400, 400, 3), dtype=np.uint8))
+        with open(os.path.join(self.temp_folder, "other.txt"), "w") as f:
+            f.write("no image")
+        ranking = capacity.rank_carriers(self.temp_folder, 200)
+        self.assertEqual([filename for filename, _ in ranking], [small, large])
+        ranking = capacity.rank_carriers(self.temp_folder, 2000)
+        self.assertEqual([filename for filename, _ in ranking], [large, small])
+        ranking = capacity.rank_carriers(self.temp_folder, 5000)
+        self.assertEqual([filename for filename, _ in ranking], [large])
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -0,0 +1,61 @@
+import unittest
+from src import compression
+import os
+
+
+class CompressionTest(unittest.TestCase):
+
+    def setUp(self):
+        with open("README.md", "rb") as f:
+            self.text = f.read()
+
+    def test_entropy(self):
+        self.assertEqual(compression.entropy(b""), 0)
+        self.assertAlmostEqual(compression.entropy(b"ab" * 100), 1)
+        self.assertLess(compression.entropy(self.text), 6)
+        self.assertGreater(compression.entropy(os.urandom(200000)), 7.9)
+
+    def test_choose_algorithm(self):
+        self.assertIsNone(compression.choose_algorithm(os.urandom(10000)))
+        self.assertIn(compression.choose_algorithm(self.text), (compression.LZMA, compression.ZSTD))
+        if "zstd" not in compression.available():
+            self.assertEqual(compression.choose_algorithm(self.text, compression.LZMA_MAX_SIZE + 1), compression.ZLIB)
+
+    def test_roundtrip(self):
+        for name in compression.available():
+            algorithm, compressed = compression.compress(self.text, name)
+            self.assertEqual(algorithm, compression.ALGORITHMS[name])
+            self.assertLess(len(compressed), len(self.text))
+            self.assertEqual(compression.decompress(compressed, algorithm), self.text)
+            chunks = [compressed[i:i + 100] for i in range(0, len(compressed), 100)]
+            self.assertEqual(b"".join(compression.decompress_chunks(chunks, algorithm)), self.text)
+
+    def test_max_size(self):
+        bomb = bytes(64 << 20)
+        for name in compression.available():
+            algorithm, compressed = compression.compress(bomb, name)
+            with self.assertRaises(ValueError):
+                compression.decompress(compressed, algorithm, 1 << 20)
+            algorithm, compressed = compression.compress(self.text, name)
+            self.assertEqual(compression.decompress(compressed, algorithm, len(self.text)), self.text)
+        # the output is produced in bounded steps, not all at once
+        for name in ("zlib", "lzma"):
+            algorithm, compressed = compression.compress(bomb, name)
+            self.assertEqual(max(map(len, compression.decompress_chunks([compressed], algorithm))), compression.OUTPUT_SIZE)
+
+    def test_incompressible(self):
+        data = os.urandom(1000)
+        self.assertEqual(compression.compress(data), (None, data))
+        # forcing an algorithm still keeps the message uncompressed if that is smaller
+        self.assertEqual(compression.compress(data, "zlib"), (None, data))
+
+    def test_invalid(self):
+        algorithm, compressed = compression.compress(self.text, "zlib")
+        with self.assertRaises(ValueError):
+            compression.decompress(compressed[:len(compressed) // 2], algorithm)
+        with self.assertRaises(ValueError):
+            compression.decompress(b"garbage", compression.LZMA)
+        with self.assertRaises(ValueError):
+            compression.decompress(compressed, 15)
+        with self.assertRaises(ValueError):
+            compression.compress(self.text, "brotli")
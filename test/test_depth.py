@@ -0,0 +1,134 @@
+import unittest
+from src import capacity, pool, shard, steg
+import os
+import shutil
+import cv2
+import numpy as np
+
+
+class DepthTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.message = "./test/files/test.txt"
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        rng = np.random.default_rng(0)
+        self.rgba = rng.integers(0, 256, (40, 50, 4), dtype=np.uint8)
+        self.deep = rng.integers(0, 1 << 16, (40, 50, 3), dtype=np.uint16)
+        self.rgba_png = os.path.join(self.temp_folder, "rgba.png")
+        self.deep_png = os.path.join(self.temp_folder, "deep.png")
+        cv2.imwrite(self.rgba_png, self.rgba)
+        cv2.imwrite(self.deep_png, self.deep)
+
+    def test_read_image(self):
+        np.testing.assert_array_equal(steg.read_image(self.rgba_png), self.rgba)
+        np.testing.assert_array_equal(steg.read_image(self.deep_png), self.deep)
+        gray = os.path.join(self.temp_folder, "gray.png")
+        cv2.imwrite(gray, self.deep[..., 0])
+        np.testing.assert_array_equal(steg.read_image(gray), np.dstack([self.deep[..., 0]] * 3))
+        with self.assertRaises(ValueError):
+            steg.medium_image(np.zeros((4, 4, 3), dtype=np.float32))
+
+    def test_image_info(self):
+        self.assertEqual(capacity.image_info(self.rgba_png), ((40, 50, 4), 8))
+        self.assertEqual(capacity.image_info(self.deep_png), ((40, 50, 3), 16))
+        with open(self.deep_png, "rb") as f:
+            self.assertEqual(capacity.image_bytes_info(f.read(64)), ((40, 50, 3), 16))
+
+    def test_modes(self):
+        self.assertEqual(capacity.modes(8), capacity.MODES)
+        self.assertEqual(capacity.modes(16)[:len(capacity.MODES)], capacity.MODES)
+        self.assertEqual(capacity.modes(16)[-1], (capacity.MAX_BITS_PER_CHANNEL_16, True))
+
+    def test_encode_and_decode_alpha(self):
+        steg.encode(self.rgba_png, self.message, self.encoded, setup=[1, True])
+        hidden = steg.read_image(self.encoded + ".png")
+        self.assertEqual(hidden.shape, self.rgba.shape)
+        # the header and the message are spread across the alpha channel as well
+        self.assertTrue((hidden[..., 3] != self.rgba[..., 3]).any())
+        steg.decode(self.encoded + ".png", output_name=self.decoded)
+        with open(self.decoded + ".txt") as f:
+            self.assertEqual(f.read(), "test")
+
+    def test_single_channel_keeps_alpha(self):
+        header_pixels = -(-steg.VersionedHeader().header_length("bin", steg.header_flags()) // 4)
+        for scatter in (False, True):
+            image = self.rgba.copy()
+            steg.hide_data(image, bytes(range(256)) + bytes(40), "bin", self.key, setup=[2, False], scatter=scatter)
+            # only the header uses the alpha channel, the message is written to the color channels
+            np.testing.assert_array_equal(image[..., 3].reshape(-1)[header_pixels:], self.rgba[..., 3].reshape(-1)[header_pixels:])
+            self.assertTrue((image[..., :3] != self.rgba[..., :3]).any())
+            self.assertEqual(steg.reveal_data(image, self.key)[0], bytes(range(256)) + bytes(40))
+
+    def test_encode_and_decode_deep(self):
+        for setup in ([1, False], [4, True], [6, True], [8, True]):
+            for output_format in ("png", "tiff"):
+                data = steg.encode_bytes(steg.read_image(self.deep_png), b"payload", "bin", self.key, setup, output_format)
+                image = steg.load_image(data)
+                self.assertEqual(image.dtype, np.uint16)
+                self.assertEqual(steg.extract_data(image)[1].bits, setup[0])
+                self.assertEqual(steg.decode_bytes(data, self.key), (b"payload", "bin", True))
+
+    def test_deep_capacity(self):
+        header_length = steg.VersionedHeader().header_length("bin", steg.header_flags())
+        fits_8 = capacity.capacity(self.deep.shape, capacity.MAX_BITS_PER_CHANNEL, True, header_length) // 8
+        payload = bytes(fits_8 + 100)
+        medium_plan = capacity.plan(self.deep_png, len(payload), "bin")
+        self.assertEqual(medium_plan["setup"], [5, True])
+        with self.assertRaises(OverflowError):
+            steg.encode_bytes(self.deep.astype(np.uint8), payload, "bin")
+        data = steg.encode_bytes(steg.read_image(self.deep_png), payload, "bin")
+        self.assertEqual(steg.decode_bytes(data), (payload, "bin", False))
+        # only the low bits change
+        changed = steg.load_image(data).astype(np.int64) - self.deep
+        self.assertLess(np.abs(changed).max(), 1 << 5)
+
+    def test_deep_setup_limited_by_depth(self):
+        image = self.rgba.copy()
+        steg.hide_data(image, b"payload", "bin", setup=[6, True])
+        self.assertEqual(steg.extract_data(image)[1].bits, 1)
+
+    def test_deep_output_format(self):
+        with self.assertRaises(ValueError):
+            steg.encode_bytes(self.deep, b"payload", "bin", output_format="webp")
+
+    def test_alpha_output_format(self):
+        # lossless WebP drops the color of transparent pixels, together with the message bits stored there
+        carrier = self.rgba.copy()
+        carrier[20:, :, 3] = 0
+        for setup in ([1, False], [1, True]):
+            with self.assertRaises(ValueError):
+                steg.encode_bytes(carrier, b"payload", "bin", setup=setup, output_format="webp")
+            for output_format in ("png", "tiff"):
+                data = steg.encode_bytes(carrier, b"payload", "bin", setup=setup, output_format=output_format)
+                self.assertEqual(steg.decode_bytes(data), (b"payload", "bin", False))
+        # opaque pixels keep their color in WebP
+        opaque = self.rgba.copy()
+        opaque[..., 3] = 255
+        self.assertEqual(steg.decode_bytes(steg.encode_bytes(opaque, b"payload", "bin", output_format="webp")),
+                         (b"payload", "bin", False))
+        # pixels the low bits can make transparent are refused as well
+        opaque[0, 0, 3] = 15
+        with self.assertRaises(ValueError):
+            steg.encode_bytes(opaque, b"payload", "bin", output_format="webp")
+
+    def test_pool_and_shards(self):
+        carrier_pool = pool.CarrierPool([self.rgba_png, self.deep_png])
+        self.assertEqual(list(carrier_pool.carrier(self.deep_png).capacity), capacity.modes(16))
+        self.assertEqual(carrier_pool.carrier(self.rgba_png).shape, (40, 50, 4))
+        self.assertFalse(carrier_pool.fits(carrier_pool.carrier(self.rgba_png), 10, setup=[6, True]))
+        np.testing.assert_array_equal(carrier_pool.load(self.deep_png), self.deep)
+        sizes = shard.plan_shards(60000, [capacity.ImageInfo((40, 50, 3), 16)] * 20, 200)
+        self.assertEqual((sum(sizes), len(sizes)), (60000, 11))
+        with self.assertRaises(OverflowError):
+            shard.plan_shards(60000, [(40, 50, 3)] * 20, 200)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -94,3 +94,99 @@ class HeaderTestDecode(unittest.TestCase):
     def test_filetype2(self):
         header_data = list(self.h_u.decode_header('111111111111111111111111'+'01111110'+'01111110'+'01111110'+'1111'))
         self.assertEqual(header_data, [self.h_u.max_filesize, "~~~", self.h_u.max_bits_per_pixel, True, True])
+
+
+class VersionedHeaderTest(unittest.TestCase):
+    def setUp(self):
+        self.h_u = header.VersionedHeader()
+
+    def test_roundtrip(self):
+        header_bits = self.h_u.encode_header(2**32, "tar.gz", 3, True, False)
+        self.assertEqual(len(header_bits), self.h_u.header_length("tar.gz"))
+        self.assertEqual(self.h_u.decode_header(header_bits), header.Header(2, 2**32, "tar.gz", 3, True, False, len(header_bits)))
+
+    def test_empty_filetype(self):
+        header_bits = self.h_u.encode_header(0, "", 1, False, True)
+        self.assertEqual(len(header_bits), self.h_u.fixed_length)
+        self.assertEqual(self.h_u.decode_header(header_bits), header.Header(2, 0, "", 1, False, True, self.h_u.fixed_length))
+
+    def test_shard(self):
+        header_bits = self.h_u.encode_header(64, "bin", 2, True, True, shard=(123456, 2, 5))
+        self.assertEqual(len(header_bits), self.h_u.header_length("bin", self.h_u.FLAG_SHARD))
+        self.assertEqual(self.h_u.required_length(header_bits[:self.h_u.fixed_length]), len(header_bits))
+        decoded = self.h_u.decode_header(header_bits)
+        self.assertEqual((decoded.filetype, decoded.shard_id, decoded.shard_index, decoded.shard_count), ("bin", 123456, 2, 5))
+
+    def test_scattered(self):
+        header_bits = self.h_u.encode_header(64, "bin", 2, True, True, scattered=True)
+        self.assertEqual(len(header_bits), self.h_u.header_length("bin"))
+        self.assertTrue(self.h_u.decode_header(header_bits).scattered)
+        self.assertFalse(self.h_u.decode_header(self.h_u.encode_header(64, "bin", 2, True, True)).scattered)
+
+    def test_checksum(self):
+        header_bits = self.h_u.encode_header(64, "bin", 2, True, False, shard=(1, 0, 2), checksum=0xDEADBEEF)
+        self.assertEqual(len(header_bits), self.h_u.header_length("bin", self.h_u.FLAG_SHARD | self.h_u.FLAG_CHECKSUM))
+        self.assertEqual(self.h_u.required_length(header_bits[:self.h_u.fixed_length]), len(header_bits))
+        decoded = self.h_u.decode_header(header_bits)
+        self.assertEqual((decoded.checksum, decoded.shard), (0xDEADBEEF, (1, 0, 2)))
+        self.assertIsNone(self.h_u.decode_header(self.h_u.encode_header(64, "bin", 2, True, False)).checksum)
+
+    def test_compression(self):
+        header_bits = self.h_u.encode_header(64, "bin", 2, True, False, checksum=1, compression=2)
+        self.assertEqual(len(header_bits), self.h_u.header_length("bin", self.h_u.FLAG_CHECKSUM | self.h_u.FLAG_COMPRESSED))
+        decoded = self.h_u.decode_header(header_bits)
+        self.assertEqual((decoded.checksum, decoded.compression), (1, 2))
+
+    def test_shard_out_of_range(self):
+        with self.assertRaises(OverflowError):
+            self.h_u.encode_header(64, "bin", 2, True, True, shard=(0, 2**16, 5))
+
+    def test_unsupported_filesize(self):
+        with self.assertRaises(OverflowError):
+            self.h_u.encode_header(self.h_u.max_filesize + 1, "", 1, False, False)
+
+    def test_too_long_filetype(self):
+        with self.assertRaises(OverflowError):
+            self.h_u.encode_header(0, "A" * (self.h_u.max_filetype_bytes + 1), 1, False, False)
+
+    def test_too_many_bits_per_pixel(self):
+        with self.assertRaises(OverflowError):
+            self.h_u.encode_header(0, "", self.h_u.max_bits_per_pixel + 1, True, True)
+
+    def test_unsupported_flags(self):
+        header_bits = self.h_u.encode_header(0, "", 1, False, False)
+        header_bits = header_bits[:32] + "1" + header_bits[33:]
+        with self.assertRaises(ValueError):
+            self.h_u.decode_header(header_bits)
+
+    def test_truncated_header(self):
+        header_bits = self.h_u.encode_header(0, "txt", 1, False, False)
+        with self.assertRaises(ValueError):
+            self.h_u.decode_header(header_bits[:-1])
+
+
+class DetectHeaderTest(unittest.TestCase):
+    def test_versioned(self):
+        header_bits = header.VersionedHeader().encode_header(8, "txt", 1, False, False)
+        self.assertEqual(header.decode_header(header_bits + "0101").version, 2)
+
+    def test_legacy(self):
+        header_bits = header.HeaderUtils().encode_header(8, "txt", 1, False, False)
+        self.assertEqual(header.decode_header(header_bits), header.Header(1, 8, "txt", 1, False, False, 52))
+
+    def test_legacy_never_looks_versioned(self):
+        magic = "{0:b}".format(header.VersionedHeader.MAGIC).zfill(header.VersionedHeader.MAGIC_BITS)
+        length = int(magic, 2) // 8 * 8
+        for content_length in (length, length + 8):
+            header_bits = header.HeaderUtils().encode_header(content_length, "txt", 1, False, False)
+            self.assertEqual(header.decode_header(header_bits).length, content_length)
+
+    def test_read_function(self):
+        header_bits = header.VersionedHeader().encode_header(8, "txt", 1, False, False)
+        requested = []
+
+        def read_bits(n):
+            requested.append(n)
+            return header_bits[:n]
+        self.assertEqual(header.decode_header(read_bits).filetype, "txt")
+        self.assertEqual(max(requested), len(header_bits))
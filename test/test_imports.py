@@ -0,0 +1,39 @@
+import unittest
+import subprocess
+import sys
+
+HEAVY_MODULES = ("cv2", "numpy", "cryptography")
+
+RUN_MAIN = """
+import runpy, sys
+sys.argv = ["main.py"] + sys.argv[1:]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+print(" ".join(module for module in {} if module in sys.modules), file=sys.stderr)
+"""
+
+
+class ImportTest(unittest.TestCase):
+
+    def loaded_modules(self, *arguments, modules=HEAVY_MODULES):
+        result = subprocess.run([sys.executable, "-c", RUN_MAIN.format(modules)] + list(arguments),
+                                capture_output=True, text=True, check=True)
+        return result.stderr.strip().splitlines()[-1].split() if result.stderr.strip() else []
+
+    def test_help(self):
+        self.assertEqual(self.loaded_modules("--help"), [])
+
+    def test_capacity(self):
+        self.assertEqual(self.loaded_modules("capacity", "./test/files/medium.png", "./test/files/test.txt", "-k", "0" * 32), [])
+
+    def test_header_modules(self):
+        code = "import sys; import src.capacity, src.header, src.raw, src.formats; print(' '.join(m for m in {} if m in sys.modules))"
+        result = subprocess.run([sys.executable, "-c", code.format(HEAVY_MODULES)], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_steg_without_crypto(self):
+        code = "import sys; import src.steg, src.stream; print('cryptography' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "False")
@@ -0,0 +1,39 @@
+import unittest
+from src import instrument, steg
+import json
+import cv2
+
+
+class InstrumentTest(unittest.TestCase):
+
+    def setUp(self):
+        self.medium = "./test/files/medium.png"
+        self.key = b'00000000000000000000000000000000'
+
+    def test_disabled(self):
+        self.assertIs(instrument.span("embed", 10), instrument.NULL_SPAN)
+        with instrument.span("embed") as s:
+            s.bytes = 10
+
+    def test_encode_and_decode_stages(self):
+        with open(self.medium, "rb") as f:
+            medium = f.read()
+        profile = instrument.Profile()
+        with instrument.listening(profile):
+            png = steg.encode_bytes(medium, b"payload", "bin", key=self.key)
+            steg.decode_bytes(png, key=self.key)
+        self.assertEqual([event.name for event in profile.events], [
+            "image-decode", "encrypt", "header", "bit-pack", "embed", "image-encode",
+            "image-decode", "header", "extract", "unpack", "decrypt"])
+        self.assertEqual(profile.stages()["encrypt"]["bytes"], len(b"payload"))
+        self.assertEqual(profile.stages()["image-decode"]["calls"], 2)
+        self.assertIn("bit-pack", profile.report())
+        self.assertIs(instrument.span("embed"), instrument.NULL_SPAN, "The listener was not removed")
+
+    def test_log_collector(self):
+        with self.assertLogs("stegapy") as logs, instrument.listening(instrument.LogCollector()):
+            steg.encode_bytes(cv2.imread(self.medium), b"payload")
+        records = [json.loads(record.getMessage()) for record in logs.records]
+        self.assertEqual([record["span"] for record in records], ["header", "bit-pack", "embed", "image-encode"])
+        self.assertEqual(records[1]["bytes"], len(b"payload"))
+        self.assertTrue(all(record["duration_ms"] >= 0 for record in records))
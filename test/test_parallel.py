@@ -0,0 +1,50 @@
+import unittest
+from src import parallel
+import os
+import threading
+
+
+class ParallelTest(unittest.TestCase):
+
+    def test_bands(self):
+        self.assertEqual(parallel.bands(10, 1, min_size=1), [(0, 10)])
+        self.assertEqual(parallel.bands(10, 3, min_size=1), [(0, 4), (4, 8), (8, 10)])
+        self.assertEqual(parallel.bands(10, 3, unit=3, min_size=1), [(0, 6), (6, 10)])
+        self.assertEqual(parallel.bands(0, 4), [(0, 0)])
+        # small ranges are not split below the minimum band size
+        self.assertEqual(parallel.bands(10, 4, min_size=5), [(0, 5), (5, 10)])
+        self.assertEqual(parallel.bands(10, 4, min_size=20), [(0, 10)])
+        for count in range(1, 50):
+            for unit in (1, 3, 8, 24):
+                ranges = parallel.bands(count, 4, unit, min_size=1)
+                self.assertEqual([first for first, _ in ranges[1:]], [end for _, end in ranges[:-1]])
+                self.assertEqual((ranges[0][0], ranges[-1][1]), (0, count))
+                self.assertTrue(all(first % unit == 0 for first, _ in ranges))
+
+    def test_resolve_workers(self):
+        self.assertEqual(parallel.resolve_workers(None), 1)
+        self.assertEqual(parallel.resolve_workers(3), 3)
+        self.assertEqual(parallel.resolve_workers(0), os.cpu_count())
+
+    def test_run(self):
+        done = []
+        lock = threading.Lock()
+
+        def band(first, end):
+            with lock:
+                done.append((first, end))
+        ranges = parallel.bands(100, 4, min_size=1)
+        parallel.run(band, ranges, 4)
+        self.assertEqual(sorted(done), ranges)
+        self.assertIs(parallel.thread_pool(4), parallel.thread_pool(4))
+
+    def test_run_raises_after_all_bands(self):
+        done = []
+
+        def band(first, end):
+            if first == 0:
+                raise ValueError("band failed")
+            done.append(first)
+        with self.assertRaises(ValueError):
+            parallel.run(band, parallel.bands(100, 4, min_size=1), 4)
+        self.assertEqual(sorted(done), [25, 50, 75])
@@ -0,0 +1,111 @@
+import unittest
+from src import compression, pool, steg
+from src.capacity import MODES
+import os
+import shutil
+import threading
+import cv2
+import numpy as np
+from unittest import mock
+
+
+class PoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        rng = np.random.default_rng(0)
+        # small.png holds 2400 bytes at the densest mode, medium.png 9600 and large.png 38400
+        for name, side in (("small", 40), ("medium", 80), ("large", 160)):
+            cv2.imwrite(os.path.join(self.temp_folder, name + ".png"), rng.integers(0, 256, (side, side, 3), dtype=np.uint8))
+        self.pool = pool.CarrierPool(self.temp_folder, cache_size=2 * 80 * 80 * 3)
+
+    def filename(self, name):
+        return os.path.join(self.temp_folder, name + ".png")
+
+    def test_index(self):
+        self.assertEqual([carrier.filename for carrier in self.pool.carriers],
+                         [self.filename(name) for name in ("small", "medium", "large")])
+        carrier = self.pool.carrier(self.filename("medium"))
+        self.assertEqual(carrier.shape, (80, 80, 3))
+        self.assertEqual(carrier.capacity, {(1, False): 6400, (1, True): 19200, (2, True): 38400, (3, True): 57600,
+                                            (4, True): 76800})
+        self.assertEqual(list(carrier.capacity), MODES)
+        with self.assertRaises(KeyError):
+            self.pool.carrier("missing.png")
+
+    def test_smallest_fit(self):
+        self.assertEqual(self.pool.smallest_fit(10).filename, self.filename("small"))
+        self.assertEqual(self.pool.smallest_fit(3000).filename, self.filename("medium"))
+        self.assertEqual(self.pool.smallest_fit(1000, setup=[1, False]).filename, self.filename("large"))
+        # the header and the encryption overhead are taken into account
+        small = self.pool.carrier(self.filename("small"))
+        size = max(size for size in range(2400) if self.pool.fits(small, size, "txt"))
+        self.assertFalse(self.pool.fits(small, size, "txt", encrypted=True))
+        self.assertEqual(self.pool.smallest_fit(size, "txt").filename, self.filename("small"))
+        self.assertEqual(self.pool.smallest_fit(size, "txt", encrypted=True).filename, self.filename("medium"))
+        with self.assertRaises(OverflowError):
+            self.pool.smallest_fit(40000)
+
+    def test_cache(self):
+        first = self.pool.load(self.filename("small"))
+        self.assertIs(self.pool.load(self.filename("small")), first)
+        self.assertFalse(first.flags.writeable)
+        np.testing.assert_array_equal(first, cv2.imread(self.filename("small")))
+        self.pool.load(self.filename("medium"))
+        self.assertEqual(self.pool.stats(), (1, 2, 0, (40 * 40 + 80 * 80) * 3, 2))
+        # the large carrier is bigger than the whole cache and is not kept
+        self.pool.load(self.filename("large"))
+        self.assertEqual(self.pool.stats(), (1, 3, 0, (40 * 40 + 80 * 80) * 3, 2))
+        with self.assertRaises(KeyError):
+            self.pool.load("missing.png")
+
+    def test_eviction(self):
+        shutil.copy(self.filename("medium"), self.filename("copy"))
+        cache = pool.CarrierPool([self.filename(name) for name in ("small", "medium", "copy")], cache_size=2 * 80 * 80 * 3)
+        cache.load(self.filename("medium"))
+        cache.load(self.filename("small"))
+        cache.load(self.filename("copy"))
+        # the least recently used carrier is evicted
+        self.assertEqual(cache.stats(), (0, 3, 1, (40 * 40 + 80 * 80) * 3, 2))
+        cache.load(self.filename("small"))
+        cache.load(self.filename("medium"))
+        self.assertEqual(cache.stats(), (1, 4, 2, (40 * 40 + 80 * 80) * 3, 2))
+        cache.load(self.filename("small"))
+        self.assertEqual(cache.stats().hits, 2)
+
+    def test_hide(self):
+        carrier, image = self.pool.hide(b"payload", "txt", self.key)
+        self.assertEqual(carrier, self.filename("small"))
+        self.assertEqual(steg.decode_bytes(image, self.key), (b"payload", "txt", True))
+        # the cached carrier is not modified
+        np.testing.assert_array_equal(self.pool.load(carrier), cv2.imread(carrier))
+        # the message is compressed once, for choosing the carrier and for hiding it
+        with mock.patch.object(compression, "compress", wraps=compression.compress) as compress:
+            carrier, image = self.pool.hide(b"x" * 3000, compress=True)
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(carrier, self.filename("small"))
+        self.assertEqual(steg.decode_bytes(image), (b"x" * 3000, "", False))
+        carrier, image = self.pool.hide(b"payload", carrier=self.filename("large"), setup=[1, False])
+        self.assertEqual(carrier, self.filename("large"))
+        self.assertEqual(self.pool.stats().misses, 2)
+
+    def test_threads(self):
+        results = []
+
+        def hide():
+            for _ in range(5):
+                results.append(self.pool.hide(b"payload")[0])
+        threads = [threading.Thread(target=hide) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [self.filename("small")] * 20)
+        stats = self.pool.stats()
+        self.assertEqual(stats.hits + stats.misses, 20)
+        self.assertEqual(stats.count, 1)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -0,0 +1,90 @@
+import unittest
+from src import raw, steg, capacity
+import os
+import shutil
+import cv2
+import numpy as np
+
+
+class RawTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.message = "./test/files/test.txt"
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        self.image = np.random.default_rng(0).integers(0, 256, (60, 80, 3), dtype=np.uint8)
+        self.ppm = os.path.join(self.temp_folder, "medium.ppm")
+        self.npy = os.path.join(self.temp_folder, "medium.npy")
+        cv2.imwrite(self.ppm, self.image)
+        np.save(self.npy, self.image)
+
+    def read_decoded(self):
+        with open(self.decoded + ".txt") as f:
+            return f.read()
+
+    def test_open_ppm(self):
+        self.assertTrue((raw.open_raw(self.ppm) == self.image).all())
+        self.assertEqual(raw.raw_shape(self.ppm), (60, 80, 3))
+        self.assertEqual(capacity.image_shape(self.npy), (60, 80, 3))
+
+    def test_deep_ppm(self):
+        deep = self.image.astype(np.uint16) * 257
+        cv2.imwrite(self.ppm, deep)
+        self.assertEqual(raw.raw_info(self.ppm), ((60, 80, 3), 16))
+        np.testing.assert_array_equal(raw.open_raw(self.ppm), deep)
+        steg.encode(self.ppm, self.message, self.encoded, setup=[8, True])
+        np.testing.assert_array_equal(steg.read_image(self.encoded + ".ppm") >> 8, self.image)
+        steg.decode(self.encoded + ".ppm", output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), "test")
+
+    def test_encode_and_decode(self):
+        for medium in (self.ppm, self.npy):
+            steg.encode(medium, self.message, self.encoded, key=self.key)
+            extension = os.path.splitext(medium)[1]
+            steg.decode(self.encoded + extension, key=self.key, output_name=self.decoded)
+            self.assertEqual(self.read_decoded(), "test")
+
+    def test_only_message_pixels_change(self):
+        steg.encode(self.ppm, self.message, self.encoded)
+        changed = np.argwhere((raw.open_raw(self.encoded + ".ppm") != self.image).any(axis=2).ravel())
+        self.assertLess(changed.max(), 100)
+
+    def test_ppm_matches_png_layout(self):
+        steg.encode(self.ppm, self.message, self.encoded, setup=[2, True])
+        png = cv2.imencode(".png", cv2.imread(self.encoded + ".ppm"))[1].tobytes()
+        self.assertEqual(steg.decode_bytes(png), (b"test", "txt", False))
+
+    def test_in_place(self):
+        steg.encode(self.npy, self.message, self.npy)
+        self.assertEqual(steg.decode_bytes(np.load(self.npy)), (b"test", "txt", False))
+
+    def test_failed_encode_removes_copy(self):
+        message = os.path.join(self.temp_folder, "big.bin")
+        with open(message, "wb") as f:
+            f.write(bytes(20000))
+        with self.assertRaises(OverflowError):
+            steg.encode_raw(self.ppm, message, self.encoded)
+        self.assertFalse(os.path.exists(self.encoded + ".ppm"))
+
+    def test_fortran_order_npy(self):
+        # a flat view of these pixels would be a copy, so the message would never reach the file
+        fortran = os.path.join(self.temp_folder, "fortran.npy")
+        np.save(fortran, np.asfortranarray(self.image))
+        with self.assertRaises(ValueError):
+            raw.open_raw(fortran)
+        with self.assertRaises(ValueError):
+            steg.encode(fortran, self.message, self.encoded)
+        self.assertFalse(os.path.exists(self.encoded + ".npy"))
+
+    def test_unsupported_ppm(self):
+        filename = os.path.join(self.temp_folder, "ascii.ppm")
+        with open(filename, "wb") as f:
+            f.write(b"P3\n1 1\n255\n0 0 0\n")
+        with self.assertRaises(ValueError):
+            raw.open_raw(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
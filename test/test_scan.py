@@ -0,0 +1,156 @@
+import unittest
+from src import scan, steg
+import json
+import os
+import shutil
+import struct
+import zlib
+import cv2
+import numpy as np
+
+
+class ScanTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        self.message = "./test/files/test.txt"
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        self.rng = np.random.default_rng(0)
+
+    def hide(self, name, medium=None, **kwargs):
+        hidden = os.path.join(self.temp_folder, name)
+        steg.encode(medium or self.medium, self.message, hidden, **kwargs)
+        return hidden + os.path.splitext(medium or self.medium)[1]
+
+    def assert_prefix_matches(self, filename):
+        image = steg.read_image(filename)
+        expected = image.reshape(-1, image.shape[-1])
+        with open(filename, "rb") as f:
+            reader = scan.PNGPrefixReader(f)
+            self.assertEqual((reader.height, reader.width, reader.channels), image.shape)
+            width = reader.width
+            for nr_pixels in (1, 5, width + 3, 2 * width, len(expected)):
+                self.assertEqual(reader.read(nr_pixels), expected[:nr_pixels].ravel().tolist())
+
+    def chunk(self, chunk_type, data):
+        return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data))
+
+    def test_prefix_reader_matches_cv2(self):
+        image = self.rng.integers(0, 256, (20, 30, 3), dtype=np.uint8)
+        deep = self.rng.integers(0, 1 << 16, (20, 30, 4), dtype=np.uint16)
+        variants = {
+            "rgb": image,
+            "gray": image[..., 0],
+            "rgba": np.dstack([image, image[..., :1]]),
+            "16bit": image.astype(np.uint16) * 257,
+            "16bit_gray": deep[..., 0],
+            "16bit_rgba": deep,
+        }
+        for name, pixels in variants.items():
+            for level in (0, 9):
+                filename = os.path.join(self.temp_folder, "{}{}.png".format(name, level))
+                cv2.imwrite(filename, pixels, [cv2.IMWRITE_PNG_COMPRESSION, level])
+                self.assert_prefix_matches(filename)
+
+    def test_prefix_reader_palette(self):
+        rows = b"".join(b"\x00" + bytes(self.rng.integers(0, 10, 5, dtype=np.uint8)) for _ in range(5))
+        for name, transparency in (("palette", b""), ("transparent_palette", self.chunk(b"tRNS", bytes([0, 128, 7])))):
+            filename = os.path.join(self.temp_folder, name + ".png")
+            with open(filename, "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n" + self.chunk(b"IHDR", struct.pack(">IIBBBBB", 5, 5, 8, 3, 0, 0, 0)) +
+                        self.chunk(b"PLTE", bytes(range(30, 60))) + transparency +
+                        self.chunk(b"IDAT", zlib.compress(rows)) + self.chunk(b"IEND", b""))
+            self.assert_prefix_matches(filename)
+
+    def test_prefix_reader_transparent_color(self):
+        pixels = self.rng.integers(0, 2, (6, 7, 3), dtype=np.uint16) * 1000
+        for depth in (8, 16):
+            dtype = ">u1" if depth == 8 else ">u2"
+            rows = b"".join(b"\x00" + row.astype(dtype).tobytes() for row in pixels)
+            filename = os.path.join(self.temp_folder, "transparent{}.png".format(depth))
+            with open(filename, "wb") as f:
+                f.write(b"\x89PNG\r\n\x1a\n" + self.chunk(b"IHDR", struct.pack(">IIBBBBB", 7, 6, depth, 2, 0, 0, 0)) +
+                        self.chunk(b"tRNS", struct.pack(">3H", *pixels[0, 0].astype(dtype))) +
+                        self.chunk(b"IDAT", zlib.compress(rows)) + self.chunk(b"IEND", b""))
+            self.assert_prefix_matches(filename)
+
+    def test_inspect(self):
+        inspection = scan.inspect_image(self.hide("encrypted", key=self.key))
+        self.assertIsNone(inspection.error)
+        self.assertEqual(inspection.shape, (205, 282, 4))
+        self.assertEqual(inspection.header.filetype, "txt")
+        self.assertEqual(inspection.header.length, (4 + 28) * 8)
+        self.assertTrue(inspection.header.encrypted)
+
+    def test_inspect_scattered(self):
+        row = scan.report_row(scan.inspect_image(self.hide("scattered", key=self.key, scatter=True, setup=[2, True])))
+        self.assertEqual((row["payload"], row["scattered"], row["bits"], row["all_channels"]), (True, True, 2, True))
+
+    def test_inspect_deep(self):
+        medium = os.path.join(self.temp_folder, "deep.png")
+        cv2.imwrite(medium, self.rng.integers(0, 1 << 16, (20, 30, 4), dtype=np.uint16))
+        inspection = scan.inspect_image(self.hide("deep", medium, setup=[6, True]))
+        self.assertIsNone(inspection.error)
+        self.assertEqual((inspection.shape, inspection.header.bits), ((20, 30, 4), 6))
+
+    def test_inspect_raw(self):
+        medium = os.path.join(self.temp_folder, "medium.ppm")
+        cv2.imwrite(medium, self.rng.integers(0, 256, (40, 50, 3), dtype=np.uint8))
+        self.assertEqual(scan.inspect_image(self.hide("raw", medium)).header.length, 32)
+
+    def test_inspect_other_formats(self):
+        self.hide("tiff", output_format="tiff")
+        inspection = scan.inspect_image(os.path.join(self.temp_folder, "tiff.tiff"))
+        self.assertEqual(inspection.header.filetype, "txt")
+
+    def test_reject_noise(self):
+        for i in range(100):
+            filename = os.path.join(self.temp_folder, "noise{}.png".format(i))
+            cv2.imwrite(filename, self.rng.integers(0, 256, (64, 64, 3), dtype=np.uint8))
+            inspection = scan.inspect_image(filename)
+            self.assertIsNone(inspection.header)
+            self.assertIsNotNone(inspection.error)
+
+    def test_reject_implausible(self):
+        header = steg.decode_header(steg.VersionedHeader().encode_header(8000, "txt", 1, False, False))
+        with self.assertRaises(ValueError):
+            scan.check_plausible(header, (20, 20, 3))
+        scan.check_plausible(header, (200, 200, 3))
+        header = header._replace(filetype="t\x07t")
+        with self.assertRaises(ValueError):
+            scan.check_plausible(header, (200, 200, 3))
+
+    def test_missing_and_truncated(self):
+        truncated = os.path.join(self.temp_folder, "truncated.png")
+        with open(self.hide("full"), "rb") as f:
+            data = f.read(60)
+        with open(truncated, "wb") as f:
+            f.write(data)
+        for filename in (truncated, os.path.join(self.temp_folder, "missing.png")):
+            inspection = scan.inspect_image(filename)
+            self.assertIsNone(inspection.header)
+            self.assertIsNotNone(inspection.error)
+
+    def test_inspect_images_and_report(self):
+        self.hide("a")
+        self.hide("b", key=self.key)
+        shutil.copy(self.medium, os.path.join(self.temp_folder, "c.png"))
+        filenames = scan.find_images([self.temp_folder])
+        self.assertEqual([os.path.basename(name) for name in filenames], ["a.png", "b.png", "c.png"])
+        for workers in (1, 2):
+            inspections = list(scan.inspect_images(filenames, workers))
+            self.assertEqual([inspection.header is not None for inspection in inspections], [True, True, False])
+        report = os.path.join(self.temp_folder, "report.json")
+        scan.write_report(inspections, report)
+        with open(report) as f:
+            rows = json.load(f)
+        self.assertEqual([(row["size"], row["encrypted"]) for row in rows], [(4, False), (32, True), (None, None)])
+        report = os.path.join(self.temp_folder, "report.csv")
+        scan.write_report(inspections, report)
+        with open(report) as f:
+            self.assertEqual(f.readline().strip(), ",".join(scan.REPORT_FIELDS))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
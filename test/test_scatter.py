@@ -0,0 +1,75 @@
+import unittest
+from src import raw, scatter, steg, stream
+import os
+import shutil
+import cv2
+import numpy as np
+
+
+class ScatterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        self.message = "./test/files/test.txt"
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+
+    def test_permutation(self):
+        for size in (1, 2, 3, 17, 1000, 4099):
+            permuted = scatter.Permutation(self.key, size)(np.arange(size))
+            self.assertTrue((np.sort(permuted) == np.arange(size)).all(), "Not a permutation of {}".format(size))
+
+    def test_permutation_of_range(self):
+        permutation = scatter.permutation(self.key, 5000)
+        self.assertTrue((permutation(np.arange(1234, 2345)) == permutation(np.arange(5000))[1234:2345]).all())
+        self.assertIs(scatter.permutation(self.key, 5000), permutation)
+
+    def test_permutation_depends_on_key(self):
+        first = scatter.Permutation(self.key, 1000)(np.arange(1000))
+        second = scatter.Permutation(b'1' * 32, 1000)(np.arange(1000))
+        self.assertFalse((first == second).all())
+
+    def test_encode_and_decode_setups(self):
+        image = cv2.imread(self.medium)
+        for setup in ([1, False], [3, False], [2, True], [3, True], [4, True]):
+            hidden = steg.hide_data(image.copy(), b"payload" * 20, "bin", self.key, setup, scatter=True)
+            values, header = steg.reveal_data(hidden, self.key)
+            self.assertEqual(values, b"payload" * 20, "The payload differs for setup {}".format(setup))
+            self.assertTrue(header.scattered)
+
+    def test_message_is_spread(self):
+        image = cv2.imread(self.medium)
+        hidden = steg.hide_data(image.copy(), b"payload", "bin", self.key, [1, True], scatter=True)
+        changed = np.flatnonzero((hidden != image).any(axis=2).reshape(-1))
+        self.assertGreater(changed[-1], len(changed) * 10)
+
+    def test_missing_key(self):
+        image = cv2.imread(self.medium)
+        with self.assertRaises(ValueError):
+            steg.hide_data(image.copy(), b"payload", scatter=True)
+        hidden = steg.hide_data(image.copy(), b"payload", "bin", self.key, scatter=True)
+        with self.assertRaises(ValueError):
+            steg.extract_data(hidden)
+
+    def test_stream(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, key=self.key, chunk_size=7, scatter=True)
+        steg.decode(self.encoded + ".png", key=self.key, output_name=self.decoded)
+        stream.decode_stream(self.encoded + ".png", key=self.key, output_name=self.decoded + "_stream", chunk_size=5)
+        for decoded in (self.decoded, self.decoded + "_stream"):
+            with open(self.message, "rb") as f1, open(decoded + ".txt", "rb") as f2:
+                self.assertEqual(f1.read(), f2.read())
+
+    def test_raw(self):
+        ppm = os.path.join(self.temp_folder, "medium.ppm")
+        cv2.imwrite(ppm, cv2.imread(self.medium))
+        steg.encode(ppm, self.message, ppm, key=self.key, scatter=True)
+        self.assertTrue(steg.reveal_data(raw.open_raw(ppm), self.key)[1].scattered)
+        steg.decode(ppm, key=self.key, output_name=self.decoded)
+        with open(self.message, "rb") as f1, open(self.decoded + ".txt", "rb") as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -0,0 +1,136 @@
+import unittest
+from src import server, steg
+import asyncio
+import json
+import os
+import shutil
+from unittest import mock
+
+
+class ServerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        self.key = '00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        with open(self.medium, "rb") as f:
+            self.medium_png = f.read()
+
+    def run_server(self, requests, address="127.0.0.1:0", **settings):
+        """Start a server, send the requests one after another on one connection and return the responses."""
+        async def run():
+            service = server.Server(workers=1, **settings)
+            listener = await service.start(address)
+            try:
+                if address.startswith("unix:"):
+                    reader, writer = await asyncio.open_unix_connection(address[5:])
+                else:
+                    reader, writer = await asyncio.open_connection(*listener.sockets[0].getsockname()[:2])
+                responses = []
+                for method, target, body, headers in requests:
+                    head = "{} {} HTTP/1.1\r\nContent-Length: {}\r\n".format(method, target, len(body))
+                    head += "".join("{}: {}\r\n".format(name, value) for name, value in headers.items())
+                    writer.write((head + "\r\n").encode() + body)
+                    status_line, *lines = (await reader.readuntil(b"\r\n\r\n")).decode().strip().split("\r\n")
+                    response_headers = {name.lower(): value.strip() for name, _, value in (line.partition(":") for line in lines)}
+                    content = await reader.readexactly(int(response_headers["content-length"]))
+                    responses.append((int(status_line.split(" ")[1]), response_headers, content))
+                    if response_headers.get("connection") == "close":
+                        break
+                writer.close()
+                return responses
+            finally:
+                await service.close()
+        return asyncio.run(run())
+
+    def test_hide_and_reveal(self):
+        target = "/hide?filetype=txt&scatter=1&medium_length={}".format(len(self.medium_png))
+        (status, headers, image), = self.run_server([("POST", target, self.medium_png + b"payload", {"X-Key": self.key})])
+        self.assertEqual((status, headers["content-type"]), (200, "image/png"))
+        self.assertEqual(steg.decode_bytes(image, self.key.encode()), (b"payload", "txt", True))
+        responses = self.run_server([("POST", "/reveal", image, {"X-Key": self.key}),
+                                     ("POST", "/reveal", image, {"X-Key": "1" * 32})])
+        self.assertEqual([(status, content) for status, _, content in responses], [(200, b"payload"), (403, b"Decryption failed")])
+        self.assertEqual(responses[0][1]["x-filetype"], "txt")
+
+    def test_hide_from_pool(self):
+        carriers = os.path.join(self.temp_folder, "carriers")
+        os.mkdir(carriers)
+        shutil.copy(self.medium, os.path.join(carriers, "medium.png"))
+        responses = self.run_server([("POST", "/hide?filetype=txt", b"payload", {}),
+                                     ("POST", "/hide?carrier=medium.png", b"payload", {}),
+                                     ("POST", "/hide?carrier=missing.png", b"payload", {}),
+                                     ("POST", "/hide", b"x" * 150000, {})], carriers=carriers)
+        self.assertEqual([status for status, _, _ in responses], [200, 200, 400, 422])
+        self.assertEqual(responses[0][1]["x-carrier"], "medium.png")
+        self.assertEqual(steg.decode_bytes(responses[0][2]), (b"payload", "txt", False))
+        (status, _, _), = self.run_server([("POST", "/hide", b"payload", {})])
+        self.assertEqual(status, 400)
+
+    def test_carrier_name_is_encoded(self):
+        carriers = os.path.join(self.temp_folder, "carriers")
+        os.mkdir(carriers)
+        shutil.copy(self.medium, os.path.join(carriers, "写真.png"))
+        responses = self.run_server([("POST", "/hide", b"payload", {}),
+                                     ("POST", "/hide?carrier=%E5%86%99%E7%9C%9F.png", b"payload", {})], carriers=carriers)
+        self.assertEqual([status for status, _, _ in responses], [200, 200])
+        self.assertEqual([headers["x-carrier"] for _, headers, _ in responses], ["%E5%86%99%E7%9C%9F.png"] * 2)
+
+    def test_capacity(self):
+        (status, _, content), = self.run_server([("POST", "/capacity?payload_size=150000", self.medium_png[:64], {})])
+        plan = json.loads(content)
+        self.assertEqual(status, 200)
+        self.assertEqual((plan["shape"], plan["depth"]), ([205, 282, 4], 8))
+        self.assertIsNone(plan["setup"])
+
+    def test_errors(self):
+        responses = self.run_server([
+            ("GET", "/unknown", b"", {}),
+            ("GET", "/hide", b"", {}),
+            ("POST", "/hide?medium_length=abc", b"x", {}),
+            ("POST", "/hide?medium_length=1", b"no image", {}),
+            ("POST", "/reveal", b"x" * 2000, {}),
+        ], max_request_size=1000)
+        self.assertEqual([status for status, _, _ in responses], [404, 405, 400, 400, 413])
+
+    def test_busy(self):
+        (status, _, _), = self.run_server([("POST", "/reveal", self.medium_png, {})], queue_size=0)
+        self.assertEqual(status, 503)
+
+    def test_reveal_filetype_is_encoded(self):
+        images = [steg.encode_bytes(self.medium_png, b"payload", filetype) for filetype in ("txt\r\nSet-Cookie: a=b", "€uro")]
+        responses = self.run_server([("POST", "/reveal", image, {}) for image in images])
+        self.assertEqual([status for status, _, _ in responses], [200, 200])
+        self.assertNotIn("set-cookie", responses[0][1])
+        self.assertEqual([headers["x-filetype"] for _, headers, _ in responses], ["txt%0D%0ASet-Cookie%3A%20a%3Db", "%E2%82%ACuro"])
+
+    def test_reveal_max_response_size(self):
+        image = steg.encode_bytes(self.medium_png, bytes(100000), "bin", compress="zlib")
+        (status, _, content), = self.run_server([("POST", "/reveal", image, {})], max_response_size=50000)
+        self.assertEqual((status, content), (400, b"The decompressed message exceeds 50000 bytes"))
+        (status, _, content), = self.run_server([("POST", "/reveal", image, {})])
+        self.assertEqual((status, content), (200, bytes(100000)))
+
+    def test_negative_content_length(self):
+        (status, _, _), = self.run_server([("POST", "/reveal", b"", {"Content-Length": "-1"})])
+        self.assertEqual(status, 400)
+
+    def test_unexpected_error(self):
+        with mock.patch.object(server.Server, "dispatch", side_effect=RuntimeError("bug")):
+            (status, _, _), = self.run_server([("GET", "/health", b"", {})])
+        self.assertEqual(status, 500)
+
+    def test_unix_socket(self):
+        address = "unix:" + os.path.join(self.temp_folder, "server.sock")
+        (status, _, content), = self.run_server([("GET", "/health", b"", {})], address)
+        self.assertEqual((status, json.loads(content)), (200, {"pending": 0}))
+
+    def test_parse_address(self):
+        self.assertEqual(server.parse_address("0.0.0.0:9000"), ("0.0.0.0", 9000, None))
+        self.assertEqual(server.parse_address(":9000"), ("127.0.0.1", 9000, None))
+        self.assertEqual(server.parse_address("localhost"), ("localhost", 8080, None))
+        self.assertEqual(server.parse_address("unix:/tmp/stegapy.sock"), (None, None, "/tmp/stegapy.sock"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -0,0 +1,66 @@
+import unittest
+from src import shard, steg
+import cv2
+import os
+import shutil
+from cryptography.exceptions import InvalidTag
+
+
+class ShardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.carriers = ["./test/files/medium.png"] * 3
+        self.message = os.path.join(self.temp_folder, "message.bin")
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        self.payload = os.urandom(150000)
+        with open(self.message, "wb") as f:
+            f.write(self.payload)
+
+    def read_decoded(self):
+        with open(self.decoded + ".bin", "rb") as f:
+            return f.read()
+
+    def test_plan_shards(self):
+        shapes = [(100, 100, 3), (200, 100, 3), (100, 100, 3)]
+        sizes = shard.plan_shards(20000, shapes, 200)
+        self.assertEqual(sum(sizes), 20000)
+        self.assertEqual(len(sizes), 2)
+        self.assertAlmostEqual(sizes[1] / sizes[0], 2, places=1)
+
+    def test_plan_shards_too_large(self):
+        with self.assertRaises(OverflowError):
+            shard.plan_shards(10**6, [(100, 100, 3)], 200)
+
+    def test_encode_and_decode_shards(self):
+        for key in (None, self.key):
+            images = shard.encode_shards(self.carriers, self.message, self.encoded, key=key, workers=2)
+            self.assertEqual(len(images), 2)
+            shard.decode_shards(list(reversed(images)), key=key, output_name=self.decoded, workers=2)
+            self.assertEqual(self.read_decoded(), self.payload)
+
+    def test_missing_shard(self):
+        images = shard.encode_shards(self.carriers, self.message, self.encoded, workers=2)
+        with self.assertRaises(ValueError):
+            shard.decode_shards(images[1:], output_name=self.decoded, workers=2)
+
+    def test_mixed_shard_sets(self):
+        first = shard.encode_shards(self.carriers, self.message, self.encoded + "1", workers=2)
+        second = shard.encode_shards(self.carriers, self.message, self.encoded + "2", workers=2)
+        with self.assertRaises(ValueError):
+            shard.decode_shards([first[0], second[1]], output_name=self.decoded, workers=2)
+
+    def test_tampered_shard_index(self):
+        image = cv2.imread(self.carriers[0])
+        image = steg.hide_data(image, b"payload", "bin", self.key, shard=(1, 0, 2))
+        flat_image = image.reshape(-1, 3)
+        header, _ = steg.read_header(flat_image)
+        steg.embed_header(flat_image, header.length, header.filetype, header.bits, header.all_channels, True, (1, 1, 2))
+        with self.assertRaises(InvalidTag):
+            steg.reveal_data(image, self.key)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -1,7 +1,9 @@
 import unittest
-from src import steg
+from src import steg, header, bitutils, parallel
 import os
 import shutil
+import cv2
+import numpy as np
 
 class StegaTest(unittest.TestCase):
     
@@ -19,7 +21,20 @@ class StegaTest(unittest.TestCase):
 
     def test_unsupported_filetype(self):
         with self.assertRaises(OverflowError):
-            steg.encode(medium_filename=self.medium, message_filename="./test/files/test.html", hidden_filename=self.encoded)
+            steg.encode_bytes(cv2.imread(self.medium), b"", filetype="x" * 256)
+
+    def test_long_filetype(self):
+        steg.encode(medium_filename=self.medium, message_filename="./test/files/test.html", hidden_filename=self.encoded)
+        steg.decode(filename=self.encoded+".png", output_name=self.decoded)
+        self.assertTrue(os.path.isfile(self.decoded+".html"))
+
+    def test_decode_legacy_header(self):
+        image = cv2.imread(self.medium)
+        flat_image = image.reshape(-1, 3)
+        header_bits = header.HeaderUtils().encode_header(32, "txt", 2, True, False)
+        steg.embed_symbols(flat_image, 0, steg.reshape_array(np.array([int(bit) for bit in header_bits], dtype=np.uint8)), 1)
+        steg.embed_message(flat_image, 18, bitutils.bytes2symbols(b"test", 2), 2, True)
+        self.assertEqual(steg.decode_bytes(image), (b"test", "txt", False))
 
     def test_encode_and_decode(self):
         steg.encode(medium_filename=self.medium, message_filename="./test/files/test.txt", hidden_filename=self.encoded)
@@ -27,6 +42,13 @@ class StegaTest(unittest.TestCase):
         with open("./test/files/test.txt") as f1, open(self.decoded+".txt") as f2:
             self.assertEqual(list(f1), list(f2), "The files are not equal")
     
+    def test_encode_and_decode_setups(self):
+        for setup in ([1, False], [2, False], [3, False], [4, False], [1, True], [2, True], [3, True], [4, True]):
+            steg.encode(medium_filename=self.medium, message_filename="./test/files/test.txt", hidden_filename=self.encoded, setup=setup)
+            steg.decode(filename=self.encoded+".png", output_name=self.decoded)
+            with open("./test/files/test.txt") as f1, open(self.decoded+".txt") as f2:
+                self.assertEqual(list(f1), list(f2), "The files are not equal for setup {}".format(setup))
+
     def test_encode_and_decode_encrypted(self):
         steg.encode(medium_filename=self.medium, message_filename="./test/files/test.txt", hidden_filename=self.encoded, key=self.key)
         steg.decode(filename=self.encoded+".png", output_name=self.decoded, key=self.key)
@@ -38,5 +60,117 @@ class StegaTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             steg.decode(filename=self.encoded+".png", output_name=self.decoded)
 
+    def test_encode_and_decode_bytes(self):
+        with open(self.medium, "rb") as f:
+            medium = f.read()
+        png = steg.encode_bytes(medium, b"payload", "bin", key=self.key)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+        self.assertEqual(steg.decode_bytes(png, key=self.key), (b"payload", "bin", True))
+
+    def test_encode_bytes_from_array(self):
+        image = cv2.imread(self.medium)
+        original = image.copy()
+        png = steg.encode_bytes(image, b"payload")
+        self.assertTrue((image == original).all(), "The medium array was modified")
+        self.assertEqual(steg.decode_bytes(png), (b"payload", "", False))
+
+    def test_encode_and_decode_output_formats(self):
+        for output_format, extension in [("fast", ".png"), ("small", ".png"), ("webp", ".webp"), ("tiff", ".tiff")]:
+            steg.encode(medium_filename=self.medium, message_filename="./test/files/test.txt", hidden_filename=self.encoded,
+                        output_format=output_format)
+            steg.decode(filename=self.encoded+extension, output_name=self.decoded)
+            with open("./test/files/test.txt") as f1, open(self.decoded+".txt") as f2:
+                self.assertEqual(f1.read(), f2.read(), output_format)
+
+    def test_compression_level(self):
+        image = cv2.imread(self.medium)
+        uncompressed = steg.encode_bytes(image, b"payload", compression=0)
+        compressed = steg.encode_bytes(image, b"payload", output_format="fast", compression=9)
+        self.assertLess(len(compressed), len(uncompressed))
+        self.assertEqual(steg.decode_bytes(compressed), (b"payload", "", False))
+        with self.assertRaises(ValueError):
+            steg.encode_bytes(image, b"payload", output_format="webp", compression=9)
+        with self.assertRaises(ValueError):
+            steg.encode_bytes(image, b"payload", output_format="jpg")
+
+    def test_decode_bytes_invalid_image(self):
+        with self.assertRaises(ValueError):
+            steg.decode_bytes(b"no image")
+
+    def test_decode_invalid_length(self):
+        image = np.full((20, 20, 3), 255, dtype=np.uint8)
+        cv2.imwrite(self.encoded+".png", image)
+        with self.assertRaises(ValueError):
+            steg.decode(filename=self.encoded+".png", output_name=self.decoded)
+
+    def test_corrupted_message(self):
+        image = cv2.imread(self.medium)
+        steg.hide_data(image, b"payload", "txt", setup=[1, True])
+        self.assertEqual(steg.decode_bytes(image), (b"payload", "txt", False))
+        # the message starts in the pixel after the header
+        image.reshape(-1, 3)[50, 0] ^= 1
+        with self.assertRaises(ValueError):
+            steg.decode_bytes(image)
+
+    def test_without_checksum(self):
+        image = cv2.imread(self.medium)
+        steg.hide_data(image, b"payload", "txt", setup=[1, True], checksum=False)
+        image.reshape(-1, 3)[50, 0] ^= 1
+        self.assertNotEqual(steg.decode_bytes(image)[0], b"payload")
+
+    def test_compressed(self):
+        with open("README.md", "rb") as f:
+            payload = f.read(16 << 10) * 8
+        with self.assertRaises(OverflowError):
+            steg.encode_bytes(cv2.imread(self.medium), payload, "md")
+        for key in (None, self.key):
+            image = steg.encode_bytes(cv2.imread(self.medium), payload, "md", key, compress=True)
+            self.assertEqual(steg.decode_bytes(image, key), (payload, "md", key is not None))
+            values, header = steg.extract_data(steg.load_image(image))
+            self.assertIsNotNone(header.compression)
+            self.assertEqual((header.bits, header.all_channels), (1, False))
+
+    def test_incompressible_stays_uncompressed(self):
+        payload = os.urandom(1000)
+        image = steg.encode_bytes(cv2.imread(self.medium), payload, "bin", compress=True)
+        self.assertIsNone(steg.extract_data(steg.load_image(image))[1].compression)
+        self.assertEqual(steg.decode_bytes(image)[0], payload)
+
+    def test_parallel_matches_serial(self):
+        medium = cv2.imread(self.medium)
+        min_band_size = parallel.MIN_BAND_SIZE
+        # bands of a few hundred symbols, so the small medium is split among all workers
+        parallel.MIN_BAND_SIZE = 100
+        try:
+            for bits in range(1, 5):
+                for all_channels in (False, True):
+                    for key, scatter in ((None, False), (self.key, False), (self.key, True)):
+                        payload = os.urandom(medium.size * bits // (8 if all_channels else 24) - 200)
+                        settings = dict(filetype="bin", key=key, setup=[bits, all_channels], scatter=scatter)
+                        serial = steg.hide_data(medium.copy(), payload, **settings)
+                        for workers in (2, 3, 0):
+                            image = steg.hide_data(medium.copy(), payload, workers=workers, **settings)
+                            if key is None:
+                                np.testing.assert_array_equal(image, serial)
+                            for decoded in (image, serial):
+                                self.assertEqual(steg.decode_bytes(decoded, key, workers), (payload, "bin", key is not None))
+                            self.assertEqual(steg.decode_bytes(image, key)[0], payload)
+        finally:
+            parallel.MIN_BAND_SIZE = min_band_size
+
+    def test_parallel_errors(self):
+        image = np.full((20, 20, 3), 255, dtype=np.uint8)
+        with self.assertRaises(ValueError):
+            steg.decode_bytes(image, workers=4)
+        image = cv2.imread(self.medium)
+        steg.hide_data(image, b"payload", "txt", setup=[1, True], workers=4)
+        image.reshape(-1, 3)[50, 0] ^= 1
+        with self.assertRaises(ValueError):
+            steg.decode_bytes(image, workers=4)
+
+    def test_decode_missing_file(self):
+        with self.assertRaises(FileNotFoundError):
+            steg.decode(filename=self.encoded+".png", output_name=self.decoded)
+
     def tearDown(self):
         shutil.rmtree(self.temp_folder)
@@ -0,0 +1,107 @@
+import unittest
+from src import steg, stream
+import os
+import shutil
+import cv2
+from cryptography.exceptions import InvalidTag
+
+
+class StreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = "./test/files/medium.png"
+        self.message = os.path.join(self.temp_folder, "message.bin")
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        self.payload = os.urandom(5000)
+        with open(self.message, "wb") as f:
+            f.write(self.payload)
+
+    def read_decoded(self):
+        with open(self.decoded + ".bin", "rb") as f:
+            return f.read()
+
+    def test_encode_and_decode_stream(self):
+        for setup in ([1, True], [2, True], [3, True], [4, True], [3, False], [4, False]):
+            for key in (None, self.key):
+                stream.encode_stream(self.medium, self.message, self.encoded, key=key, setup=setup, chunk_size=7)
+                stream.decode_stream(self.encoded + ".png", key=key, output_name=self.decoded, chunk_size=11)
+                self.assertEqual(self.read_decoded(), self.payload, "Mismatch for setup {}".format(setup))
+
+    def test_compatible_with_encode(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, key=self.key, setup=[3, True])
+        steg.decode(self.encoded + ".png", key=self.key, output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), self.payload)
+
+        steg.encode(self.medium, self.message, self.encoded, key=self.key, setup=[3, False])
+        stream.decode_stream(self.encoded + ".png", key=self.key, output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), self.payload)
+
+    def test_wrong_key_removes_output(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, key=self.key)
+        with self.assertRaises(InvalidTag):
+            stream.decode_stream(self.encoded + ".png", key=b'1' * 32, output_name=self.decoded)
+        self.assertFalse(os.path.exists(self.decoded + ".bin"))
+
+    def test_missing_key(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, key=self.key)
+        with self.assertRaises(ValueError):
+            stream.decode_stream(self.encoded + ".png", output_name=self.decoded)
+
+    def test_compressed(self):
+        with open("README.md", "rb") as f:
+            text = f.read()
+        with open(self.message, "wb") as f:
+            f.write(text)
+        for key in (None, self.key):
+            stream.encode_stream(self.medium, self.message, self.encoded, key=key, chunk_size=1000, compress=True)
+            stream.decode_stream(self.encoded + ".png", key=key, output_name=self.decoded, chunk_size=100)
+            self.assertEqual(self.read_decoded(), text)
+            steg.decode(self.encoded + ".png", key=key, output_name=self.decoded)
+            self.assertEqual(self.read_decoded(), text)
+        steg.encode(self.medium, self.message, self.encoded, compress="zlib")
+        stream.decode_stream(self.encoded + ".png", output_name=self.decoded, chunk_size=100)
+        self.assertEqual(self.read_decoded(), text)
+
+    def corrupt(self, filename):
+        image = cv2.imread(filename)
+        image.reshape(-1, 3)[100:2000] ^= 1
+        cv2.imwrite(filename, image)
+
+    def test_checksum_matches_encode(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, chunk_size=7)
+        header = stream.verify_stream(self.encoded + ".png")
+        image = cv2.imread(self.medium)
+        steg.hide_data(image, self.payload, "bin")
+        self.assertEqual(header.checksum, steg.extract_data(image)[1].checksum)
+
+    def test_corrupted_message_removes_output(self):
+        stream.encode_stream(self.medium, self.message, self.encoded, setup=[2, True])
+        self.corrupt(self.encoded + ".png")
+        with self.assertRaises(ValueError):
+            stream.decode_stream(self.encoded + ".png", output_name=self.decoded)
+        self.assertFalse(os.path.exists(self.decoded + ".bin"))
+
+    def test_verify(self):
+        for key, scatter in ((None, False), (self.key, False), (self.key, True)):
+            steg.encode(self.medium, self.message, self.encoded, key=key, scatter=scatter)
+            # encrypted messages are checked by their checksum without key and authenticated with key
+            self.assertEqual(stream.verify_stream(self.encoded + ".png", key=key if scatter else None, chunk_size=100).length,
+                             (5000 + (28 if key else 0)) * 8)
+            stream.verify_stream(self.encoded + ".png", key=key)
+            self.corrupt(self.encoded + ".png")
+            with self.assertRaises((ValueError, InvalidTag)):
+                stream.verify_stream(self.encoded + ".png", key=key)
+
+    def test_verify_without_checksum(self):
+        image = cv2.imread(self.medium)
+        steg.hide_data(image, self.payload, "bin", checksum=False)
+        cv2.imwrite(self.encoded + ".png", image)
+        with self.assertRaises(ValueError):
+            stream.verify_stream(self.encoded + ".png")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)
@@ -0,0 +1,145 @@
+import unittest
+from src import capacity, steg, stream, video
+import os
+import shutil
+import cv2
+import numpy as np
+from cryptography.exceptions import InvalidTag
+
+
+class VideoTest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_folder = "test_temp"
+        self.medium = os.path.join(self.temp_folder, "medium.avi")
+        self.message = os.path.join(self.temp_folder, "message.bin")
+        self.encoded = os.path.join(self.temp_folder, "encoded")
+        self.decoded = os.path.join(self.temp_folder, "decoded")
+        self.key = b'00000000000000000000000000000000'
+        os.mkdir(self.temp_folder)
+        self.frames = self.write_video(self.medium, 20)
+        # one frame holds 48 * 64 / 8 = 384 bytes at one bit per pixel
+        self.payload = os.urandom(5000)
+        with open(self.message, "wb") as f:
+            f.write(self.payload)
+
+    def write_video(self, filename, nr_frames, fourcc="FFV1"):
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (48, 64, 3), dtype=np.uint8) for _ in range(nr_frames)]
+        writer = cv2.VideoWriter(filename, cv2.VideoWriter_fourcc(*fourcc), 25, (64, 48))
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+        return frames
+
+    def read_frames(self, filename):
+        with video.FrameReader(filename) as reader:
+            return list(reader)
+
+    def read_decoded(self):
+        with open(self.decoded + ".bin", "rb") as f:
+            return f.read()
+
+    def test_encode_and_decode(self):
+        for setup in ([1, True], [2, True], [3, True], [4, False]):
+            for key in (None, self.key):
+                video.encode_video(self.medium, self.message, self.encoded, key=key, setup=setup, chunk_size=7)
+                video.decode_video(self.encoded + ".avi", key=key, output_name=self.decoded)
+                self.assertEqual(self.read_decoded(), self.payload)
+
+    def test_message_spans_frames(self):
+        video.encode_video(self.medium, self.message, self.encoded)
+        frames = self.read_frames(self.encoded + ".avi")
+        self.assertEqual(len(frames), len(self.frames))
+        changed = [not np.array_equal(frame, original) for frame, original in zip(frames, self.frames)]
+        # 5000 bytes need 14 frames at one bit per pixel, the rest is copied unchanged
+        self.assertEqual(changed, [True] * 14 + [False] * 6)
+        header = video.verify_video(self.encoded + ".avi")
+        self.assertEqual((header.length, header.bits, header.all_channels), (5000 * 8, 1, False))
+        self.assertTrue(all(np.max(np.abs(frame.astype(int) - original)) <= 1 for frame, original in zip(frames, self.frames)))
+
+    def test_png_codec_and_container(self):
+        medium = os.path.join(self.temp_folder, "medium.mkv")
+        self.write_video(medium, 5, "MPNG")
+        video.encode_video(medium, self.message, self.encoded, key=self.key, codec="png")
+        video.decode_video(self.encoded + ".mkv", key=self.key, output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), self.payload)
+        self.assertEqual(video.hidden_filename_for(None, "input.mp4"), "hidden.mkv")
+        self.assertEqual(video.hidden_filename_for("out.avi", "input.mkv"), "out.avi")
+        with self.assertRaises(ValueError):
+            video.encode_video(medium, self.message, self.encoded, codec="h264")
+
+    def test_compressed(self):
+        with open("README.md", "rb") as f:
+            payload = f.read() * 4
+        with open(self.message, "wb") as f:
+            f.write(payload)
+        for key in (None, self.key):
+            video.encode_video(self.medium, self.message, self.encoded, key=key, compress=True)
+            video.decode_video(self.encoded + ".avi", key=key, output_name=self.decoded)
+            self.assertEqual(self.read_decoded(), payload)
+
+    def test_steg_and_stream_dispatch(self):
+        steg.encode(self.medium, self.message, self.encoded, key=self.key)
+        steg.decode(self.encoded + ".avi", key=self.key, output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), self.payload)
+        stream.encode_stream(self.medium, self.message, self.encoded)
+        stream.decode_stream(self.encoded + ".avi", output_name=self.decoded)
+        self.assertEqual(self.read_decoded(), self.payload)
+        self.assertEqual(stream.verify_stream(self.encoded + ".avi").checksum is not None, True)
+        with self.assertRaises(ValueError):
+            steg.encode(self.medium, self.message, self.encoded, key=self.key, scatter=True)
+
+    def test_capacity(self):
+        self.assertEqual(capacity.image_shape(self.medium), (20 * 48, 64, 3))
+        plan = capacity.plan(self.medium, 5000)
+        self.assertEqual(plan["setup"], [1, False])
+        with open(self.message, "wb") as f:
+            f.write(os.urandom(plan["capacity"][(4, True)] + 1))
+        with self.assertRaises(OverflowError):
+            video.encode_video(self.medium, self.message, self.encoded)
+        self.assertFalse(os.path.exists(self.encoded + ".avi"))
+
+    def test_corrupted_and_wrong_key(self):
+        video.encode_video(self.medium, self.message, self.encoded, setup=[2, True])
+        frames = self.read_frames(self.encoded + ".avi")
+        frames[1][10:20] ^= 3
+        corrupted = os.path.join(self.temp_folder, "corrupted.avi")
+        writer = cv2.VideoWriter(corrupted, cv2.VideoWriter_fourcc(*"FFV1"), 25, (64, 48))
+        for frame in frames:
+            writer.write(frame)
+        writer.release()
+        with self.assertRaises(ValueError):
+            video.decode_video(corrupted, output_name=self.decoded)
+        self.assertFalse(os.path.exists(self.decoded + ".bin"))
+
+        video.encode_video(self.medium, self.message, self.encoded, key=self.key)
+        with self.assertRaises(InvalidTag):
+            video.decode_video(self.encoded + ".avi", key=b'1' * 32, output_name=self.decoded)
+        self.assertFalse(os.path.exists(self.decoded + ".bin"))
+        with self.assertRaises(ValueError):
+            video.decode_video(self.encoded + ".avi", output_name=self.decoded)
+        with self.assertRaises(ValueError):
+            video.verify_video(self.encoded + ".avi")
+
+    def test_missing_video(self):
+        with self.assertRaises(FileNotFoundError):
+            video.decode_video(os.path.join(self.temp_folder, "missing.avi"))
+
+    def test_frame_symbols(self):
+        # 10 pixels per frame, the message starts at pixel 4 and uses 3 symbols per pixel
+        self.assertEqual([video.frame_symbols(index, 10, 4, 40, 3) for index in range(4)],
+                         [(0, 18), (18, 40), (40, 40), (40, 40)])
+        self.assertEqual([video.frame_symbols(index, 10, 4, 40, 1) for index in range(6)],
+                         [(0, 6), (6, 16), (16, 26), (26, 36), (36, 40), (40, 40)])
+
+    def test_symbol_queue(self):
+        chunks = [os.urandom(size) for size in (1, 5, 0, 7, 2)]
+        for bits in range(1, 5):
+            queue = video.SymbolQueue(chunks, bits)
+            symbols = np.concatenate([queue.take(count) for count in (3, 0, 11, 100, 1000)])
+            np.testing.assert_array_equal(symbols, steg.bytes2symbols(b"".join(chunks), bits))
+            self.assertEqual(len(queue.take(5)), 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_folder)